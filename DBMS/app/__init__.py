@@ -1,6 +1,3 @@
-import logging
-from logging.handlers import RotatingFileHandler
-import os
 from flask import Flask, render_template
 from config import Config
 from flask_sqlalchemy import SQLAlchemy
@@ -10,43 +7,63 @@ from flask_talisman import Talisman
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from flask_caching import Cache
+from app.replicas import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 migrate = Migrate()
 login_manager = LoginManager()
 login_manager.login_view = 'main.login'
 login_manager.login_message_category = 'info'
 limiter = Limiter(key_func=get_remote_address)
+cache = Cache()
 
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
 
-    # Logging setup
-    if not app.debug and not app.testing:
-        if app.config['LOG_TO_STDOUT']:
-            stream_handler = logging.StreamHandler()
-            stream_handler.setLevel(logging.INFO)
-            app.logger.addHandler(stream_handler)
-        else:
-            if not os.path.exists('logs'):
-                os.mkdir('logs')
-            file_handler = RotatingFileHandler('logs/disaster_management.log', maxBytes=10240, backupCount=10)
-            file_handler.setFormatter(logging.Formatter(
-                '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
-            ))
-            file_handler.setLevel(logging.INFO)
-            app.logger.addHandler(file_handler)
-            app.logger.setLevel(logging.INFO)
-            app.logger.info('Disaster Management startup')
+    # Request ids, and a queued JSON log outside debug and tests
+    from app.logs import init_logging
+    init_logging(app)
 
     db.init_app(app)
     migrate.init_app(app, db)
     login_manager.init_app(app)
     limiter.init_app(app)
 
+    # Read replicas (SQLALCHEMY_BINDS replica_*) for read_replica views
+    from app.replicas import init_replicas
+    init_replicas(app, db)
+
+    # Connection pool metrics and SQLite pragmas
+    from app.pool import init_pool
+    init_pool(app, db)
+
+    # Per-request SQL/template timing and slow-query log
+    from app.instrumentation import init_instrumentation
+    init_instrumentation(app, db)
+
     # Caching
-    cache = Cache(app, config={'CACHE_TYPE': 'simple'})
+    cache.init_app(app)
+
+    # Logged-in users, cached per worker
+    from app.users import init_user_cache
+    init_user_cache(app)
+
+    # Event readiness index (task/team/resource bitsets, per worker)
+    from app.coverage import init_coverage
+    init_coverage(app)
+
+    # Live change feed (one outbox poller per worker)
+    from app.feed import init_feed
+    init_feed(app)
+
+    # Background jobs for large deletions
+    from app.deletions import init_deletions
+    init_deletions(app)
+
+    # Audit trail (buffered per worker, written in batches)
+    from app.audit import init_audit
+    init_audit(app)
 
     # Security headers
     csp = {
@@ -61,12 +78,18 @@ def create_app(config_class=Config):
     from app.routes import bp as main_bp
     app.register_blueprint(main_bp)
 
+    from app.api import bp as api_bp
+    app.register_blueprint(api_bp)
+
+    from app.commands import register_commands
+    register_commands(app)
+
     @app.errorhandler(500)
     def internal_error(error):
         app.logger.error('Server Error: %s', (error))
         return render_template('500.html'), 500
 
     with app.app_context():
-        from app import models
+        from app import models, versions, choices, summaries, search, feed, users, coverage, geo, audit
 
     return app
@@ -0,0 +1,265 @@
+import datetime
+import decimal
+import hashlib
+import json
+
+from flask import Blueprint, Response, abort, current_app, request, url_for
+from flask_login import login_required
+from sqlalchemy import select
+from werkzeug.exceptions import HTTPException
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from app import db, login_manager
+from app.models import (Emergency_Event, Affected_Area, Affected_Individual, Donation, Team, Task, Resource,
+                        Evacuation, Team_Has_Resource, Event_Summary, event_requires_task, task_doneby_team)
+from app.geo import LOCATED, nearest, within
+from app.pagination import keyset_paginate
+from app.pool import pool_status
+from app.versions import table_versions
+
+bp = Blueprint('api', __name__, url_prefix='/api/v1')
+
+# API clients get a 401 rather than a redirect to the login form.
+login_manager.blueprint_login_views[bp.name] = None
+
+
+class ApiResource:
+    """A table exposed read-only under ``/api/v1/<name>``.
+
+    ``pk`` is the keyset tie-breaker (unique within each ``sortable``
+    value); ``sortable`` and ``filterable`` name indexed columns, as the
+    HTML lists do. Item lookups are only offered when ``pk`` alone
+    identifies a row.
+    """
+
+    def __init__(self, table, pk, sortable, filterable=(), item_lookup=True):
+        self.table = table
+        self.pk = table.c[pk]
+        # Plain str: orjson refuses str subclasses such as quoted_name as keys.
+        self.fields = [str(column.key) for column in table.c]
+        self.sortable = {name: table.c[name] for name in sortable}
+        self.filterable = {name: table.c[name] for name in filterable}
+        self.item_lookup = item_lookup
+
+
+# User is left out on purpose: it only holds credentials.
+RESOURCES = {
+    'events': ApiResource(Emergency_Event.__table__, 'eme_id', ['eme_id', 'disaster_type'],
+                          ['disaster_type']),
+    'areas': ApiResource(Affected_Area.__table__, 'area_id',
+                         ['area_id', 'location', 'population', 'start_date'], ['event_id', 'damage_extent']),
+    'individuals': ApiResource(Affected_Individual.__table__, 'individual_id',
+                               ['individual_id', 'name', 'severity'], ['severity', 'area_id']),
+    'donations': ApiResource(Donation.__table__, 'donation_id', ['donation_id', 'name', 'type', 'amount'],
+                             ['type', 'area_id']),
+    'evacuations': ApiResource(Evacuation.__table__, 'eva_id', ['eva_id', 'destination', 'transport'],
+                               ['transport', 'area_id', 'team_id']),
+    'teams': ApiResource(Team.__table__, 'team_id', ['team_id', 'team_name', 'personnel'], ['team_leader']),
+    'tasks': ApiResource(Task.__table__, 'task_id', ['task_id', 'task_name']),
+    'resources': ApiResource(Resource.__table__, 'res_id', ['res_id', 'type'], ['type']),
+    'team-resources': ApiResource(Team_Has_Resource.__table__, 'res_id', ['team_id'], ['team_id', 'res_id'],
+                                  item_lookup=False),
+    'event-tasks': ApiResource(event_requires_task, 'task_id', ['event_id'], ['event_id', 'task_id'],
+                               item_lookup=False),
+    'team-tasks': ApiResource(task_doneby_team, 'task_id', ['team_id'], ['team_id', 'task_id'],
+                              item_lookup=False),
+    'event-summaries': ApiResource(Event_Summary.__table__, 'event_id', ['event_id']),
+}
+
+
+# --- Serialization ---
+
+def _default(value):
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def dumps(payload):
+    """Compact JSON bytes; uses orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default)
+    return json.dumps(payload, default=_default, separators=(',', ':'), ensure_ascii=False).encode()
+
+
+def _json_response(payload, status=200):
+    return Response(dumps(payload), status=status, mimetype='application/json')
+
+
+@bp.errorhandler(HTTPException)
+def _http_error(error):
+    return _json_response({'error': error.name, 'description': error.description}, error.code)
+
+
+# --- Conditional requests ---
+
+def _validators(spec):
+    """Strong ETag and Last-Modified for the current URL, from the table's change counter."""
+    version, changed_at = table_versions(spec.table.name)[spec.table.name]
+    key = json.dumps([request.path, version, sorted(request.args.items(multi=True))])
+    return hashlib.sha1(key.encode()).hexdigest(), changed_at
+
+
+def _not_modified(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified:
+        # HTTP dates have whole seconds.
+        seen = request.if_modified_since.replace(tzinfo=None)
+        return last_modified.replace(microsecond=0) <= seen
+    return False
+
+
+def _conditional(spec, build):
+    """Answer 304 from the change counter alone, otherwise run ``build`` for the body."""
+    etag, last_modified = _validators(spec)
+    if _not_modified(etag, last_modified):
+        response = Response(status=304)
+    else:
+        response = _json_response(build())
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+def _resource(name):
+    spec = RESOURCES.get(name)
+    if spec is None:
+        abort(404)
+    return spec
+
+
+def _fields(spec):
+    requested = request.args.get('fields')
+    if not requested:
+        return spec.fields
+    fields = [name.strip() for name in requested.split(',') if name.strip()]
+    if not fields or any(name not in spec.fields for name in fields):
+        abort(400, 'Unknown field requested.')
+    return fields
+
+
+# --- Endpoints ---
+
+@bp.route('/')
+@login_required
+def index():
+    return _json_response({'resources': {
+        name: {'url': url_for('api.collection', resource=name), 'fields': spec.fields,
+               'sortable': list(spec.sortable), 'filterable': list(spec.filterable)}
+        for name, spec in RESOURCES.items()}})
+
+
+@bp.route('/<resource>')
+@login_required
+def collection(resource):
+    spec = _resource(resource)
+    fields = _fields(spec)
+
+    def build():
+        # Only the requested columns are selected, plus the keyset columns
+        # the cursors are built from.
+        columns = [spec.table.c[name] for name in fields]
+        sort_column = spec.sortable.get(request.args.get('sort', next(iter(spec.sortable))))
+        for column in (spec.pk, sort_column):
+            if column is not None and column.key not in fields:
+                columns.append(column)
+        page = keyset_paginate(db.session.query(*columns), spec.pk, spec.sortable, spec.filterable)
+
+        def link(cursor, direction):
+            if cursor is None:
+                return None
+            args = page.url_args(**{direction: cursor})
+            if 'fields' in request.args:
+                args['fields'] = request.args['fields']
+            return url_for('api.collection', resource=resource, **args)
+
+        return {
+            'items': [{name: row._mapping[name] for name in fields} for row in page.items],
+            'per_page': page.per_page,
+            'next': link(page.next_cursor, 'after'),
+            'prev': link(page.prev_cursor, 'before'),
+        }
+
+    return _conditional(spec, build)
+
+
+@bp.route('/<resource>/<int:item_id>')
+@login_required
+def item(resource, item_id):
+    spec = _resource(resource)
+    if not spec.item_lookup:
+        abort(404)
+    fields = _fields(spec)
+
+    def build():
+        row = db.session.execute(select(*[spec.table.c[name] for name in fields])
+                                 .where(spec.pk == item_id)).first()
+        if row is None:
+            abort(404)
+        return {name: row._mapping[name] for name in fields}
+
+    return _conditional(spec, build)
+
+
+# --- Spatial search ---
+
+def _located(name):
+    located = LOCATED.get(name)
+    if located is None:
+        abort(404)
+    return located
+
+
+def _coordinate(name, bound):
+    value = request.args.get(name, type=float)
+    if value is None or not -bound <= value <= bound:
+        abort(400, f'{name} must be a number from -{bound} to {bound}.')
+    return value
+
+
+@bp.route('/<resource>/within')
+@login_required
+def points_within(resource):
+    """Rows within ``radius_km`` of ``lat``/``lon``, nearest first."""
+    located = _located(resource)
+    latitude, longitude = _coordinate('lat', 90), _coordinate('lon', 180)
+    radius_km = request.args.get('radius_km', type=float)
+    max_radius = current_app.config['GEO_MAX_RADIUS_KM']
+    if radius_km is None or not 0 < radius_km <= max_radius:
+        abort(400, f'radius_km must be above 0 and at most {max_radius:g}.')
+    limit = current_app.config['GEO_MAX_RESULTS']
+
+    def build():
+        items = within(located, latitude, longitude, radius_km, limit + 1)
+        return {'items': items[:limit], 'truncated': len(items) > limit}
+
+    return _conditional(RESOURCES[resource], build)
+
+
+@bp.route('/<resource>/nearest')
+@login_required
+def points_nearest(resource):
+    """The ``k`` rows nearest ``lat``/``lon``, nearest first."""
+    located = _located(resource)
+    latitude, longitude = _coordinate('lat', 90), _coordinate('lon', 180)
+    k = request.args.get('k', 10, type=int)
+    if not 0 < k <= current_app.config['GEO_MAX_RESULTS']:
+        abort(400, f"k must be from 1 to {current_app.config['GEO_MAX_RESULTS']}.")
+    return _conditional(RESOURCES[resource], lambda: {'items': nearest(located, latitude, longitude, k)})
+
+
+@bp.route('/metrics/pool')
+@login_required
+def pool_metrics():
+    # Per worker process: scrape each worker, or read it from the logs.
+    return _json_response(pool_status(db))
@@ -0,0 +1,188 @@
+import datetime
+
+from sqlalchemy import and_, bindparam, delete, func, insert, or_, select, update
+
+from app import db
+from app.deletions import Deletion, event_deletion
+from app.feed import AREA_CHILDREN
+from app.models import (Emergency_Event, Affected_Area, Affected_Individual, Donation, Evacuation, Team, Task,
+                        event_requires_task, Archived_Event, Archived_Area, Archived_Individual, Archived_Donation,
+                        Archived_Evacuation, archived_event_task)
+from app.signals import bulk_inserted
+
+# Operational model -> the archive table holding its archived rows.
+ARCHIVES = {
+    Affected_Area: Archived_Area,
+    Affected_Individual: Archived_Individual,
+    Donation: Archived_Donation,
+    Evacuation: Archived_Evacuation,
+}
+ARCHIVED_TASKS = archived_event_task
+
+
+class ArchiveError(Exception):
+    """The event is not in a state that allows the move; the message says why."""
+
+
+def _utcnow():
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+
+def set_status(event, status):
+    """Move ``event`` between active and closed, stamping when it was closed."""
+    if status != event.status:
+        event.status = status
+        event.closed_at = _utcnow() if status == 'closed' else None
+
+
+# --- Archiving ---
+
+class Archiving(Deletion):
+    """An event's deletion that copies every chunk to the archive tables first.
+
+    The copy and the delete share a transaction, so a row is always in
+    exactly one of the two places, however far a chunked run got.
+    """
+
+    def before_delete(self, model, ids):
+        table, archived = model.__table__, ARCHIVES[model].__table__
+        names = [column.key for column in archived.columns]
+        db.session.execute(insert(archived).from_select(
+            names, select(*[table.c[name] for name in names]).where(table.c[names[0]].in_(ids))))
+
+
+def event_archiving(event_id):
+    deletion = event_deletion(event_id)
+    event = Emergency_Event.__table__
+    copy_event = insert(Archived_Event.__table__).from_select(
+        ['eme_id', 'disaster_type', 'closed_at', 'archived_at'],
+        select(event.c.eme_id, event.c.disaster_type, event.c.closed_at,
+               bindparam('archived_at', callable_=_utcnow, type_=db.DateTime))
+        .where(event.c.eme_id == event_id))
+    copy_tasks = insert(ARCHIVED_TASKS).from_select(
+        ['event_id', 'task_id'],
+        select(event_requires_task.c.event_id, event_requires_task.c.task_id)
+        .where(event_requires_task.c.event_id == event_id))
+    return Archiving('archive', event_id, deletion.steps, [(copy_event, {}), (copy_tasks, {})] + deletion.finish)
+
+
+def closed_before(age):
+    """Ids of events closed more than ``age`` (a timedelta) ago, or left half archived."""
+    return list(db.session.execute(
+        select(Emergency_Event.eme_id).where(
+            or_(Emergency_Event.status == 'archiving',
+                and_(Emergency_Event.status == 'closed', Emergency_Event.closed_at < _utcnow() - age)))
+        .order_by(Emergency_Event.eme_id)).scalars())
+
+
+def start_archiving(event_id):
+    """Mark a closed event as being archived and return the move to run.
+
+    An event already being archived (a run that stopped) can be started again.
+    """
+    event = db.session.get(Emergency_Event, event_id)
+    if event is None or event.status not in ('closed', 'archiving'):
+        raise ArchiveError('Only closed events can be archived.')
+    event.status = 'archiving'
+    db.session.commit()
+    return event_archiving(event_id)
+
+
+# --- Restoring ---
+
+def _keep_known_teams(rows):
+    # Teams may have been deleted while the event was archived.
+    wanted = {row['team_id'] for row in rows if row['team_id'] is not None}
+    known = set(db.session.execute(select(Team.team_id).where(Team.team_id.in_(wanted))).scalars()) if wanted else ()
+    for row in rows:
+        if row['team_id'] not in known:
+            row['team_id'] = None
+
+
+class Restoring:
+    """Moves an archived event back: the event and its tasks, then its areas, then what hangs off them.
+
+    Runs like a ``Deletion`` (``DeletionJobs`` runs either). Restored rows
+    reach the summaries and the live feed as bulk inserts; each chunk
+    leaves the archive in the transaction that inserts it.
+    """
+
+    kind = 'restore'
+
+    def __init__(self, event_id):
+        self.target_id = event_id
+        # Children are moved once every area is back, but a count taken
+        # before that finds their areas still archived.
+        areas = (select(Archived_Area.area_id).where(Archived_Area.event_id == event_id)
+                 .union(select(Affected_Area.area_id).where(Affected_Area.event_id == event_id)))
+        self.steps = [(Affected_Area, Archived_Area.event_id == event_id)]
+        self.steps += [(model, ARCHIVES[model].area_id.in_(areas)) for model in AREA_CHILDREN]
+
+    def count(self):
+        return sum(db.session.execute(select(func.count()).select_from(ARCHIVES[model]).where(where)).scalar()
+                   for model, where in self.steps)
+
+    def _start(self):
+        event_id = self.target_id
+        if db.session.get(Emergency_Event, event_id) is not None:
+            return
+        archived = db.session.get(Archived_Event, event_id)
+        db.session.execute(insert(Emergency_Event), [{
+            'eme_id': event_id, 'disaster_type': archived.disaster_type, 'status': 'restoring',
+            'closed_at': archived.closed_at}])
+        task_ids = list(db.session.execute(
+            select(ARCHIVED_TASKS.c.task_id).where(ARCHIVED_TASKS.c.event_id == event_id,
+                                                   ARCHIVED_TASKS.c.task_id.in_(select(Task.task_id)))).scalars())
+        if task_ids:
+            db.session.execute(insert(event_requires_task),
+                               [{'event_id': event_id, 'task_id': task_id} for task_id in task_ids],
+                               execution_options={'link_owner': ('event_id', event_id)})
+        db.session.execute(delete(ARCHIVED_TASKS).where(ARCHIVED_TASKS.c.event_id == event_id))
+
+    def run(self, chunk_size, commit_chunks=False, progress=None):
+        self._start()
+        moved = 0
+        for model, where in self.steps:
+            table = ARCHIVES[model].__table__
+            pk = table.primary_key.columns[0]
+            while True:
+                rows = [dict(row._mapping) for row in db.session.execute(
+                    select(table).where(where).order_by(pk).limit(chunk_size))]
+                if not rows:
+                    break
+                if model is Evacuation:
+                    _keep_known_teams(rows)
+                db.session.execute(insert(model), rows)
+                bulk_inserted.send(model, rows=rows)
+                db.session.execute(delete(table).where(pk.in_([row[pk.key] for row in rows])))
+                moved += len(rows)
+                if commit_chunks:
+                    db.session.commit()
+                if progress is not None:
+                    progress(moved)
+        db.session.execute(update(Emergency_Event).where(Emergency_Event.eme_id == self.target_id)
+                           .values(status='closed'))
+        db.session.execute(delete(Archived_Event).where(Archived_Event.eme_id == self.target_id))
+        db.session.commit()
+        return moved
+
+
+def start_restoring(event_id):
+    """The move bringing archived ``event_id`` back, once its ids are known to be free.
+
+    Ids are kept, so a restore is refused if the database handed one of
+    them to a new row meanwhile (SQLite reuses the highest rowid).
+    """
+    if db.session.get(Archived_Event, event_id) is None:
+        raise ArchiveError('That event is not archived.')
+    event = db.session.get(Emergency_Event, event_id)
+    if event is not None and event.status != 'restoring':
+        raise ArchiveError(f'Event #{event_id} has been reused by another event.')
+    restoring = Restoring(event_id)
+    for model, where in restoring.steps:
+        archived = ARCHIVES[model]
+        pk, archived_pk = model.__table__.primary_key.columns[0], archived.__table__.primary_key.columns[0]
+        if db.session.execute(select(func.count()).select_from(model)
+                              .where(pk.in_(select(archived_pk).where(where)))).scalar():
+            raise ArchiveError(f'Some archived {model.__tablename__} ids have been reused.')
+    return restoring
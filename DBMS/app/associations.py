@@ -0,0 +1,90 @@
+from sqlalchemy import delete, insert, inspect, select
+from sqlalchemy.orm.util import identity_key
+
+from app import db
+from app.models import Team, Task, Team_Has_Resource, event_requires_task, task_doneby_team
+
+
+class Association:
+    """A many-to-many link table seen from one owner row.
+
+    ``owner_column``/``target_column`` are the link table's foreign keys,
+    ``target_model`` is what the target column points at, and ``attribute``
+    and ``backref`` name the relationships to expire once the links change.
+    ``defaults`` fills extra NOT NULL columns on new links.
+    """
+
+    def __init__(self, table, owner_column, target_column, target_model, attribute, backref,
+                 defaults=None):
+        self.table = table
+        self.owner_column = owner_column
+        self.target_column = target_column
+        self.target_model = target_model
+        self.target_pk = inspect(target_model).primary_key[0]
+        self.attribute = attribute
+        self.backref = backref
+        self.defaults = defaults or {}
+
+
+EVENT_TASKS = Association(event_requires_task, event_requires_task.c.event_id,
+                          event_requires_task.c.task_id, Task, 'tasks', 'events')
+TEAM_TASKS = Association(task_doneby_team, task_doneby_team.c.team_id,
+                         task_doneby_team.c.task_id, Task, 'tasks', 'teams')
+RESOURCE_TEAMS = Association(Team_Has_Resource.__table__, Team_Has_Resource.__table__.c.res_id,
+                             Team_Has_Resource.__table__.c.team_id, Team, 'teams', 'resources',
+                             defaults={'quantity': 1})
+
+
+def linked_ids(association, owner_id):
+    """Target ids currently linked to ``owner_id``, in one query."""
+    return list(db.session.execute(
+        select(association.target_column).where(association.owner_column == owner_id)
+        .order_by(association.target_column)).scalars())
+
+
+def sync_links(association, owner, wanted_ids, current=None):
+    """Make ``owner``'s links exactly ``wanted_ids`` and return ``(added, removed)``.
+
+    Reads the current links (unless the caller passes ``current``, e.g. from
+    an already loaded collection or ``()`` for a new owner), checks new
+    target ids with a single ``IN`` query (ids that no longer exist are
+    dropped), then applies the diff with at most one DELETE and one
+    multi-row INSERT. Nothing is written when the links are unchanged.
+    Runs in the session's transaction; the caller commits. ``owner`` must
+    already have its primary key (flush first).
+    """
+    owner_id = inspect(owner).identity[0]
+    current = set(linked_ids(association, owner_id) if current is None else current)
+    wanted = set(wanted_ids or ())
+
+    added = wanted - current
+    if added:
+        added = set(db.session.execute(
+            select(association.target_pk).where(association.target_pk.in_(added))).scalars())
+    removed = current - wanted
+
+    # Tells listeners (app.coverage) whose links the statements rewrite.
+    options = {'link_owner': (association.owner_column.key, owner_id)}
+    if removed:
+        db.session.execute(delete(association.table).where(
+            association.owner_column == owner_id, association.target_column.in_(removed)),
+            execution_options=options)
+    if added:
+        db.session.execute(insert(association.table), [
+            {association.owner_column.key: owner_id, association.target_column.key: target_id,
+             **association.defaults}
+            for target_id in sorted(added)], execution_options=options)
+
+    if added or removed:
+        _expire(association, owner, added | removed)
+    return added, removed
+
+
+def _expire(association, owner, target_ids):
+    # The links changed behind the ORM's back; reload the collections on
+    # the next access instead of serving stale ones.
+    db.session.expire(owner, [association.attribute])
+    for target_id in target_ids:
+        target = db.session.identity_map.get(identity_key(association.target_model, target_id))
+        if target is not None:
+            db.session.expire(target, [association.backref])
@@ -0,0 +1,299 @@
+import atexit
+import collections
+import datetime
+import logging
+import threading
+
+import click
+from flask import current_app, g, has_app_context, has_request_context, request
+from sqlalchemy import DDL, event, insert, inspect
+from sqlalchemy.exc import CompileError
+from sqlalchemy.orm import Session
+
+from app import db
+from app.api import dumps
+from app.models import Audit_Log, Change_Log, Table_Version, Event_Summary, Event_Summary_Bucket
+from app.versions import bump_versions
+
+logger = logging.getLogger('app.audit')
+
+AUDIT = Audit_Log.__table__
+
+# Bookkeeping derived from the audited tables. The Archived_* tables are
+# skipped too: what moves there is audited as the delete that moved it.
+NOT_AUDITED = {AUDIT.name, Change_Log.__tablename__, Table_Version.__tablename__,
+               Event_Summary.__tablename__, Event_Summary_Bucket.__tablename__}
+# Never copied into the trail.
+SECRET_COLUMNS = {'password_hash'}
+# Set-based UPDATE/DELETE statements are logged as SQL, cut to this length.
+MAX_STATEMENT = 2000
+
+# Append-only enforcement per dialect; the migration creating Audit_Log
+# carries a copy of these statements.
+AUDIT_DDL = {
+    'sqlite': [
+        """CREATE TRIGGER IF NOT EXISTS audit_log_no_update BEFORE UPDATE ON Audit_Log BEGIN
+            SELECT RAISE(ABORT, 'Audit_Log is append-only');
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS audit_log_no_delete BEFORE DELETE ON Audit_Log BEGIN
+            SELECT RAISE(ABORT, 'Audit_Log is append-only');
+        END""",
+    ],
+    'postgresql': [
+        """CREATE OR REPLACE FUNCTION audit_log_append_only() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            RAISE EXCEPTION 'Audit_Log is append-only';
+        END $$""",
+        'CREATE TRIGGER audit_log_append_only BEFORE UPDATE OR DELETE ON "Audit_Log" '
+        'FOR EACH ROW EXECUTE FUNCTION audit_log_append_only()',
+    ],
+    'mysql': [
+        "CREATE TRIGGER audit_log_no_update BEFORE UPDATE ON Audit_Log FOR EACH ROW "
+        "SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Audit_Log is append-only'",
+        "CREATE TRIGGER audit_log_no_delete BEFORE DELETE ON Audit_Log FOR EACH ROW "
+        "SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Audit_Log is append-only'",
+    ],
+}
+AUDIT_DDL['mariadb'] = AUDIT_DDL['mysql']
+
+
+def _create_audit_triggers(target, connection, **kw):
+    for statement in AUDIT_DDL.get(connection.dialect.name, []):
+        connection.execute(DDL(statement))
+
+
+event.listen(AUDIT, 'after_create', _create_audit_triggers)
+
+
+def _utcnow():
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+
+def _audited(table_name):
+    return table_name not in NOT_AUDITED and not table_name.startswith('Archived_')
+
+
+def _enabled():
+    return has_app_context() and 'audit' in current_app.extensions
+
+
+def current_actor():
+    """Who the changes made here belong to: the user and route, or the CLI command."""
+    if has_request_context():
+        user = g.get('_login_user')
+        return {'user_id': getattr(user, 'id', None), 'username': getattr(user, 'username', None),
+                'route': request.endpoint, 'request_id': g.get('request_id')}
+    if has_app_context() and 'audit_actor' in g:
+        # Set by background jobs to the request that started them.
+        return g.audit_actor
+    command = click.get_current_context(silent=True)
+    return {'user_id': None, 'username': None, 'route': command and f'cli:{command.info_name}',
+            'request_id': None}
+
+
+# --- Capturing changes ---
+# Entries are (table, action, row id, values) tuples. They wait in
+# session.info until the commit and go to this worker's AuditWriter, so
+# a request pays for building them but never for writing them.
+
+def _pending(session):
+    return session.info.setdefault('audit_pending', [])
+
+
+def _row_id(columns, values):
+    key = [values.get(column.key) for column in columns]
+    return None if all(value is None for value in key) else ','.join(str(value) for value in key)
+
+
+def _public(values):
+    return {key: value for key, value in values.items() if key not in SECRET_COLUMNS}
+
+
+def _changes(state, action):
+    attributes = [attr.key for attr in state.mapper.column_attrs if attr.key not in SECRET_COLUMNS]
+    if action != 'update':
+        # Inserted values, or what a deleted row had loaded.
+        return {key: state.dict[key] for key in attributes if key in state.dict}
+    changes = {}
+    for key in attributes:
+        history = state.attrs[key].history
+        if history.added or history.deleted:
+            changes[key] = [history.deleted[0] if history.deleted else None,
+                            history.added[0] if history.added else None]
+    return changes
+
+
+def _after_flush(session, flush_context):
+    if not _enabled():
+        return
+    pending = _pending(session)
+    for action, targets in (('insert', session.new), ('update', session.dirty), ('delete', session.deleted)):
+        for target in targets:
+            state = inspect(target)
+            table = state.mapper.local_table
+            if not _audited(table.name):
+                continue
+            changes = _changes(state, action)
+            if action == 'update' and not changes:
+                continue
+            key = {column.key: state.dict.get(state.mapper.get_property_by_column(column).key)
+                   for column in state.mapper.primary_key}
+            pending.append((table.name, action, _row_id(state.mapper.primary_key, key), changes))
+
+
+def _statement_sql(orm_execute_state):
+    statement = orm_execute_state.statement
+    try:
+        sql = str(statement.compile(dialect=orm_execute_state.session.get_bind().dialect,
+                                    compile_kwargs={'literal_binds': True}))
+    except (CompileError, NotImplementedError):
+        sql = str(statement)
+    return sql[:MAX_STATEMENT]
+
+
+def _capture_statement(orm_execute_state):
+    # Statements skip the flush. Callers deleting rows they have already read
+    # pass them as the ``audit_rows`` execution option to log each one.
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    table = getattr(orm_execute_state.statement, 'table', None)
+    if table is None or not _audited(table.name) or not _enabled():
+        return
+    action = 'insert' if orm_execute_state.is_insert else 'update' if orm_execute_state.is_update else 'delete'
+    rows = orm_execute_state.execution_options.get('audit_rows')
+    parameters = orm_execute_state.parameters
+    if rows is None and action == 'insert' and parameters:
+        rows = parameters if isinstance(parameters, list) else [parameters]
+    pending = _pending(orm_execute_state.session)
+    if rows:
+        key = table.primary_key.columns
+        pending.extend((table.name, action, _row_id(key, row), _public(row)) for row in rows)
+    else:
+        pending.append((table.name, action, None, {'statement': _statement_sql(orm_execute_state)}))
+
+
+def _after_commit(session):
+    entries = session.info.pop('audit_pending', None)
+    if entries and has_app_context():
+        writer = current_app.extensions.get('audit')
+        if writer is not None:
+            writer.add(entries, current_actor())
+
+
+def _after_soft_rollback(session, previous_transaction):
+    session.info.pop('audit_pending', None)
+
+
+event.listen(Session, 'after_flush', _after_flush)
+event.listen(Session, 'do_orm_execute', _capture_statement)
+event.listen(Session, 'after_commit', _after_commit)
+event.listen(Session, 'after_soft_rollback', _after_soft_rollback)
+
+
+# --- Writing ---
+
+def _audit_row(created_at, actor, entry):
+    entity, action, row_id, values = entry
+    return {'created_at': created_at, 'entity': entity, 'action': action, 'row_id': row_id,
+            'user_id': actor['user_id'], 'username': actor['username'], 'route': actor['route'],
+            'request_id': actor['request_id'], 'changes': dumps(values).decode()}
+
+
+class AuditWriter:
+    """Per-process buffer of committed changes, appended to Audit_Log in batches.
+
+    Commits only hand their entries over; one thread writes them
+    ``AUDIT_BATCH_SIZE`` rows per INSERT every ``AUDIT_FLUSH_INTERVAL``
+    seconds, or as soon as a full batch is waiting. Past
+    ``AUDIT_BUFFER_SIZE`` waiting entries new ones are dropped and counted,
+    so a stalled database costs audit entries, not requests. Entries still
+    buffered at exit are written then; a crash loses at most one interval.
+    With ``AUDIT_FLUSH_INTERVAL`` at 0 no thread is started and ``flush``
+    is called by hand (tests).
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.interval = app.config['AUDIT_FLUSH_INTERVAL']
+        self.batch_size = app.config['AUDIT_BATCH_SIZE']
+        self.max_size = app.config['AUDIT_BUFFER_SIZE']
+        self.dropped = 0
+        self._reported = 0
+        self._buffer = collections.deque()
+        self._lock = threading.Lock()
+        self._writing = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def add(self, entries, actor):
+        now = _utcnow()
+        with self._lock:
+            room = max(self.max_size - len(self._buffer), 0)
+            if len(entries) > room:
+                self.dropped += len(entries) - room
+                entries = entries[:room]
+            self._buffer.extend((now, actor, entry) for entry in entries)
+            waiting = len(self._buffer)
+            if self.interval and self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='audit', daemon=True)
+                self._thread.start()
+                atexit.register(self._flush_at_exit)
+        if waiting >= self.batch_size:
+            self._wake.set()
+
+    def pending(self):
+        with self._lock:
+            return len(self._buffer)
+
+    def flush(self):
+        """Write what is buffered now to Audit_Log; returns how many entries were written.
+
+        A batch that fails to write goes back to the front of the buffer.
+        """
+        written = 0
+        with self._writing:
+            remaining = self.pending()
+            while remaining > 0:
+                with self._lock:
+                    batch = [self._buffer.popleft() for _ in range(min(self.batch_size, remaining, len(self._buffer)))]
+                if not batch:
+                    break
+                try:
+                    with self.app.app_context(), db.engine.begin() as connection:
+                        connection.execute(insert(AUDIT), [_audit_row(*item) for item in batch])
+                        bump_versions(connection)
+                except Exception:
+                    with self._lock:
+                        self._buffer.extendleft(reversed(batch))
+                    raise
+                written += len(batch)
+                remaining -= len(batch)
+        return written
+
+    def _report_dropped(self):
+        dropped = self.dropped
+        if dropped > self._reported:
+            logger.warning('Audit buffer full: %d entries dropped', dropped - self._reported)
+            self._reported = dropped
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Audit flush failed')
+            self._report_dropped()
+
+    def _flush_at_exit(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('Audit flush at exit failed')
+        self._report_dropped()
+
+
+def init_audit(app):
+    if app.config['AUDIT_ENABLED']:
+        app.extensions['audit'] = AuditWriter(app)
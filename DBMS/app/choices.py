@@ -0,0 +1,80 @@
+from flask import current_app
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session
+
+from app import cache, db
+from app.models import Emergency_Event, Affected_Area, Team, Task
+
+# Choice list name -> (value column, label column). Lists are ordered by label,
+# as the forms always showed them.
+CHOICE_LISTS = {
+    'tasks': (Task.task_id, Task.task_name),
+    'teams': (Team.team_id, Team.team_name),
+    'areas': (Affected_Area.area_id, Affected_Area.location),
+    'events': (Emergency_Event.eme_id, Emergency_Event.disaster_type),
+}
+
+# Which lists go stale when a model's rows change. Removing an event also
+# removes its areas.
+INVALIDATES = {
+    Task: ('tasks',),
+    Team: ('teams',),
+    Affected_Area: ('areas',),
+    Emergency_Event: ('events', 'areas'),
+}
+
+
+def _key(name):
+    return f'choices:{name}'
+
+
+def choices(name):
+    """``(value, label)`` pairs for a SelectField, served from the cache."""
+    cached = cache.get(_key(name))
+    if cached is None:
+        value, label = CHOICE_LISTS[name]
+        cached = [tuple(row) for row in db.session.execute(select(value, label).order_by(label))]
+        cache.set(_key(name), cached, timeout=current_app.config['CHOICES_CACHE_TIMEOUT'])
+    return cached
+
+
+def invalidate_choices(*names):
+    """Drop the named choice lists (all of them if none are given)."""
+    # One delete per key: delete_many stops at the first key that is not cached.
+    for name in names or CHOICE_LISTS:
+        cache.delete(_key(name))
+
+
+def _pending(session):
+    return session.info.setdefault('stale_choices', set())
+
+
+def _mark_stale(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        _pending(session).update(INVALIDATES[mapper.class_])
+
+
+def _mark_bulk_stale(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and mapper.class_ in INVALIDATES:
+            _pending(orm_execute_state.session).update(INVALIDATES[mapper.class_])
+
+
+def _after_commit(session):
+    stale = session.info.pop('stale_choices', None)
+    if stale:
+        invalidate_choices(*stale)
+
+
+def _after_soft_rollback(session, previous_transaction):
+    session.info.pop('stale_choices', None)
+
+
+for model in INVALIDATES:
+    for name in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(model, name, _mark_stale)
+event.listen(Session, 'do_orm_execute', _mark_bulk_stale)
+event.listen(Session, 'after_commit', _after_commit)
+event.listen(Session, 'after_soft_rollback', _after_soft_rollback)
@@ -0,0 +1,105 @@
+import datetime
+import json
+import time
+
+import click
+
+from app.intake import IMPORTERS, import_records, detect_format
+from app.summaries import rebuild_summaries
+from app.search import rebuild_search_index
+from app.feed import prune_changes
+from app.archive import ArchiveError, closed_before, start_archiving, start_restoring
+from app.planner import PlannerUnavailable, plan_allocation, plan_csv
+
+
+def register_commands(app):
+    @app.cli.command('import-records')
+    @click.argument('entity', type=click.Choice(sorted(IMPORTERS)))
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']),
+                  help='Defaults to csv for *.csv files and ndjson otherwise.')
+    @click.option('--chunk-size', type=int, help='Rows per transaction (IMPORT_CHUNK_SIZE).')
+    @click.option('--report', 'report_path', type=click.Path(dir_okay=False, writable=True),
+                  help='Write the full JSON error report here.')
+    def import_records_command(entity, path, fmt, chunk_size, report_path):
+        """Bulk-load individuals, donations or evacuations from CSV/NDJSON."""
+        started = time.perf_counter()
+        with open(path, 'rb') as stream:
+            report = import_records(entity, stream, fmt or detect_format(path), chunk_size)
+        elapsed = time.perf_counter() - started
+        click.echo(f'Inserted {report.inserted} {entity}, rejected {report.rejected} '
+                   f'in {elapsed:.1f}s.')
+        for error in report.errors[:20]:
+            click.echo(f"  line {error['line']}: {error['errors']}", err=True)
+        if report_path:
+            with open(report_path, 'w') as fh:
+                json.dump(report.to_dict(), fh, indent=2)
+
+    @app.cli.command('rebuild-summaries')
+    @click.option('--event', 'event_ids', type=int, multiple=True, help='Only this event (repeatable).')
+    def rebuild_summaries_command(event_ids):
+        """Recompute the per-event dashboard rollups from the base tables."""
+        started = time.perf_counter()
+        rebuild_summaries(list(event_ids) or None)
+        click.echo(f'Rebuilt summaries in {time.perf_counter() - started:.1f}s.')
+
+    @app.cli.command('rebuild-search-index')
+    def rebuild_search_index_command():
+        """Repopulate the individual/area text search index."""
+        started = time.perf_counter()
+        rebuild_search_index()
+        click.echo(f'Rebuilt search index in {time.perf_counter() - started:.1f}s.')
+
+    @app.cli.command('prune-change-log')
+    @click.option('--hours', type=int, help='Keep this many hours (CHANGE_FEED_RETENTION_HOURS).')
+    def prune_change_log_command(hours):
+        """Delete live feed outbox rows older than the retention window."""
+        hours = hours if hours is not None else app.config['CHANGE_FEED_RETENTION_HOURS']
+        removed = prune_changes(datetime.timedelta(hours=hours))
+        click.echo(f'Removed {removed} change log rows older than {hours}h.')
+
+    @app.cli.command('archive-events')
+    @click.option('--event', 'event_ids', type=int, multiple=True, help='Only this closed event (repeatable).')
+    @click.option('--days', type=int, help='Events closed at least this many days ago (ARCHIVE_AFTER_DAYS).')
+    def archive_events_command(event_ids, days):
+        """Move closed events and everything under them to the archive tables."""
+        if not event_ids:
+            days = days if days is not None else app.config['ARCHIVE_AFTER_DAYS']
+            event_ids = closed_before(datetime.timedelta(days=days))
+        for event_id in event_ids:
+            try:
+                moved = start_archiving(event_id).run(app.config['DELETE_CHUNK_SIZE'], commit_chunks=True)
+            except ArchiveError as exc:
+                click.echo(f'Event {event_id}: {exc}', err=True)
+                continue
+            click.echo(f'Archived event {event_id} ({moved} rows).')
+
+    @app.cli.command('restore-event')
+    @click.argument('event_id', type=int)
+    def restore_event_command(event_id):
+        """Move an archived event back to the operational tables."""
+        try:
+            restoring = start_restoring(event_id)
+        except ArchiveError as exc:
+            raise click.ClickException(str(exc))
+        moved = restoring.run(app.config['DELETE_CHUNK_SIZE'], commit_chunks=True)
+        click.echo(f'Restored event {event_id} ({moved} rows).')
+
+    @app.cli.command('plan-allocation')
+    @click.option('--event', 'event_id', type=int, help='Only the areas of this event.')
+    @click.option('--output', type=click.Path(dir_okay=False, writable=True),
+                  help='Write every shipment to this CSV file.')
+    def plan_allocation_command(event_id, output):
+        """Plan which team sends how much of each resource type to each area."""
+        try:
+            plan, timings = plan_allocation(event_id)
+        except PlannerUnavailable as exc:
+            raise click.ClickException(str(exc))
+        click.echo(f"Planned {len(plan)} shipments in {timings['allocate_ms']:.0f} ms "
+                   f"(loaded in {timings['load_ms']:.0f} ms).")
+        for row in plan.summary():
+            click.echo(f"  {row['resource_type']}: sent {row['sent']} of {row['needed']} units, "
+                       f"{row['short_areas']} areas short")
+        if output:
+            with open(output, 'w', newline='') as fh:
+                fh.write(plan_csv(plan))
@@ -0,0 +1,307 @@
+import threading
+from collections import defaultdict
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect, or_, select
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import Emergency_Event, Task, Team, Resource, Team_Has_Resource, event_requires_task, task_doneby_team
+from app.versions import VERSIONS
+
+EVENT_TASKS = event_requires_task
+TEAM_TASKS = task_doneby_team
+TEAM_STOCK = Team_Has_Resource.__table__
+TABLES = (EVENT_TASKS.name, TEAM_TASKS.name, TEAM_STOCK.name)
+
+# Per model: {relationship: (link table, id column)} whose changes reload the
+# owner's links, and the (table, column) pairs to reload when a row is deleted.
+TRACKED = {
+    Emergency_Event: {'tasks': (EVENT_TASKS.name, 'event_id')},
+    Task: {'events': (EVENT_TASKS.name, 'task_id'), 'teams': (TEAM_TASKS.name, 'task_id')},
+    Team: {'tasks': (TEAM_TASKS.name, 'team_id')},
+}
+ON_DELETE = {
+    Emergency_Event: [(EVENT_TASKS.name, 'event_id')],
+    Task: [(EVENT_TASKS.name, 'task_id'), (TEAM_TASKS.name, 'task_id')],
+    Team: [(TEAM_TASKS.name, 'team_id'), (TEAM_STOCK.name, 'team_id')],
+    Resource: [(TEAM_STOCK.name, 'res_id')],
+}
+
+
+def _count(mask):
+    return bin(mask).count('1')
+
+
+def _versions(connection):
+    rows = connection.execute(select(VERSIONS.c.table_name, VERSIONS.c.version)
+                              .where(VERSIONS.c.table_name.in_(TABLES)))
+    versions = dict(rows.all())
+    return tuple(versions.get(name, 0) for name in TABLES)
+
+
+class CoverageIndex:
+    """Which tasks each event needs and each team does, as bitsets over task ids.
+
+    A team is *equipped* when it holds some quantity of any resource. A
+    required task is *ready* when an equipped team does it, *unequipped*
+    when only teams without resources do, and *uncovered* otherwise.
+
+    The index is per worker. It remembers the ``Table_Version`` of the
+    link tables it reflects: commits made through this worker's sessions
+    reload only the events, tasks and teams they touched; anything else
+    (another worker, a bulk or raw write) rebuilds it on the next read.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.versions = None
+        self.dirty = defaultdict(set)
+        self._clear()
+
+    def _clear(self):
+        self.task_bit = {}
+        self.task_ids = []
+        self.event_tasks = {}
+        self.team_tasks = {}
+        self.team_stock = defaultdict(dict)
+        self.dirty.clear()
+
+    def _bit(self, task_id):
+        bit = self.task_bit.get(task_id)
+        if bit is None:
+            bit = self.task_bit[task_id] = 1 << len(self.task_ids)
+            self.task_ids.append(task_id)
+        return bit
+
+    def tasks(self, mask):
+        """Task ids of the bits set in ``mask``."""
+        ids = []
+        while mask:
+            low = mask & -mask
+            ids.append(self.task_ids[low.bit_length() - 1])
+            mask ^= low
+        return sorted(ids)
+
+    def mask(self, task_ids):
+        return sum(self.task_bit.get(task_id, 0) for task_id in set(task_ids))
+
+    # --- Loading ---
+
+    def _load(self, connection, where=None):
+        def rows(table, column, other):
+            query = select(table.c[column], table.c[other], *([table.c.quantity] if table is TEAM_STOCK else []))
+            clauses = (where or {}).get(table.name)
+            if where is not None:
+                if not clauses:
+                    return []
+                query = query.where(or_(*(table.c[key].in_(ids) for key, ids in clauses.items())))
+            return connection.execute(query)
+
+        for event_id, task_id in rows(EVENT_TASKS, 'event_id', 'task_id'):
+            self.event_tasks[event_id] = self.event_tasks.get(event_id, 0) | self._bit(task_id)
+        for team_id, task_id in rows(TEAM_TASKS, 'team_id', 'task_id'):
+            self.team_tasks[team_id] = self.team_tasks.get(team_id, 0) | self._bit(task_id)
+        for team_id, res_id, quantity in rows(TEAM_STOCK, 'team_id', 'res_id'):
+            self.team_stock[team_id][res_id] = quantity
+
+    def _forget(self, where):
+        event_tasks = where.get(EVENT_TASKS.name, {})
+        for event_id in event_tasks.get('event_id', ()):
+            self.event_tasks.pop(event_id, None)
+        gone = ~self.mask(event_tasks.get('task_id', ()))
+        self.event_tasks = {key: mask & gone for key, mask in self.event_tasks.items() if mask & gone}
+
+        team_tasks = where.get(TEAM_TASKS.name, {})
+        for team_id in team_tasks.get('team_id', ()):
+            self.team_tasks.pop(team_id, None)
+        gone = ~self.mask(team_tasks.get('task_id', ()))
+        self.team_tasks = {key: mask & gone for key, mask in self.team_tasks.items() if mask & gone}
+
+        stock = where.get(TEAM_STOCK.name, {})
+        for team_id in stock.get('team_id', ()):
+            self.team_stock.pop(team_id, None)
+        for res_id in stock.get('res_id', ()):
+            for held in self.team_stock.values():
+                held.pop(res_id, None)
+
+    def _derive(self):
+        self.equipped = {team_id for team_id, held in self.team_stock.items() if any(q > 0 for q in held.values())}
+        self.staffed = self.ready = 0
+        self.task_teams = defaultdict(list)
+        for team_id, mask in sorted(self.team_tasks.items()):
+            self.staffed |= mask
+            if team_id in self.equipped:
+                self.ready |= mask
+            for task_id in self.tasks(mask):
+                self.task_teams[task_id].append(team_id)
+
+    def sync(self):
+        """Bring the index up to date with the database (one version lookup when nothing changed)."""
+        with self.lock, db.engine.connect() as connection:
+            versions = _versions(connection)
+            if versions != self.versions:
+                self._clear()
+                self._load(connection)
+            elif self.dirty:
+                where = defaultdict(dict)
+                for (table, column), ids in self.dirty.items():
+                    where[table][column] = ids
+                self._forget(where)
+                self._load(connection, where)
+                self.dirty.clear()
+            else:
+                return self
+            self.versions = versions
+            self._derive()
+        return self
+
+    def note_commit(self, dirty, before, after):
+        """Record a local commit that moved the link tables from ``before`` to ``after``."""
+        with self.lock:
+            if self.versions is not None and self.versions == before:
+                for key, ids in dirty.items():
+                    self.dirty[key].update(ids)
+                self.versions = after
+
+    # --- Queries ---
+
+    def gaps(self, event_id):
+        """``(required, unequipped, uncovered)`` task masks of one event."""
+        required = self.event_tasks.get(event_id, 0)
+        return required, required & self.staffed & ~self.ready, required & ~self.staffed
+
+    def events_with_gaps(self):
+        """``{event id: mask of required tasks no equipped team does}``."""
+        return {event_id: required & ~self.ready for event_id, required in self.event_tasks.items()
+                if required & ~self.ready}
+
+    def best_teams(self, mask, limit=5, equipped_only=True):
+        """Greedy cover of ``mask``: ``([(team id, mask it covers)], mask left over)``.
+
+        Each pick is the team doing the most still-uncovered tasks (ties
+        go to the lower team id).
+        """
+        candidates = {team_id: tasks & mask for team_id, tasks in self.team_tasks.items()
+                      if tasks & mask and (not equipped_only or team_id in self.equipped)}
+        picked = []
+        while mask and candidates and len(picked) < limit:
+            team_id = max(candidates, key=lambda t: (_count(candidates[t] & mask), -t))
+            covered = candidates.pop(team_id) & mask
+            if not covered:
+                break
+            picked.append((team_id, covered))
+            mask &= ~covered
+        return picked, mask
+
+
+def coverage_index():
+    """This worker's index, synced with the database."""
+    return current_app.extensions['coverage'].sync()
+
+
+def readiness(event_id):
+    """Status and teams of each task ``event_id`` requires, and equipped teams to send.
+
+    ``suggested`` is a small set of equipped teams that between them do
+    every required task they can; ``unfixable`` are the tasks none does.
+    """
+    index = coverage_index()
+    with index.lock:
+        required, unequipped, uncovered = index.gaps(event_id)
+        tasks = []
+        for task_id in index.tasks(required):
+            bit = index.task_bit[task_id]
+            status = 'uncovered' if bit & uncovered else 'unequipped' if bit & unequipped else 'ready'
+            teams = index.task_teams.get(task_id, [])
+            tasks.append({'task_id': task_id, 'status': status, 'teams': teams,
+                          'equipped_teams': [team_id for team_id in teams if team_id in index.equipped]})
+        suggested, left = index.best_teams(required)
+        return {'tasks': tasks,
+                'counts': {status: sum(task['status'] == status for task in tasks)
+                           for status in ('ready', 'unequipped', 'uncovered')},
+                'suggested': [(team_id, index.tasks(covered)) for team_id, covered in suggested],
+                'unfixable': index.tasks(left)}
+
+
+def init_coverage(app):
+    app.extensions['coverage'] = CoverageIndex()
+
+
+# --- Change tracking ---
+
+def _dirty(session):
+    return session.info.setdefault('coverage_dirty', defaultdict(set))
+
+
+def _pk(state):
+    # New rows have their key by now, but no identity until the flush ends.
+    return state.mapper.primary_key_from_instance(state.obj())[0]
+
+
+def _after_flush(session, flush_context):
+    dirty = _dirty(session)
+    for obj in session.new | session.dirty:
+        if isinstance(obj, Team_Has_Resource):
+            dirty[TEAM_STOCK.name, 'team_id'].add(obj.team_id)
+            continue
+        state = inspect(obj)
+        for key, target in TRACKED.get(type(obj), {}).items():
+            if state.attrs[key].history.has_changes():
+                dirty[target].add(_pk(state))
+    for obj in session.deleted:
+        if isinstance(obj, Team_Has_Resource):
+            dirty[TEAM_STOCK.name, 'team_id'].add(obj.team_id)
+            continue
+        for target in ON_DELETE.get(type(obj), ()):
+            dirty[target].add(_pk(inspect(obj)))
+    if not dirty:
+        session.info.pop('coverage_dirty')
+
+
+def _link_statement(orm_execute_state):
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    table = getattr(orm_execute_state.statement, 'table', None)
+    if table is None or table.name not in TABLES:
+        return
+    # sync_links names the owner whose links it rewrites; other statements
+    # could touch any row.
+    owner = orm_execute_state.execution_options.get('link_owner')
+    if owner is None:
+        orm_execute_state.session.info['coverage_unknown'] = True
+    else:
+        column, owner_id = owner
+        _dirty(orm_execute_state.session)[table.name, column].add(owner_id)
+
+
+def _before_commit(session):
+    # Runs after app.versions has bumped the counters of what this
+    # transaction wrote, so these are the versions our changes produce.
+    if session.info.get('coverage_dirty') and not session.info.get('coverage_unknown'):
+        session.info['coverage_versions'] = _versions(session.connection())
+
+
+def _after_commit(session):
+    dirty = session.info.pop('coverage_dirty', None)
+    after = session.info.pop('coverage_versions', None)
+    session.info.pop('coverage_unknown', None)
+    bumped = session.info.get('bumped_tables', ())
+    if not dirty or after is None or not has_app_context():
+        return
+    index = current_app.extensions.get('coverage')
+    if index is not None:
+        before = tuple(version - (name in bumped) for name, version in zip(TABLES, after))
+        index.note_commit(dirty, before, after)
+
+
+def _after_soft_rollback(session, previous_transaction):
+    for key in ('coverage_dirty', 'coverage_versions', 'coverage_unknown'):
+        session.info.pop(key, None)
+
+
+event.listen(Session, 'after_flush', _after_flush)
+event.listen(Session, 'do_orm_execute', _link_statement)
+event.listen(Session, 'before_commit', _before_commit)
+event.listen(Session, 'after_commit', _after_commit)
+event.listen(Session, 'after_soft_rollback', _after_soft_rollback)
@@ -0,0 +1,222 @@
+import datetime
+import itertools
+import random
+
+from sqlalchemy import func, select, text
+
+from app import db
+from app.choices import invalidate_choices
+from app.summaries import rebuild_summaries
+from app.versions import bump_versions
+from app.models import (Emergency_Event, Affected_Area, Affected_Individual, Donation, Team, Task,
+                        Resource, Evacuation, Team_Has_Resource, Event_Summary, Event_Summary_Bucket,
+                        event_requires_task, task_doneby_team)
+
+# Rows per table at scale 1 and how fast each table grows with the scale
+# factor. Casualty-type tables grow linearly; catalogues and organisations
+# grow much more slowly, as they do in real incidents.
+BASE_ROWS = 20
+GROWTH = {
+    'events': 0.25,
+    'areas': 0.5,
+    'teams': 0.4,
+    'tasks': 0.2,
+    'resources': 0.2,
+    'individuals': 1.0,
+    'donations': 0.8,
+    'evacuations': 0.8,
+}
+
+DISASTER_TYPES = ['Flood', 'Earthquake', 'Hurricane', 'Fire', 'Tornado', 'Tsunami', 'Volcano', 'Drought']
+LOCATIONS = ['Downtown', 'Suburb', 'Rural Area', 'Coastal Zone', 'Mountain Region', 'City Center',
+             'Industrial Park', 'Residential Block']
+DAMAGE_EXTENTS = ['Minor', 'Moderate', 'Severe', 'Total']
+INJURY_TYPES = ['Broken Bone', 'Burn', 'Cut', 'Concussion', None]
+SEVERITIES = ['Mild', 'Moderate', 'Severe', None]
+DONATION_TYPES = ['Money', 'Supplies', 'Food', 'Medicine']
+EQUIPMENT = ['Vehicles, Tools', 'Medical Kits', 'Communication Devices', 'Heavy Machinery']
+TRANSPORTS = ['Bus', 'Truck', 'Helicopter', 'Boat']
+TASK_NAMES = ['Search and Rescue', 'Medical Aid', 'Food Distribution', 'Shelter Setup', 'Debris Removal',
+              'Water Supply', 'Power Restoration', 'Communication Setup']
+RESOURCE_TYPES = ['Water', 'Food', 'Medicine', 'Blankets', 'Generators', 'Vehicles', 'Fuel', 'Tools']
+FIRST_DAY = datetime.date(2020, 1, 1)
+
+# Children first, so deleting in this order never trips a foreign key.
+CLEAR_ORDER = [Event_Summary_Bucket.__table__, Event_Summary.__table__, Team_Has_Resource.__table__,
+               event_requires_task, task_doneby_team, Evacuation.__table__, Donation.__table__,
+               Affected_Individual.__table__, Affected_Area.__table__, Team.__table__, Task.__table__,
+               Resource.__table__, Emergency_Event.__table__]
+
+
+def row_counts(scale):
+    return {name: max(1, round(BASE_ROWS * scale ** exponent)) for name, exponent in GROWTH.items()}
+
+
+def _near(rng, point, spread):
+    """A point scattered about ``point`` by ``spread`` degrees, kept on the globe."""
+    latitude = min(90.0, max(-90.0, rng.gauss(point[0], spread)))
+    longitude = (rng.gauss(point[1], spread) + 180) % 360 - 180
+    return round(latitude, 6), round(longitude, 6)
+
+
+def _zipf_weights(rng, n, exponent=1.2):
+    """Heavy-tailed weights in random order: a few huge entries, many small ones."""
+    weights = [1.0 / (rank ** exponent) for rank in range(1, n + 1)]
+    rng.shuffle(weights)
+    return list(itertools.accumulate(weights))
+
+
+class _Writer:
+    def __init__(self, connection, chunk_size, echo):
+        self.connection = connection
+        self.chunk_size = chunk_size
+        self.echo = echo
+
+    def write(self, table, rows):
+        total = 0
+        while True:
+            chunk = list(itertools.islice(rows, self.chunk_size))
+            if not chunk:
+                break
+            self.connection.execute(table.insert(), chunk)
+            self.connection.commit()
+            total += len(chunk)
+        if self.echo:
+            self.echo(f'{table.name}: {total} rows')
+        return total
+
+
+def _reset_sequences(connection):
+    if connection.dialect.name != 'postgresql':
+        return
+    for table in CLEAR_ORDER:
+        pk = list(table.primary_key.columns)
+        if len(pk) != 1 or not pk[0].autoincrement:
+            continue
+        connection.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('\"{table.name}\"', '{pk[0].name}'), "
+            f"COALESCE((SELECT MAX(\"{pk[0].name}\") FROM \"{table.name}\"), 1))"))
+    connection.commit()
+
+
+def generate(scale=1, seed=42, chunk_size=10000, echo=None):
+    """Replace all non-user data with a deterministic synthetic dataset.
+
+    The same ``scale`` and ``seed`` always produce the same rows. Returns
+    the number of rows written per table.
+    """
+    rng = random.Random(seed)
+    # Coordinates have their own generator so the other columns stay what
+    # they were for a seed. Areas scatter about their event's centre,
+    # destinations about their area and team bases about some event.
+    places = random.Random(f'{seed}:places')
+    counts = row_counts(scale)
+    n_events, n_areas, n_teams = counts['events'], counts['areas'], counts['teams']
+    n_tasks, n_resources = counts['tasks'], counts['resources']
+    written = {}
+
+    with db.engine.connect() as connection:
+        for table in CLEAR_ORDER:
+            connection.execute(table.delete())
+        connection.commit()
+        writer = _Writer(connection, chunk_size, echo)
+
+        written['events'] = writer.write(Emergency_Event.__table__, (
+            {'eme_id': i, 'disaster_type': rng.choice(DISASTER_TYPES)}
+            for i in range(1, n_events + 1)))
+
+        event_ids = range(1, n_events + 1)
+        event_weights = _zipf_weights(rng, n_events)
+        area_events = rng.choices(event_ids, cum_weights=event_weights, k=n_areas)
+        populations = [max(50, int(rng.lognormvariate(8, 1.2))) for _ in range(n_areas)]
+        centres = [(places.uniform(-55, 70), places.uniform(-180, 180)) for _ in event_ids]
+        area_points = [_near(places, centres[event_id - 1], 0.5) for event_id in area_events]
+        written['areas'] = writer.write(Affected_Area.__table__, (
+            {'area_id': i + 1,
+             'location': f'{rng.choice(LOCATIONS)} {i + 1}',
+             'population': populations[i],
+             'damage_extent': rng.choice(DAMAGE_EXTENTS),
+             'start_date': FIRST_DAY + datetime.timedelta(days=rng.randrange(2000)),
+             'event_id': area_events[i],
+             'latitude': area_points[i][0], 'longitude': area_points[i][1]}
+            for i in range(n_areas)))
+
+        # Casualties, donations and evacuations follow area population, so the
+        # big events end up owning most of the rows.
+        area_ids = range(1, n_areas + 1)
+        area_weights = list(itertools.accumulate(populations))
+
+        def in_areas(k):
+            return iter(rng.choices(area_ids, cum_weights=area_weights, k=k))
+
+        areas = in_areas(counts['individuals'])
+        written['individuals'] = writer.write(Affected_Individual.__table__, (
+            {'individual_id': i, 'name': f'Person {i}', 'injury_type': rng.choice(INJURY_TYPES),
+             'severity': rng.choice(SEVERITIES), 'area_id': next(areas)}
+            for i in range(1, counts['individuals'] + 1)))
+
+        areas = in_areas(counts['donations'])
+        written['donations'] = writer.write(Donation.__table__, (
+            {'donation_id': i, 'name': f'Donor {i}', 'type': rng.choice(DONATION_TYPES),
+             'amount': round(rng.uniform(100, 10000), 2) if rng.random() < 0.5 else None,
+             'area_id': next(areas)}
+            for i in range(1, counts['donations'] + 1)))
+
+        def team(i):
+            row = {'team_id': i, 'team_name': f'Team {i}', 'team_leader': f'Leader {i}',
+                   'personnel': rng.randint(5, 50), 'equipment': rng.choice(EQUIPMENT)}
+            row['latitude'], row['longitude'] = _near(places, places.choice(centres), 1.0)
+            return row
+
+        written['teams'] = writer.write(Team.__table__, (team(i) for i in range(1, n_teams + 1)))
+
+        areas = in_areas(counts['evacuations'])
+
+        def evacuation(i):
+            row = {'eva_id': i, 'destination': f'Safe Zone {i}', 'location': rng.choice(LOCATIONS),
+                   'transport': rng.choice(TRANSPORTS), 'area_id': next(areas),
+                   'team_id': rng.randint(1, n_teams) if rng.random() < 0.5 else None}
+            row['latitude'], row['longitude'] = _near(places, area_points[row['area_id'] - 1], 0.2)
+            return row
+
+        written['evacuations'] = writer.write(Evacuation.__table__, (
+            evacuation(i) for i in range(1, counts['evacuations'] + 1)))
+
+        written['tasks'] = writer.write(Task.__table__, (
+            {'task_id': i, 'task_name': f'{rng.choice(TASK_NAMES)} {i}'}
+            for i in range(1, n_tasks + 1)))
+
+        written['resources'] = writer.write(Resource.__table__, (
+            {'res_id': i, 'type': rng.choice(RESOURCE_TYPES)}
+            for i in range(1, n_resources + 1)))
+
+        # Association rows are sampled without replacement per owner, so
+        # there are no duplicates to look up.
+        written['event_tasks'] = writer.write(event_requires_task, (
+            {'event_id': event_id, 'task_id': task_id}
+            for event_id in event_ids
+            for task_id in rng.sample(range(1, n_tasks + 1), min(n_tasks, rng.randint(1, 5)))))
+
+        written['team_tasks'] = writer.write(task_doneby_team, (
+            {'task_id': task_id, 'team_id': team_id}
+            for team_id in range(1, n_teams + 1)
+            for task_id in rng.sample(range(1, n_tasks + 1), min(n_tasks, rng.randint(1, 3)))))
+
+        written['team_resources'] = writer.write(Team_Has_Resource.__table__, (
+            {'team_id': team_id, 'res_id': res_id, 'quantity': rng.randint(1, 100)}
+            for team_id in range(1, n_teams + 1)
+            for res_id in rng.sample(range(1, n_resources + 1), min(n_resources, rng.randint(1, 5)))))
+
+        bump_versions(connection)
+        connection.commit()
+        _reset_sequences(connection)
+    # Rows were written with Core, so the ORM events never saw them.
+    invalidate_choices()
+    rebuild_summaries()
+    return written
+
+
+def table_sizes():
+    """Current row count of every generated table, for sanity checks."""
+    return {table.name: db.session.execute(select(func.count()).select_from(table)).scalar()
+            for table in reversed(CLEAR_ORDER)}
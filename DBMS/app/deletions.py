@@ -0,0 +1,193 @@
+import datetime
+import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app, g
+from sqlalchemy import delete, func, select
+
+from app import cache, db
+from app.audit import current_actor
+from app.feed import AREA_CHILDREN, ENTITIES, record_deletes
+from app.models import Emergency_Event, Affected_Area, Event_Summary, Event_Summary_Bucket, event_requires_task
+from app.summaries import remove_rows
+
+logger = logging.getLogger('app.deletions')
+
+ACTIVE = ('queued', 'running')
+
+
+def _utcnow():
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+
+class Deletion:
+    """An event or area and everything under it, removed with set-based statements.
+
+    ``steps`` are ``(model, where)`` pairs run in order, children before
+    their areas; each deletes ``chunk_size`` rows per statement by primary
+    key. Bulk deletes skip the mapper events, so every chunk is first
+    taken out of the summaries and logged to the live feed and the audit
+    trail here. The
+    foreign keys' ON DELETE CASCADE is the backstop for anything else.
+    ``finish`` statements run once the steps are done.
+    """
+
+    def __init__(self, kind, target_id, steps, finish=()):
+        self.kind = kind
+        self.target_id = target_id
+        self.steps = steps
+        self.finish = finish
+
+    def count(self):
+        """Rows the steps will delete."""
+        return sum(db.session.execute(select(func.count()).select_from(model).where(where)).scalar()
+                   for model, where in self.steps)
+
+    def run(self, chunk_size, commit_chunks=False, progress=None):
+        """Delete everything; with ``commit_chunks`` each chunk is its own transaction.
+
+        A chunked run that stops halfway leaves a consistent, smaller
+        event or area behind, and running it again finishes the job.
+        """
+        deleted = 0
+        for model, where in self.steps:
+            table = model.__table__
+            columns = [table.c[key] for key in ENTITIES[model][1]]
+            pk = columns[0]
+            while True:
+                rows = [dict(row._mapping) for row in db.session.execute(
+                    select(*columns).where(where).order_by(pk).limit(chunk_size))]
+                if not rows:
+                    break
+                ids = [row[pk.key] for row in rows]
+                remove_rows(db.session.connection(), model, rows)
+                record_deletes(db.session, model, rows)
+                self.before_delete(model, ids)
+                db.session.execute(delete(model).where(pk.in_(ids)), execution_options={'audit_rows': rows})
+                deleted += len(rows)
+                if commit_chunks:
+                    db.session.commit()
+                if progress is not None:
+                    progress(deleted)
+        for statement, options in self.finish:
+            db.session.execute(statement, execution_options=options)
+        db.session.commit()
+        return deleted
+
+    def before_delete(self, model, ids):
+        """Called with each chunk's primary keys just before the rows are deleted."""
+
+
+def event_deletion(event_id):
+    areas = select(Affected_Area.area_id).where(Affected_Area.event_id == event_id)
+    steps = [(model, model.area_id.in_(areas)) for model in AREA_CHILDREN]
+    steps.append((Affected_Area, Affected_Area.event_id == event_id))
+    finish = [
+        # link_owner lets the coverage index reload just this event's tasks.
+        (delete(event_requires_task).where(event_requires_task.c.event_id == event_id),
+         {'link_owner': ('event_id', event_id)}),
+        (delete(Event_Summary_Bucket).where(Event_Summary_Bucket.event_id == event_id), {}),
+        (delete(Event_Summary).where(Event_Summary.event_id == event_id), {}),
+        (delete(Emergency_Event).where(Emergency_Event.eme_id == event_id), {}),
+    ]
+    return Deletion('event', event_id, steps, finish)
+
+
+def area_deletion(area_id):
+    steps = [(model, model.area_id == area_id) for model in AREA_CHILDREN]
+    steps.append((Affected_Area, Affected_Area.area_id == area_id))
+    return Deletion('area', area_id, steps)
+
+
+# --- Background jobs ---
+
+def _job_key(job_id):
+    return f'deletion-job:{job_id}'
+
+
+def _target_key(deletion):
+    return f'deletion-target:{deletion.kind}:{deletion.target_id}'
+
+
+def deletion_job(job_id):
+    """The state of a background deletion, or None once it has expired."""
+    return cache.get(_job_key(job_id))
+
+
+class DeletionJobs:
+    """Runs large deletions on this worker's background thread.
+
+    Job state is kept in the app cache, so any worker sharing the cache
+    (see CACHE_TYPE) can report progress. With ``DELETE_JOB_THREADS`` at
+    0 jobs run inline when started (tests).
+    """
+
+    def __init__(self, app):
+        self.app = app
+        threads = app.config['DELETE_JOB_THREADS']
+        self.executor = ThreadPoolExecutor(threads, thread_name_prefix='deletion') if threads else None
+        self.futures = {}
+
+    def _save(self, job):
+        cache.set(_job_key(job['id']), dict(job), timeout=self.app.config['DELETE_JOB_KEEP_SECONDS'])
+
+    def start(self, deletion, total):
+        """Queue ``deletion`` unless the same target is already being deleted; returns the job."""
+        running = cache.get(_target_key(deletion))
+        job = running and deletion_job(running)
+        if job and job['status'] in ACTIVE:
+            return job
+        job = {'id': uuid.uuid4().hex, 'kind': deletion.kind, 'target_id': deletion.target_id,
+               'status': 'queued', 'deleted': 0, 'total': total, 'error': None,
+               'started_at': _utcnow().isoformat(), 'finished_at': None}
+        self._save(job)
+        cache.set(_target_key(deletion), job['id'], timeout=self.app.config['DELETE_JOB_KEEP_SECONDS'])
+        actor = current_actor()
+        if self.executor is None:
+            self._run(job, deletion, actor)
+        else:
+            self.futures[job['id']] = self.executor.submit(self._run, job, deletion, actor)
+        return job
+
+    def _run(self, job, deletion, actor):
+        with self.app.app_context():
+            g.audit_actor = actor
+            job['status'] = 'running'
+            self._save(job)
+
+            def progress(deleted):
+                job['deleted'] = deleted
+                self._save(job)
+
+            try:
+                deletion.run(self.app.config['DELETE_CHUNK_SIZE'], commit_chunks=True, progress=progress)
+            except Exception as error:
+                db.session.rollback()
+                logger.exception('Deleting %s %s failed', deletion.kind, deletion.target_id)
+                job.update(status='failed', error=str(error))
+            else:
+                job['status'] = 'done'
+            job['finished_at'] = _utcnow().isoformat()
+            self._save(job)
+
+    def wait(self, job_id, timeout=None):
+        future = self.futures.pop(job_id, None)
+        if future is not None:
+            future.result(timeout)
+
+
+def delete_now_or_later(deletion):
+    """Delete small targets in this request; start a background job for large ones.
+
+    Returns the job, or None when the rows are already gone.
+    """
+    total = deletion.count()
+    if total > current_app.config['DELETE_BACKGROUND_ROWS']:
+        return current_app.extensions['deletions'].start(deletion, total)
+    deletion.run(current_app.config['DELETE_CHUNK_SIZE'])
+    return None
+
+
+def init_deletions(app):
+    app.extensions['deletions'] = DeletionJobs(app)
@@ -0,0 +1,157 @@
+import csv
+import io
+import json
+import zlib
+
+from flask import current_app
+from sqlalchemy import select
+
+from app.models import (Emergency_Event, Affected_Area, Affected_Individual, Donation, Team, Task,
+                        Resource, Evacuation, Team_Has_Resource, event_requires_task, task_doneby_team)
+from app.replicas import connect_for_reading
+
+
+def _events():
+    return select(Emergency_Event.eme_id, Emergency_Event.disaster_type).order_by(Emergency_Event.eme_id)
+
+
+def _areas():
+    return (select(Affected_Area.area_id, Affected_Area.location, Affected_Area.population,
+                   Affected_Area.damage_extent, Affected_Area.start_date, Affected_Area.event_id,
+                   Emergency_Event.disaster_type.label('event_type'))
+            .join(Emergency_Event, Affected_Area.event_id == Emergency_Event.eme_id)
+            .order_by(Affected_Area.area_id))
+
+
+def _individuals():
+    return (select(Affected_Individual.individual_id, Affected_Individual.name,
+                   Affected_Individual.injury_type, Affected_Individual.severity,
+                   Affected_Individual.area_id, Affected_Area.location.label('area_location'),
+                   Affected_Area.event_id, Emergency_Event.disaster_type.label('event_type'))
+            .join(Affected_Area, Affected_Individual.area_id == Affected_Area.area_id)
+            .join(Emergency_Event, Affected_Area.event_id == Emergency_Event.eme_id)
+            .order_by(Affected_Individual.individual_id))
+
+
+def _donations():
+    return (select(Donation.donation_id, Donation.name, Donation.type, Donation.amount,
+                   Donation.area_id, Affected_Area.location.label('area_location'),
+                   Affected_Area.event_id, Emergency_Event.disaster_type.label('event_type'))
+            .join(Affected_Area, Donation.area_id == Affected_Area.area_id)
+            .join(Emergency_Event, Affected_Area.event_id == Emergency_Event.eme_id)
+            .order_by(Donation.donation_id))
+
+
+def _evacuations():
+    return (select(Evacuation.eva_id, Evacuation.destination, Evacuation.location, Evacuation.transport,
+                   Evacuation.area_id, Affected_Area.location.label('area_location'),
+                   Evacuation.team_id, Team.team_name)
+            .join(Affected_Area, Evacuation.area_id == Affected_Area.area_id)
+            .outerjoin(Team, Evacuation.team_id == Team.team_id)
+            .order_by(Evacuation.eva_id))
+
+
+def _teams():
+    return (select(Team.team_id, Team.team_name, Team.team_leader, Team.personnel, Team.equipment)
+            .order_by(Team.team_id))
+
+
+def _tasks():
+    return select(Task.task_id, Task.task_name).order_by(Task.task_id)
+
+
+def _resources():
+    return select(Resource.res_id, Resource.type).order_by(Resource.res_id)
+
+
+def _team_resources():
+    return (select(Team_Has_Resource.team_id, Team.team_name, Team_Has_Resource.res_id,
+                   Resource.type.label('resource_type'), Team_Has_Resource.quantity)
+            .join(Team, Team_Has_Resource.team_id == Team.team_id)
+            .join(Resource, Team_Has_Resource.res_id == Resource.res_id)
+            .order_by(Team_Has_Resource.team_id, Team_Has_Resource.res_id))
+
+
+def _event_tasks():
+    return (select(event_requires_task.c.event_id, Emergency_Event.disaster_type.label('event_type'),
+                   event_requires_task.c.task_id, Task.task_name)
+            .join(Emergency_Event, event_requires_task.c.event_id == Emergency_Event.eme_id)
+            .join(Task, event_requires_task.c.task_id == Task.task_id)
+            .order_by(event_requires_task.c.event_id, event_requires_task.c.task_id))
+
+
+def _team_tasks():
+    return (select(task_doneby_team.c.team_id, Team.team_name, task_doneby_team.c.task_id, Task.task_name)
+            .join(Team, task_doneby_team.c.team_id == Team.team_id)
+            .join(Task, task_doneby_team.c.task_id == Task.task_id)
+            .order_by(task_doneby_team.c.team_id, task_doneby_team.c.task_id))
+
+
+# Export name -> function building its SELECT. User is deliberately absent.
+EXPORTS = {
+    'events': _events,
+    'areas': _areas,
+    'individuals': _individuals,
+    'donations': _donations,
+    'evacuations': _evacuations,
+    'teams': _teams,
+    'tasks': _tasks,
+    'resources': _resources,
+    'team_resources': _team_resources,
+    'event_tasks': _event_tasks,
+    'team_tasks': _team_tasks,
+}
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def _partitions(statement, batch_size):
+    """Yield the column names, then lists of at most ``batch_size`` rows.
+
+    Uses a server-side cursor where the driver has one, so only one batch
+    is ever held in memory.
+    """
+    with connect_for_reading() as connection:
+        result = connection.execution_options(stream_results=True, yield_per=batch_size).execute(statement)
+        yield list(result.keys())
+        for partition in result.partitions():
+            yield partition
+
+
+def _csv_chunks(partitions):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(next(partitions))
+    for rows in partitions:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def _ndjson_chunks(partitions):
+    columns = next(partitions)
+    for rows in partitions:
+        yield ''.join(json.dumps(dict(zip(columns, row)), default=str) + '\n' for row in rows).encode()
+
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(wbits=31)  # gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_chunks(entity, fmt, gzip=False, batch_size=None):
+    """Encoded chunks of the ``entity`` export, one per fetched batch."""
+    batch_size = batch_size or current_app.config['EXPORT_BATCH_SIZE']
+    partitions = _partitions(EXPORTS[entity](), batch_size)
+    chunks = _csv_chunks(partitions) if fmt == 'csv' else _ndjson_chunks(partitions)
+    return _gzip(chunks) if gzip else chunks
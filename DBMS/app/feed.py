@@ -0,0 +1,344 @@
+import datetime
+import json
+import queue
+import threading
+import time
+
+from flask import current_app, has_app_context
+from sqlalchemy import delete, event, func, insert, inspect, or_, select
+from sqlalchemy.orm import Session
+
+from app import db
+from app.api import dumps
+from app.models import Emergency_Event, Affected_Area, Affected_Individual, Donation, Evacuation, Change_Log
+from app.signals import bulk_inserted
+
+CHANGES = Change_Log.__table__
+
+# Model -> (feed entity name, columns sent with each change).
+ENTITIES = {
+    Affected_Individual: ('individuals', ['individual_id', 'name', 'injury_type', 'severity', 'area_id']),
+    Evacuation: ('evacuations', ['eva_id', 'destination', 'location', 'transport', 'area_id', 'team_id']),
+    Donation: ('donations', ['donation_id', 'name', 'type', 'amount', 'area_id']),
+    Affected_Area: ('areas', ['area_id', 'location', 'population', 'damage_extent', 'start_date', 'event_id']),
+}
+ENTITY_NAMES = [name for name, _ in ENTITIES.values()]
+# What hangs off an area and goes with it by ON DELETE CASCADE.
+AREA_CHILDREN = (Affected_Individual, Donation, Evacuation)
+
+# Ids skipped by the poller's cursor are retried this long in case their
+# transaction was still open (ids are handed out before commit).
+GAP_TIMEOUT = 10.0
+MAX_TRACKED_GAP = 1000
+# Browser reconnect delay sent with every stream, in milliseconds.
+RETRY_MS = 3000
+
+
+class FeedFull(Exception):
+    """This worker already serves ``CHANGE_FEED_MAX_CLIENTS`` streams."""
+
+
+def _utcnow():
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+
+# --- Capturing changes ---
+
+def _pending(session):
+    return session.info.setdefault('feed_changes', [])
+
+
+def _values(connection, mapper, target, columns, action):
+    state = inspect(target)
+    if action == 'insert':
+        # Columns left unset were inserted as NULL.
+        return {key: state.dict.get(key) for key in columns}
+    # Updated or deleted rows may have expired attributes; read those from the row.
+    values = {key: state.dict[key] for key in columns if key in state.dict}
+    missing = [key for key in columns if key not in values]
+    if missing:
+        table = mapper.local_table
+        row = connection.execute(select(*[table.c[key] for key in missing])
+                                 .where(mapper.primary_key[0] == state.identity[0])).first()
+        values.update(zip(missing, row or [None] * len(missing)))
+    return {key: values[key] for key in columns}
+
+
+def _capture(action):
+    def hook(mapper, connection, target):
+        entity, columns = ENTITIES[mapper.class_]
+        if action == 'update':
+            state = inspect(target)
+            if not any(state.attrs[key].history.has_changes() for key in columns):
+                return
+        values = _values(connection, mapper, target, columns, action)
+        _pending(inspect(target).session).append((entity, action, values[columns[0]], values))
+    return hook
+
+
+def _deleted(model, rows):
+    entity, columns = ENTITIES[model]
+    return [(entity, 'delete', row[columns[0]], {key: row[key] for key in columns}) for row in rows]
+
+
+def _capture_cascade(mapper, connection, target):
+    # The database deletes these rows itself (passive_deletes), so no mapper
+    # event sees them; read what the feed sends before they go.
+    if mapper.class_ is Emergency_Event:
+        areas = select(Affected_Area.area_id).where(Affected_Area.event_id == target.eme_id)
+        steps = [(model, model.area_id.in_(areas)) for model in AREA_CHILDREN]
+        steps.append((Affected_Area, Affected_Area.event_id == target.eme_id))
+    else:
+        steps = [(model, model.area_id == target.area_id) for model in AREA_CHILDREN]
+    pending = _pending(inspect(target).session)
+    for model, where in steps:
+        table = model.__table__
+        rows = connection.execute(select(*[table.c[key] for key in ENTITIES[model][1]]).where(where))
+        pending.extend(_deleted(model, [row._mapping for row in rows]))
+
+
+def _change_rows(connection, changes):
+    """Outbox rows for ``changes``, with each row's event resolved in one query."""
+    known = {values['area_id']: values['event_id'] for entity, _, _, values in changes if entity == 'areas'}
+    unknown = {values['area_id'] for _, _, _, values in changes} - set(known)
+    if unknown:
+        known.update(connection.execute(select(Affected_Area.area_id, Affected_Area.event_id)
+                                        .where(Affected_Area.area_id.in_(unknown))).all())
+    now = _utcnow()
+    return [{'entity': entity, 'action': action, 'row_id': row_id, 'area_id': values['area_id'],
+             'event_id': known.get(values['area_id']), 'payload': dumps(values).decode(), 'created_at': now}
+            for entity, action, row_id, values in changes]
+
+
+def _write(session, connection, changes):
+    connection.execute(insert(CHANGES), _change_rows(connection, changes))
+    session.info['feed_written'] = True
+
+
+def _after_flush(session, flush_context):
+    changes = session.info.pop('feed_changes', None)
+    if changes:
+        _write(session, session.connection(), changes)
+
+
+def _on_bulk_inserted(model, rows):
+    # Core inserts do not return the new ids; the change carries the values.
+    if model in ENTITIES:
+        entity, columns = ENTITIES[model]
+        changes = [(entity, 'insert', None, {key: row.get(key) for key in columns}) for row in rows]
+        _write(db.session, db.session.connection(), changes)
+
+
+def record_deletes(session, model, rows):
+    """Outbox deletes for ``rows`` (mappings with the feed's columns) removed by a set-based delete.
+
+    Call it while their areas still exist, so each change gets its event.
+    """
+    if model in ENTITIES and rows:
+        _write(session, session.connection(), _deleted(model, rows))
+
+
+def _after_commit(session):
+    if session.info.pop('feed_written', False) and has_app_context():
+        feed = current_app.extensions.get('change_feed')
+        if feed is not None:
+            feed.wake()
+
+
+def _after_soft_rollback(session, previous_transaction):
+    session.info.pop('feed_changes', None)
+    session.info.pop('feed_written', None)
+
+
+# Registered first: an area's children are logged before the area itself.
+event.listen(Emergency_Event, 'before_delete', _capture_cascade)
+event.listen(Affected_Area, 'before_delete', _capture_cascade)
+for model in ENTITIES:
+    event.listen(model, 'after_insert', _capture('insert'))
+    event.listen(model, 'after_update', _capture('update'))
+    event.listen(model, 'before_delete', _capture('delete'))
+event.listen(Session, 'after_flush', _after_flush)
+event.listen(Session, 'after_commit', _after_commit)
+event.listen(Session, 'after_soft_rollback', _after_soft_rollback)
+bulk_inserted.connect(_on_bulk_inserted)
+
+
+# --- Fan-out ---
+
+def _message(row):
+    """The SSE frame for an outbox row; built once and shared by every subscriber."""
+    data = (f'{{"id":{row.change_id},"entity":"{row.entity}","action":"{row.action}",'
+            f'"row_id":{json.dumps(row.row_id)},"area_id":{json.dumps(row.area_id)},'
+            f'"event_id":{json.dumps(row.event_id)},"data":{row.payload}}}')
+    return {'change_id': row.change_id, 'entity': row.entity, 'area_id': row.area_id,
+            'event_id': row.event_id,
+            'message': f'id: {row.change_id}\nevent: {row.entity}\ndata: {data}\n\n'}
+
+
+class Subscription:
+    """One connected client: its filters and the queue the poller fills."""
+
+    def __init__(self, entities, event_ids, area_ids, maxsize):
+        self.entities = set(entities or ENTITY_NAMES)
+        self.event_ids = set(event_ids)
+        self.area_ids = set(area_ids)
+        self.queue = queue.Queue(maxsize)
+        self.overflowed = False
+        self.sent = set()
+
+    def matches(self, change):
+        return (change['entity'] in self.entities
+                and (not self.event_ids or change['event_id'] in self.event_ids)
+                and (not self.area_ids or change['area_id'] in self.area_ids))
+
+    def push(self, change):
+        try:
+            self.queue.put_nowait(change)
+        except queue.Full:
+            # A stalled client; its stream ends and it resumes by Last-Event-ID.
+            self.overflowed = True
+
+    def filter(self, statement):
+        statement = statement.where(CHANGES.c.entity.in_(self.entities))
+        if self.event_ids:
+            statement = statement.where(CHANGES.c.event_id.in_(self.event_ids))
+        if self.area_ids:
+            statement = statement.where(CHANGES.c.area_id.in_(self.area_ids))
+        return statement
+
+
+class ChangeFeed:
+    """Per-process fan-out of committed changes to SSE subscribers.
+
+    A single thread reads new Change_Log rows past its cursor and copies
+    each to the queue of every matching subscriber, so the database sees
+    one poll per worker however many clients are connected. Local commits
+    wake it early. With ``CHANGE_FEED_POLL_INTERVAL`` at 0 no thread is
+    started and ``poll`` is called by hand (tests).
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.interval = app.config['CHANGE_FEED_POLL_INTERVAL']
+        self.batch_size = app.config['CHANGE_FEED_BATCH_SIZE']
+        self.backlog_size = app.config['CHANGE_FEED_BACKLOG']
+        self.queue_size = app.config['CHANGE_FEED_QUEUE_SIZE']
+        self.keepalive = app.config['CHANGE_FEED_KEEPALIVE']
+        self.max_clients = app.config['CHANGE_FEED_MAX_CLIENTS']
+        self.max_stream = app.config['CHANGE_FEED_MAX_STREAM_SECONDS']
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._cursor = None
+        self._gaps = {}
+
+    def _fetch(self, statement):
+        with self.app.app_context(), db.engine.connect() as connection:
+            return connection.execute(statement).all()
+
+    def subscribe(self, entities=None, event_ids=(), area_ids=()):
+        subscription = Subscription(entities, event_ids, area_ids, self.queue_size)
+        with self._lock:
+            if len(self._subscribers) >= self.max_clients:
+                raise FeedFull()
+            if self._cursor is None:
+                self._cursor = self._fetch(select(func.coalesce(func.max(CHANGES.c.change_id), 0)))[0][0]
+            self._subscribers.add(subscription)
+            if self.interval and self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='change-feed', daemon=True)
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def wake(self):
+        self._wake.set()
+
+    def poll(self):
+        """Hand committed changes past the cursor to subscribers; returns how many rows were read."""
+        with self._lock:
+            if not self._subscribers:
+                # Nobody listening: start from the head again on the next subscribe.
+                self._cursor = None
+                self._gaps.clear()
+                return 0
+            cursor, gaps = self._cursor, list(self._gaps)
+        condition = CHANGES.c.change_id > cursor
+        if gaps:
+            condition = or_(condition, CHANGES.c.change_id.in_(gaps))
+        rows = self._fetch(select(CHANGES).where(condition).order_by(CHANGES.c.change_id)
+                           .limit(self.batch_size))
+        now = time.monotonic()
+        with self._lock:
+            for row in rows:
+                if self._gaps.pop(row.change_id, None) is None:
+                    if row.change_id - self._cursor <= MAX_TRACKED_GAP:
+                        for missing in range(self._cursor + 1, row.change_id):
+                            self._gaps[missing] = now + GAP_TIMEOUT
+                    self._cursor = max(self._cursor, row.change_id)
+                change = _message(row)
+                for subscription in self._subscribers:
+                    if subscription.matches(change):
+                        subscription.push(change)
+            self._gaps = {change_id: deadline for change_id, deadline in self._gaps.items() if deadline > now}
+        return len(rows)
+
+    def _run(self):
+        while True:
+            try:
+                fetched = self.poll()
+            except Exception:
+                self.app.logger.exception('Change feed poll failed')
+                fetched = 0
+            if fetched < self.batch_size:
+                self._wake.wait(self.interval)
+                self._wake.clear()
+
+    def stream(self, subscription, since=None):
+        """SSE frames: the backlog after ``since`` (a Last-Event-ID), then live changes.
+
+        The caller subscribes first, so nothing committed while the backlog
+        is read can fall between the two.
+        """
+        backlog = []
+        if since is not None:
+            backlog = self._fetch(subscription.filter(select(CHANGES).where(CHANGES.c.change_id > since))
+                                  .order_by(CHANGES.c.change_id).limit(self.backlog_size))
+        return self._frames(subscription, [_message(row) for row in backlog])
+
+    def _frames(self, subscription, backlog):
+        yield f'retry: {RETRY_MS}\n\n'
+        for change in backlog:
+            subscription.sent.add(change['change_id'])
+            yield change['message']
+        if len(backlog) == self.backlog_size:
+            # More to catch up on: let the client reconnect from here.
+            return
+        # Streams end after ``max_stream`` seconds so a worker thread is never
+        # held for good; the browser reconnects with its Last-Event-ID.
+        deadline = time.monotonic() + self.max_stream
+        while not (subscription.overflowed and subscription.queue.empty()):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                change = subscription.queue.get(timeout=min(self.keepalive, remaining))
+            except queue.Empty:
+                yield ': keepalive\n\n'
+                continue
+            if change['change_id'] not in subscription.sent:
+                yield change['message']
+
+
+def init_feed(app):
+    app.extensions['change_feed'] = ChangeFeed(app)
+
+
+def prune_changes(older_than):
+    """Delete outbox rows older than ``older_than`` (a timedelta); returns how many."""
+    result = db.session.execute(delete(CHANGES).where(CHANGES.c.created_at < _utcnow() - older_than))
+    db.session.commit()
+    return result.rowcount
@@ -1,6 +1,7 @@
 from flask_wtf import FlaskForm
-from wtforms import StringField, PasswordField, SubmitField, BooleanField, SelectField, IntegerField, DateField, DecimalField, SelectMultipleField
-from wtforms.validators import DataRequired, Length, EqualTo, ValidationError, Optional
+from flask_wtf.file import FileField, FileRequired, FileAllowed
+from wtforms import StringField, PasswordField, SubmitField, BooleanField, SelectField, IntegerField, DateField, DecimalField, FloatField, SelectMultipleField
+from wtforms.validators import DataRequired, Length, EqualTo, ValidationError, Optional, NumberRange
 from app.models import User
 
 class LoginForm(FlaskForm):
@@ -20,10 +21,15 @@ class RegistrationForm(FlaskForm):
         if user:
             raise ValidationError('That username is taken. Please choose a different one.')
 
+def coordinates_paired(form, field):
+    if (form.latitude.data is None) != (form.longitude.data is None):
+        raise ValidationError('Give both latitude and longitude, or neither.')
+
 # --- FORMS FOR ALL ENTITIES ---
 
 class EventForm(FlaskForm):
     disaster_type = StringField('Disaster Type', validators=[DataRequired(), Length(max=100)])
+    status = SelectField('Status', choices=[('active', 'Active'), ('closed', 'Closed')], default='active')
     tasks = SelectMultipleField('Required Tasks', coerce=int, validators=[Optional()])
     submit = SubmitField('Save Event')
 
@@ -33,6 +39,8 @@ class TeamForm(FlaskForm):
     personnel = IntegerField('Personnel Count', validators=[Optional()])
     equipment = StringField('Equipment', validators=[Length(max=255), Optional()])
     tasks = SelectMultipleField('Assigned Tasks', coerce=int, validators=[Optional()])
+    latitude = FloatField('Latitude', validators=[Optional(), NumberRange(-90, 90)])
+    longitude = FloatField('Longitude', validators=[coordinates_paired, Optional(), NumberRange(-180, 180)])
     submit = SubmitField('Save Team')
     
 class TaskForm(FlaskForm):
@@ -49,6 +57,8 @@ class AffectedAreaForm(FlaskForm):
     population = IntegerField('Population', validators=[Optional()])
     damage_extent = StringField('Damage Extent', validators=[Length(max=255), Optional()])
     start_date = DateField('Start Date', format='%Y-%m-%d', validators=[Optional()])
+    latitude = FloatField('Latitude', validators=[Optional(), NumberRange(-90, 90)])
+    longitude = FloatField('Longitude', validators=[coordinates_paired, Optional(), NumberRange(-180, 180)])
     event_id = SelectField('Emergency Event', coerce=int, validators=[DataRequired()])
     submit = SubmitField('Save Area')
 
@@ -70,6 +80,12 @@ class EvacuationForm(FlaskForm):
     destination = StringField('Destination', validators=[DataRequired(), Length(max=255)])
     location = StringField('Location', validators=[Length(max=255), Optional()])
     transport = StringField('Transport', validators=[Length(max=100), Optional()])
+    latitude = FloatField('Latitude', validators=[Optional(), NumberRange(-90, 90)])
+    longitude = FloatField('Longitude', validators=[coordinates_paired, Optional(), NumberRange(-180, 180)])
     area_id = SelectField('Affected Area', coerce=int, validators=[DataRequired()])
     team_id = SelectField('Assigned Team', coerce=int, validators=[Optional()])
     submit = SubmitField('Save Evacuation')
+
+class ImportForm(FlaskForm):
+    file = FileField('CSV or NDJSON file', validators=[FileRequired(), FileAllowed(['csv', 'ndjson', 'jsonl'], 'CSV or NDJSON files only.')])
+    submit = SubmitField('Import')
\ No newline at end of file
@@ -0,0 +1,127 @@
+import math
+
+from sqlalchemy import event, inspect, select
+
+from app import db
+from app.models import Affected_Area, Evacuation, Team, GRID_DEGREES, GRID_ROWS, GRID_COLUMNS, grid_cell
+
+EARTH_RADIUS_KM = 6371.0088
+HALF_CIRCUMFERENCE_KM = math.pi * EARTH_RADIUS_KM
+# Past this many cells a search reads whole grid rows (a latitude band of
+# the index) rather than listing every cell.
+MAX_CELLS = 400
+# First radius tried by nearest(); it grows fourfold until k points are in.
+NEAREST_START_KM = 10
+
+
+class Located:
+    """A table with coordinates: its key and the column that names a row."""
+
+    def __init__(self, model, pk, label):
+        self.table = model.__table__
+        self.pk = self.table.c[pk]
+        self.label = self.table.c[label]
+
+
+LOCATED = {
+    'areas': Located(Affected_Area, 'area_id', 'location'),
+    'evacuations': Located(Evacuation, 'eva_id', 'destination'),
+    'teams': Located(Team, 'team_id', 'team_name'),
+}
+
+
+def distance_km(lat1, lon1, lat2, lon2):
+    """Great-circle (haversine) distance between two points."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(1.0, a)))
+
+
+def _row(latitude):
+    return min(int((latitude + 90) / GRID_DEGREES), GRID_ROWS - 1)
+
+
+def _search_area(located, latitude, longitude, radius_km):
+    """WHERE clauses picking the grid cells a circle overlaps, and its latitude band."""
+    angle = radius_km / EARTH_RADIUS_KM
+    # A hair of slack so points on a cell edge are never lost to rounding.
+    spread = math.degrees(angle) + 1e-9
+    south, north = max(-90.0, latitude - spread), min(90.0, latitude + spread)
+    rows = range(_row(south), _row(north) + 1)
+    columns = None
+    if -90 < south and north < 90:
+        # Widest longitude offset of the circle; it reaches every
+        # longitude once it covers a pole.
+        reach = math.sin(angle) / math.cos(math.radians(latitude))
+        if reach < 1:
+            spread = math.degrees(math.asin(reach)) + 1e-9
+            first = math.floor((longitude - spread + 180) / GRID_DEGREES)
+            last = math.floor((longitude + spread + 180) / GRID_DEGREES)
+            if last - first + 1 < GRID_COLUMNS:
+                columns = [column % GRID_COLUMNS for column in range(first, last + 1)]
+
+    table = located.table
+    if columns is not None and len(rows) * len(columns) <= MAX_CELLS:
+        cells = table.c.grid_cell.in_([row * GRID_COLUMNS + column for row in rows for column in columns])
+    else:
+        cells = table.c.grid_cell.between(rows[0] * GRID_COLUMNS, (rows[-1] + 1) * GRID_COLUMNS - 1)
+    return cells, table.c.latitude.between(south, north)
+
+
+def _matches(located, latitude, longitude, radius_km, clauses):
+    table = located.table
+    rows = db.session.execute(select(located.pk, located.label, table.c.latitude, table.c.longitude)
+                              .where(*clauses))
+    found = []
+    for row in rows:
+        distance = distance_km(latitude, longitude, row.latitude, row.longitude)
+        if radius_km is None or distance <= radius_km:
+            found.append((distance, row))
+    found.sort(key=lambda match: (match[0], match[1][0]))
+    return found
+
+
+def _items(located, found):
+    return [{located.pk.key: row[0], located.label.key: row[1], 'latitude': row.latitude,
+             'longitude': row.longitude, 'distance_km': round(distance, 3)}
+            for distance, row in found]
+
+
+def within(located, latitude, longitude, radius_km, limit=None):
+    """Rows of ``located`` within ``radius_km`` of the point, nearest first."""
+    found = _matches(located, latitude, longitude, radius_km,
+                     _search_area(located, latitude, longitude, radius_km))
+    return _items(located, found[:limit])
+
+
+def nearest(located, latitude, longitude, k):
+    """The ``k`` rows of ``located`` nearest the point, nearest first.
+
+    Searches a growing radius: once it holds ``k`` points, nothing
+    outside it can be nearer. Past half the globe every located row is
+    read instead.
+    """
+    radius_km = NEAREST_START_KM
+    while radius_km < HALF_CIRCUMFERENCE_KM:
+        found = _matches(located, latitude, longitude, radius_km,
+                         _search_area(located, latitude, longitude, radius_km))
+        if len(found) >= k:
+            return _items(located, found[:k])
+        radius_km *= 4
+    found = _matches(located, latitude, longitude, None, [located.table.c.grid_cell.isnot(None)])
+    return _items(located, found[:k])
+
+
+# --- Grid maintenance ---
+# Inserts get their cell from the column default; ORM edits of the
+# coordinates move the row to its new cell here.
+
+def _regrid(mapper, connection, target):
+    state = inspect(target)
+    if state.attrs.latitude.history.has_changes() or state.attrs.longitude.history.has_changes():
+        target.grid_cell = grid_cell(target.latitude, target.longitude)
+
+
+for _model in (Affected_Area, Evacuation, Team):
+    event.listen(_model, 'before_update', _regrid)
@@ -0,0 +1,133 @@
+import logging
+import time
+from logging.handlers import RotatingFileHandler
+
+from flask import current_app, g, has_request_context, request, before_render_template, template_rendered
+from sqlalchemy import event
+
+from app.logs import queued
+
+request_logger = logging.getLogger('app.requests')
+slow_query_logger = logging.getLogger('app.slow_queries')
+
+MAX_LOGGED_PARAMS = 1000
+
+
+def _route():
+    if has_request_context():
+        return f'{request.method} {request.path} ({request.endpoint})'
+    return None
+
+
+def _timings():
+    return g.get('_timings') if has_request_context() else None
+
+
+def _listen_engine(app, engine):
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_start'].pop()
+        timings = _timings()
+        if timings is not None:
+            timings['sql_count'] += 1
+            timings['sql'] += elapsed
+        threshold = app.config['SLOW_QUERY_THRESHOLD_MS']
+        if threshold is not None and elapsed * 1000 >= threshold:
+            statement = ' '.join(statement.split())
+            parameters = repr(parameters)[:MAX_LOGGED_PARAMS]
+            slow_query_logger.warning(
+                'slow query duration_ms=%.1f route=%s statement=%s parameters=%s',
+                elapsed * 1000, _route(), statement, parameters,
+                extra={'duration_ms': round(elapsed * 1000, 1), 'statement': statement,
+                       'parameters': parameters})
+
+    def handle_error(context):
+        # A failed statement never reaches after_cursor_execute.
+        starts = context.connection.info.get('query_start') if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', after_cursor_execute)
+    event.listen(engine, 'handle_error', handle_error)
+
+
+def _before_request():
+    g._timings = {'start': time.perf_counter(), 'sql_count': 0, 'sql': 0.0, 'template': 0.0}
+
+
+def _before_render_template(sender, template, context, **extra):
+    timings = _timings()
+    if timings is not None:
+        timings['template_start'] = (time.perf_counter(), timings['sql'])
+
+
+def _template_rendered(sender, template, context, **extra):
+    timings = _timings()
+    if timings is not None and 'template_start' in timings:
+        started, sql_before = timings.pop('template_start')
+        # Lazy loads fired from the template are already counted as SQL time.
+        timings['template'] += time.perf_counter() - started - (timings['sql'] - sql_before)
+
+
+def request_timings():
+    """Statement count and milliseconds spent so far in the current request."""
+    timings = g._timings
+    total = time.perf_counter() - timings['start']
+    return {
+        'sql_count': timings['sql_count'],
+        'sql_ms': timings['sql'] * 1000,
+        'template_ms': timings['template'] * 1000,
+        'view_ms': max(0.0, total - timings['sql'] - timings['template']) * 1000,
+        'total_ms': total * 1000,
+    }
+
+
+def _after_request(response):
+    if _timings() is None:
+        return response
+    t = request_timings()
+    if current_app.config['SERVER_TIMING_HEADER']:
+        response.headers['Server-Timing'] = ', '.join([
+            f'db;dur={t["sql_ms"]:.1f};desc="{t["sql_count"]} queries"',
+            f'tpl;dur={t["template_ms"]:.1f}',
+            f'view;dur={t["view_ms"]:.1f}',
+            f'total;dur={t["total_ms"]:.1f}',
+        ])
+    request_logger.info(
+        'request method=%s path=%s endpoint=%s status=%s sql_count=%d sql_ms=%.1f '
+        'template_ms=%.1f view_ms=%.1f total_ms=%.1f',
+        request.method, request.path, request.endpoint, response.status_code, t['sql_count'],
+        t['sql_ms'], t['template_ms'], t['view_ms'], t['total_ms'],
+        extra={'method': request.method, 'path': request.path, 'status': response.status_code,
+               'sql_count': t['sql_count'], 'db_ms': round(t['sql_ms'], 1),
+               'template_ms': round(t['template_ms'], 1), 'view_ms': round(t['view_ms'], 1),
+               'latency_ms': round(t['total_ms'], 1)})
+    return response
+
+
+def init_instrumentation(app, db):
+    """Time SQL, templates and view code per request.
+
+    Adds a ``Server-Timing`` header and one ``app.requests`` log line per
+    request, and logs statements slower than ``SLOW_QUERY_THRESHOLD_MS`` to
+    ``app.slow_queries`` (and to ``SLOW_QUERY_LOG`` if set).
+    """
+    if not app.config['INSTRUMENTATION_ENABLED']:
+        return
+    with app.app_context():
+        for engine in db.engines.values():
+            _listen_engine(app, engine)
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    before_render_template.connect(_before_render_template, app)
+    template_rendered.connect(_template_rendered, app)
+
+    if app.config['SLOW_QUERY_LOG'] and not slow_query_logger.handlers:
+        handler = RotatingFileHandler(app.config['SLOW_QUERY_LOG'], maxBytes=app.config['LOG_MAX_BYTES'],
+                                      backupCount=5, encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(asctime)s request_id=%(request_id)s %(message)s',
+                                               defaults={'request_id': None}))
+        slow_query_logger.addHandler(queued(app, handler))
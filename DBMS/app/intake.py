@@ -0,0 +1,216 @@
+import csv
+import io
+import json
+
+from flask import current_app
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from werkzeug.datastructures import MultiDict
+
+from app import db
+from app.models import Affected_Area, Affected_Individual, Donation, Evacuation, Team
+from app.forms import AffectedIndividualForm, DonationForm, EvacuationForm
+from app.signals import bulk_inserted
+
+MAX_REPORTED_ERRORS = 1000
+
+
+class Importer:
+    """Bulk intake for one model, validated by the same form the single-record route uses."""
+
+    def __init__(self, model, form_class, references, optional_references=()):
+        self.model = model
+        self.form_class = form_class
+        # form field -> primary key column it must point at
+        self.references = references
+        # references where an empty/zero value means "none", as in the routes
+        self.optional_references = set(optional_references)
+        self.columns = [c.key for c in model.__table__.columns
+                        if c.key in form_class.__dict__]
+
+
+IMPORTERS = {
+    'individuals': Importer(Affected_Individual, AffectedIndividualForm,
+                            {'area_id': Affected_Area.area_id}),
+    'donations': Importer(Donation, DonationForm,
+                          {'area_id': Affected_Area.area_id}),
+    'evacuations': Importer(Evacuation, EvacuationForm,
+                            {'area_id': Affected_Area.area_id, 'team_id': Team.team_id},
+                            optional_references=['team_id']),
+}
+
+
+class ImportReport:
+    def __init__(self, entity):
+        self.entity = entity
+        self.inserted = 0
+        self.rejected = 0
+        self.errors = []
+
+    def reject(self, line, errors):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'errors': errors})
+
+    def to_dict(self):
+        return {
+            'entity': self.entity,
+            'inserted': self.inserted,
+            'rejected': self.rejected,
+            'errors': self.errors,
+            'errors_truncated': self.rejected > len(self.errors),
+        }
+
+
+def detect_format(filename):
+    return 'csv' if filename.lower().endswith('.csv') else 'ndjson'
+
+
+def _formdata(row):
+    return MultiDict({k: '' if v is None else str(v) for k, v in row.items() if k is not None})
+
+
+class _Lines:
+    """Text lines of a binary stream, counted as they are read.
+
+    Lines that are not UTF-8 come out empty and their numbers are kept in
+    ``undecodable`` for the caller to report.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.number = 0
+        self.undecodable = []
+
+    def __iter__(self):
+        for raw in self.stream:
+            self.number += 1
+            try:
+                yield raw.decode('utf-8-sig' if self.number == 1 else 'utf-8')
+            except UnicodeDecodeError:
+                self.undecodable.append(self.number)
+                # Keep csv's view of the line count in step.
+                yield '\n' if raw.endswith(b'\n') else ''
+
+
+def read_rows(stream, fmt):
+    """Yield ``(line number, row dict or None, error)`` from a binary CSV/NDJSON stream.
+
+    Lines that cannot be read are reported rather than ending the import,
+    since earlier chunks may already be committed.
+    """
+    lines = _Lines(stream)
+    if fmt == 'csv':
+        reader = csv.DictReader(lines)
+        while True:
+            try:
+                row, error = next(reader), None
+            except StopIteration:
+                row, error = None, None
+            except csv.Error as exc:
+                # The reader resumes at the next line.
+                row, error = None, f'Not valid CSV: {exc}.'
+            for line_number in lines.undecodable:
+                yield line_number, None, 'Not valid UTF-8 text.'
+            lines.undecodable.clear()
+            if row is None and error is None:
+                break
+            yield lines.number, row, error
+        return
+    for line in lines:
+        if lines.undecodable:
+            yield lines.undecodable.pop(), None, 'Not valid UTF-8 text.'
+            continue
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        if isinstance(row, dict):
+            yield lines.number, row, None
+        else:
+            yield lines.number, None, 'Not a valid JSON object.'
+
+
+class _ReferenceResolver:
+    """Checks foreign keys a chunk at a time with one IN query per column."""
+
+    def __init__(self, references):
+        self.references = references
+        self.known = {field: set() for field in references}
+
+    def missing(self, chunk):
+        bad = {}
+        for field, column in self.references.items():
+            wanted = {values[field] for _, values in chunk if values[field] is not None}
+            unknown = wanted - self.known[field]
+            if unknown:
+                found = db.session.execute(select(column).where(column.in_(unknown))).scalars()
+                self.known[field].update(found)
+            bad[field] = wanted - self.known[field]
+        return bad
+
+
+def import_records(entity, stream, fmt, chunk_size=None):
+    """Validate and insert rows from ``stream`` in chunked transactions.
+
+    Every row goes through the entity's form (CSRF off, choice check replaced
+    by a batched reference lookup). Valid rows are inserted with one
+    executemany per chunk and committed chunk by chunk, so a bad row never
+    rolls back good ones.
+    """
+    importer = IMPORTERS[entity]
+    chunk_size = chunk_size or current_app.config['IMPORT_CHUNK_SIZE']
+    report = ImportReport(entity)
+    resolver = _ReferenceResolver(importer.references)
+
+    form = importer.form_class(formdata=None, meta={'csrf': False})
+    for field in importer.references:
+        form[field].validate_choice = False
+
+    chunk = []
+    for line, row, error in read_rows(stream, fmt):
+        if error:
+            report.reject(line, {'_row': [error]})
+            continue
+        form.process(_formdata(row))
+        if not form.validate():
+            report.reject(line, {k: v for k, v in form.errors.items() if v})
+            continue
+        values = {column: form[column].data for column in importer.columns}
+        for field in importer.optional_references:
+            values[field] = values[field] or None
+        chunk.append((line, values))
+        if len(chunk) >= chunk_size:
+            _flush_chunk(importer, resolver, chunk, report)
+            chunk = []
+    if chunk:
+        _flush_chunk(importer, resolver, chunk, report)
+    return report
+
+
+def _flush_chunk(importer, resolver, chunk, report):
+    bad = resolver.missing(chunk)
+    rows = []
+    for line, values in chunk:
+        errors = {field: ['Not a valid choice.'] for field, ids in bad.items()
+                  if values[field] in ids}
+        if errors:
+            report.reject(line, errors)
+        else:
+            rows.append((line, values))
+    if not rows:
+        return
+    try:
+        values = [values for _, values in rows]
+        db.session.execute(insert(importer.model), values)
+        bulk_inserted.send(importer.model, rows=values)
+        db.session.commit()
+    except SQLAlchemyError as exc:
+        db.session.rollback()
+        current_app.logger.warning('Bulk import chunk failed: %s', exc)
+        for line, _ in rows:
+            report.reject(line, {'_row': ['Could not be saved.']})
+        return
+    report.inserted += len(rows)
@@ -0,0 +1,178 @@
+import atexit
+import copy
+import datetime
+import json
+import logging
+import os
+import queue
+import random
+import re
+import uuid
+import zlib
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from flask import g, has_request_context, request
+
+# Incoming X-Request-ID values are kept only if they look like an id.
+REQUEST_ID = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+# Attributes every LogRecord has; anything else was passed in ``extra``.
+_STANDARD = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message and any ``extra`` fields."""
+
+    def format(self, record):
+        data = {
+            'ts': datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD and not key.startswith('_'):
+                data[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data['exc'] = record.exc_text
+        return json.dumps(data, default=str, ensure_ascii=False)
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamps records with the current request's id, route and user.
+
+    Runs in the thread that logs, before the record is queued; the writer
+    thread has no request context.
+    """
+
+    def filter(self, record):
+        if has_request_context():
+            record.request_id = g.get('request_id')
+            record.route = request.endpoint
+            # Whatever Flask-Login already loaded; logging never triggers a lookup.
+            record.user_id = getattr(g.get('_login_user'), 'id', None)
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps ``rate`` of the INFO and DEBUG records of the given loggers.
+
+    Sampling is by request id, so a request's records are kept or dropped
+    together. Warnings, errors and 5xx request records are always kept.
+    """
+
+    def __init__(self, rate, names):
+        super().__init__()
+        self.rate = rate
+        self.names = tuple(names)
+
+    def filter(self, record):
+        if self.rate >= 1 or record.levelno >= logging.WARNING or record.name not in self.names:
+            return True
+        if getattr(record, 'status', 0) >= 500:
+            return True
+        request_id = getattr(record, 'request_id', None)
+        if request_id:
+            return zlib.crc32(request_id.encode()) / 2 ** 32 < self.rate
+        return random.random() < self.rate
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Queues records for the writer thread; drops them if the queue is full.
+
+    A stalled disk then costs lost log lines, not stalled requests.
+    """
+
+    dropped = 0
+
+    def prepare(self, record):
+        # Like QueueHandler.prepare, but the traceback stays out of the message.
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _output(app, formatter):
+    if app.config['LOG_TO_STDOUT']:
+        handler = logging.StreamHandler()
+    else:
+        directory = os.path.dirname(app.config['LOG_FILE'])
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        handler = RotatingFileHandler(app.config['LOG_FILE'], maxBytes=app.config['LOG_MAX_BYTES'],
+                                      backupCount=app.config['LOG_BACKUP_COUNT'], encoding='utf-8')
+    handler.setFormatter(formatter)
+    return handler
+
+
+def queued(app, *handlers):
+    """A handler that passes records to ``handlers`` on a background thread.
+
+    The calling thread only stamps the record and puts it on a bounded
+    queue. The writer is stopped (and the queue drained) at exit.
+    """
+    records = queue.Queue(app.config['LOG_QUEUE_SIZE'])
+    handler = DroppingQueueHandler(records)
+    handler.addFilter(RequestContextFilter())
+    listener = QueueListener(records, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    app.extensions.setdefault('log_listeners', []).append(listener)
+    return handler
+
+
+def stop_logging(app):
+    """Stop ``app``'s log writers after they have written what is queued."""
+    for listener in app.extensions.pop('log_listeners', []):
+        atexit.unregister(listener.stop)
+        listener.stop()
+
+
+def _request_id():
+    incoming = request.headers.get('X-Request-ID', '')
+    g.request_id = incoming if REQUEST_ID.match(incoming) else uuid.uuid4().hex
+
+
+def _echo_request_id(response):
+    if g.get('request_id'):
+        response.headers['X-Request-ID'] = g.request_id
+    return response
+
+
+def init_logging(app):
+    """Give each request an id and, outside debug and tests, log through a queue.
+
+    ``app`` and its child loggers go to stdout or ``LOG_FILE`` as JSON
+    (``LOG_FORMAT=text`` for the plain format), each record carrying the
+    request id, route and user id. INFO request logs are sampled at
+    ``LOG_SAMPLE_RATE``.
+    """
+    app.before_request(_request_id)
+    app.after_request(_echo_request_id)
+    if app.debug or app.testing:
+        return
+
+    if app.config['LOG_FORMAT'] == 'json':
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter('%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
+    output = _output(app, formatter)
+    output.setLevel(logging.INFO)
+    handler = queued(app, output)
+    handler.addFilter(SamplingFilter(app.config['LOG_SAMPLE_RATE'], ['app.requests']))
+    app.logger.addHandler(handler)
+    # Also sets the level 'app.requests' and 'app.slow_queries' inherit.
+    app.logger.setLevel(logging.INFO)
+    app.logger.info('Disaster Management startup')
@@ -1,12 +1,9 @@
-from app import db, login_manager
+from app import db
+from sqlalchemy.orm import configure_mappers
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 
-# --- User Loader and User Model (Unchanged) ---
-@login_manager.user_loader
-def load_user(user_id):
-    return User.query.get(int(user_id))
-
+# --- User Model (app.users loads it per request) ---
 class User(UserMixin, db.Model):
     __tablename__ = 'User'
     id = db.Column(db.Integer, primary_key=True)
@@ -25,77 +22,130 @@ class User(UserMixin, db.Model):
 
 # --- Association Tables for Many-to-Many Relationships ---
 event_requires_task = db.Table('Event_Requires_Task',
-    db.Column('event_id', db.Integer, db.ForeignKey('Emergency_Event.eme_id'), primary_key=True),
-    db.Column('task_id', db.Integer, db.ForeignKey('Task.task_id'), primary_key=True)
+    db.Column('event_id', db.Integer, db.ForeignKey('Emergency_Event.eme_id', ondelete='CASCADE'), primary_key=True),
+    db.Column('task_id', db.Integer, db.ForeignKey('Task.task_id'), primary_key=True, index=True)
 )
 
 task_doneby_team = db.Table('Task_DoneBy_Team',
     db.Column('task_id', db.Integer, db.ForeignKey('Task.task_id'), primary_key=True),
-    db.Column('team_id', db.Integer, db.ForeignKey('Team.team_id'), primary_key=True)
+    db.Column('team_id', db.Integer, db.ForeignKey('Team.team_id'), primary_key=True, index=True)
 )
 
 # Using a model for this one to include the 'quantity' attribute
 class Team_Has_Resource(db.Model):
     __tablename__ = 'Team_Has_Resource'
     team_id = db.Column(db.Integer, db.ForeignKey('Team.team_id'), primary_key=True)
-    res_id = db.Column(db.Integer, db.ForeignKey('Resource.res_id'), primary_key=True)
+    res_id = db.Column(db.Integer, db.ForeignKey('Resource.res_id'), primary_key=True, index=True)
     quantity = db.Column(db.Integer, nullable=False)
     resource = db.relationship('Resource', back_populates='teams')
     team = db.relationship('Team', back_populates='resources')
 
 
+# --- Location Grid ---
+# Points are bucketed into fixed GRID_DEGREES cells, numbered row-major from
+# (-90, -180). The indexed cell number is the spatial index app.geo searches,
+# the same on every database; rows without coordinates have no cell.
+GRID_DEGREES = 0.1
+GRID_ROWS = 1800
+GRID_COLUMNS = 3600
+
+def grid_cell(latitude, longitude):
+    if latitude is None or longitude is None:
+        return None
+    row = min(int((latitude + 90) / GRID_DEGREES), GRID_ROWS - 1)
+    column = int((longitude + 180) / GRID_DEGREES) % GRID_COLUMNS
+    return row * GRID_COLUMNS + column
+
+def _grid_cell_default(context):
+    # Runs for ORM and Core inserts alike; app.geo recomputes it on ORM updates.
+    parameters = context.get_current_parameters()
+    return grid_cell(parameters.get('latitude'), parameters.get('longitude'))
+
+
 # --- Main Entity Models ---
+# Everything under an event hangs off it with ON DELETE CASCADE; the ORM
+# leaves those rows to the database (passive_deletes). app.deletions removes
+# large events and areas in chunks.
+
+# Event lifecycle. Only closed events are archived (moved to the archive
+# tables below); 'archiving' and 'restoring' mark one app.archive is moving.
+# Restored rows keep their ids, so SQLite must never hand out the ids of
+# removed rows again (AUTOINCREMENT).
+EVENT_STATUSES = ('active', 'closed', 'archiving', 'restoring')
 
 class Emergency_Event(db.Model):
     __tablename__ = 'Emergency_Event'
+    __table_args__ = {'sqlite_autoincrement': True}
     eme_id = db.Column(db.Integer, primary_key=True)
-    disaster_type = db.Column(db.String(100), nullable=False)
-    affected_areas = db.relationship('Affected_Area', backref='event', lazy='dynamic', cascade="all, delete-orphan")
-    tasks = db.relationship('Task', secondary=event_requires_task, lazy='subquery', backref=db.backref('events', lazy=True))
+    disaster_type = db.Column(db.String(100), nullable=False, index=True)
+    status = db.Column(db.String(20), nullable=False, default='active', index=True)
+    closed_at = db.Column(db.DateTime)
+    affected_areas = db.relationship('Affected_Area', backref='event', lazy='dynamic', cascade="all, delete-orphan",
+                                     passive_deletes=True)
+    tasks = db.relationship('Task', secondary=event_requires_task, lazy='select', backref=db.backref('events', lazy=True))
     
     def __repr__(self):
         return f'<Event {self.disaster_type}>'
 
 class Affected_Area(db.Model):
     __tablename__ = 'Affected_Area'
+    __table_args__ = {'sqlite_autoincrement': True}
     area_id = db.Column(db.Integer, primary_key=True)
-    location = db.Column(db.String(255), nullable=False)
+    location = db.Column(db.String(255), nullable=False, index=True)
     population = db.Column(db.Integer)
     damage_extent = db.Column(db.String(255))
     start_date = db.Column(db.Date)
-    event_id = db.Column(db.Integer, db.ForeignKey('Emergency_Event.eme_id'), nullable=False)
-    individuals = db.relationship('Affected_Individual', backref='area', lazy='dynamic', cascade="all, delete-orphan")
-    donations = db.relationship('Donation', backref='area', lazy='dynamic', cascade="all, delete-orphan")
-    evacuations = db.relationship('Evacuation', backref='area', lazy='dynamic', cascade="all, delete-orphan")
+    event_id = db.Column(db.Integer, db.ForeignKey('Emergency_Event.eme_id', ondelete='CASCADE'), nullable=False, index=True)
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    grid_cell = db.Column(db.Integer, default=_grid_cell_default, index=True)
+    individuals = db.relationship('Affected_Individual', backref='area', lazy='dynamic', cascade="all, delete-orphan",
+                                  passive_deletes=True)
+    donations = db.relationship('Donation', backref='area', lazy='dynamic', cascade="all, delete-orphan",
+                                passive_deletes=True)
+    evacuations = db.relationship('Evacuation', backref='area', lazy='dynamic', cascade="all, delete-orphan",
+                                  passive_deletes=True)
 
     def __repr__(self):
         return f'<Area {self.location}>'
 
 class Affected_Individual(db.Model):
     __tablename__ = 'Affected_Individual'
+    __table_args__ = (
+        db.Index('ix_Affected_Individual_area_id_severity', 'area_id', 'severity'),
+        {'sqlite_autoincrement': True},
+    )
     individual_id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     injury_type = db.Column(db.String(100))
-    severity = db.Column(db.String(50))
-    area_id = db.Column(db.Integer, db.ForeignKey('Affected_Area.area_id'), nullable=False)
+    severity = db.Column(db.String(50), index=True)
+    area_id = db.Column(db.Integer, db.ForeignKey('Affected_Area.area_id', ondelete='CASCADE'), nullable=False)
 
 class Donation(db.Model):
     __tablename__ = 'Donation'
+    __table_args__ = (
+        db.Index('ix_Donation_area_id_type', 'area_id', 'type'),
+        {'sqlite_autoincrement': True},
+    )
     donation_id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     type = db.Column(db.String(50))
     amount = db.Column(db.Numeric(10, 2))
-    area_id = db.Column(db.Integer, db.ForeignKey('Affected_Area.area_id'), nullable=False)
+    area_id = db.Column(db.Integer, db.ForeignKey('Affected_Area.area_id', ondelete='CASCADE'), nullable=False)
 
 class Team(db.Model):
     __tablename__ = 'Team'
     team_id = db.Column(db.Integer, primary_key=True)
-    team_name = db.Column(db.String(100), nullable=False)
+    team_name = db.Column(db.String(100), nullable=False, index=True)
     team_leader = db.Column(db.String(100))
     personnel = db.Column(db.Integer)
     equipment = db.Column(db.String(255))
+    # Where the team is based.
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    grid_cell = db.Column(db.Integer, default=_grid_cell_default, index=True)
     evacuations = db.relationship('Evacuation', backref='team', lazy='dynamic')
-    tasks = db.relationship('Task', secondary=task_doneby_team, lazy='subquery', backref=db.backref('teams', lazy=True))
+    tasks = db.relationship('Task', secondary=task_doneby_team, lazy='select', backref=db.backref('teams', lazy=True))
     resources = db.relationship('Team_Has_Resource', back_populates='team', cascade="all, delete-orphan")
 
     def __repr__(self):
@@ -103,17 +153,25 @@ class Team(db.Model):
 
 class Evacuation(db.Model):
     __tablename__ = 'Evacuation'
+    __table_args__ = (
+        db.Index('ix_Evacuation_area_id_transport', 'area_id', 'transport'),
+        {'sqlite_autoincrement': True},
+    )
     eva_id = db.Column(db.Integer, primary_key=True)
     destination = db.Column(db.String(255), nullable=False)
     location = db.Column(db.String(255))
-    transport = db.Column(db.String(100))
-    area_id = db.Column(db.Integer, db.ForeignKey('Affected_Area.area_id'), nullable=False)
-    team_id = db.Column(db.Integer, db.ForeignKey('Team.team_id'))
+    transport = db.Column(db.String(100), index=True)
+    area_id = db.Column(db.Integer, db.ForeignKey('Affected_Area.area_id', ondelete='CASCADE'), nullable=False)
+    team_id = db.Column(db.Integer, db.ForeignKey('Team.team_id'), index=True)
+    # Coordinates of the destination.
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    grid_cell = db.Column(db.Integer, default=_grid_cell_default, index=True)
 
 class Task(db.Model):
     __tablename__ = 'Task'
     task_id = db.Column(db.Integer, primary_key=True)
-    task_name = db.Column(db.String(255), nullable=False)
+    task_name = db.Column(db.String(255), nullable=False, index=True)
 
     def __repr__(self):
         return f'<Task {self.task_name}>'
@@ -125,4 +183,133 @@ class Resource(db.Model):
     teams = db.relationship('Team_Has_Resource', back_populates='resource', cascade="all, delete-orphan")
 
     def __repr__(self):
-        return f'<Resource {self.type}>'
\ No newline at end of file
+        return f'<Resource {self.type}>'
+
+# --- Summary Models ---
+# Per-event rollups kept current by app.summaries; never edited directly.
+
+class Event_Summary(db.Model):
+    __tablename__ = 'Event_Summary'
+    event_id = db.Column(db.Integer, db.ForeignKey('Emergency_Event.eme_id', ondelete='CASCADE'), primary_key=True)
+    area_count = db.Column(db.Integer, nullable=False, default=0)
+    population = db.Column(db.BigInteger, nullable=False, default=0)
+    individual_count = db.Column(db.Integer, nullable=False, default=0)
+    donation_count = db.Column(db.Integer, nullable=False, default=0)
+    donation_total = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    evacuation_count = db.Column(db.Integer, nullable=False, default=0)
+
+class Event_Summary_Bucket(db.Model):
+    __tablename__ = 'Event_Summary_Bucket'
+    event_id = db.Column(db.Integer, db.ForeignKey('Emergency_Event.eme_id', ondelete='CASCADE'), primary_key=True)
+    dimension = db.Column(db.String(20), primary_key=True)
+    bucket = db.Column(db.String(255), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+
+# --- Archive ---
+# Archived events and everything under them, column for column as they were
+# in the operational tables (see app.archive). No foreign keys: the rows are
+# only read until a restore moves them back.
+
+archived_event_task = db.Table('Archived_Event_Task',
+    db.Column('event_id', db.Integer, primary_key=True),
+    db.Column('task_id', db.Integer, primary_key=True)
+)
+
+class Archived_Event(db.Model):
+    __tablename__ = 'Archived_Event'
+    eme_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    disaster_type = db.Column(db.String(100), nullable=False, index=True)
+    closed_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, nullable=False, index=True)
+
+class Archived_Area(db.Model):
+    __tablename__ = 'Archived_Area'
+    area_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    location = db.Column(db.String(255), nullable=False)
+    population = db.Column(db.Integer)
+    damage_extent = db.Column(db.String(255))
+    start_date = db.Column(db.Date)
+    event_id = db.Column(db.Integer, nullable=False, index=True)
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    grid_cell = db.Column(db.Integer)
+
+class Archived_Individual(db.Model):
+    __tablename__ = 'Archived_Individual'
+    individual_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    name = db.Column(db.String(100), nullable=False, index=True)
+    injury_type = db.Column(db.String(100))
+    severity = db.Column(db.String(50))
+    area_id = db.Column(db.Integer, nullable=False, index=True)
+
+class Archived_Donation(db.Model):
+    __tablename__ = 'Archived_Donation'
+    donation_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    name = db.Column(db.String(100), nullable=False)
+    type = db.Column(db.String(50))
+    amount = db.Column(db.Numeric(10, 2))
+    area_id = db.Column(db.Integer, nullable=False, index=True)
+
+class Archived_Evacuation(db.Model):
+    __tablename__ = 'Archived_Evacuation'
+    eva_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    destination = db.Column(db.String(255), nullable=False)
+    location = db.Column(db.String(255))
+    transport = db.Column(db.String(100))
+    area_id = db.Column(db.Integer, nullable=False, index=True)
+    team_id = db.Column(db.Integer)
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    grid_cell = db.Column(db.Integer)
+
+# --- Change Tracking ---
+# One row per table, bumped in the same transaction as any write to it
+# (see app.versions). The API derives ETag/Last-Modified from these.
+
+class Table_Version(db.Model):
+    __tablename__ = 'Table_Version'
+    table_name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    changed_at = db.Column(db.DateTime, nullable=False)
+
+# --- Live Feed Outbox ---
+# Committed changes to the feed's tables, written in the same transaction
+# (see app.feed). No foreign keys: rows outlive what they describe.
+
+class Change_Log(db.Model):
+    __tablename__ = 'Change_Log'
+    change_id = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(20), nullable=False)
+    action = db.Column(db.String(10), nullable=False)
+    row_id = db.Column(db.Integer)
+    area_id = db.Column(db.Integer)
+    event_id = db.Column(db.Integer)
+    payload = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, index=True)
+
+# --- Audit Trail ---
+# Who changed what, appended in batches once the change has committed (see
+# app.audit). Append-only: the database refuses UPDATE and DELETE on it. No
+# foreign keys, so entries outlive the rows and users they name.
+
+class Audit_Log(db.Model):
+    __tablename__ = 'Audit_Log'
+    __table_args__ = (
+        db.Index('ix_Audit_Log_entity_created_at', 'entity', 'created_at'),
+        db.Index('ix_Audit_Log_entity_row_id', 'entity', 'row_id'),
+    )
+    audit_id = db.Column(db.Integer, primary_key=True)
+    created_at = db.Column(db.DateTime, nullable=False, index=True)
+    entity = db.Column(db.String(64), nullable=False)
+    action = db.Column(db.String(10), nullable=False)
+    row_id = db.Column(db.String(64))
+    user_id = db.Column(db.Integer, index=True)
+    username = db.Column(db.String(80))
+    route = db.Column(db.String(100))
+    request_id = db.Column(db.String(64))
+    changes = db.Column(db.Text, nullable=False)
+
+# Resolve the backref attributes (Affected_Individual.area, Evacuation.team, ...)
+# at import time so routes can name them in loader options.
+configure_mappers()
@@ -0,0 +1,174 @@
+import base64
+import binascii
+import datetime
+import decimal
+import json
+
+from flask import abort, current_app, request
+from sqlalchemy import and_, or_
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime.date, decimal.Decimal)):
+        return str(value)
+    return value
+
+
+def _decode_value(column, value):
+    """Turn a cursor or filter value back into the column's Python type."""
+    if value is None:
+        return None
+    python_type = column.type.python_type
+    try:
+        if python_type is datetime.date:
+            return datetime.date.fromisoformat(value)
+        return python_type(value)
+    except (TypeError, ValueError, decimal.InvalidOperation):
+        abort(400)
+
+
+def encode_cursor(values):
+    raw = json.dumps([_encode_value(v) for v in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    padded = cursor + '=' * (-len(cursor) % 4)
+    try:
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, ValueError):
+        abort(400)
+    if not isinstance(values, list) or len(values) != 2:
+        abort(400)
+    return values
+
+
+class KeysetPage:
+    """One page of a keyset-paginated list plus the cursors around it."""
+
+    def __init__(self, items, sort, direction, per_page, filters,
+                 next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.sort = sort
+        self.direction = direction
+        self.per_page = per_page
+        self.filters = filters
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def url_args(self, **overrides):
+        """Query-string arguments for a link that keeps the current sort and filters."""
+        args = dict(self.filters)
+        args.update(sort=self.sort, dir=self.direction, per_page=self.per_page)
+        args.update(overrides)
+        return {k: v for k, v in args.items() if v is not None}
+
+    def sort_args(self, sort):
+        """Arguments for a column header link; clicking the active column flips direction."""
+        direction = 'desc' if sort == self.sort and self.direction == 'asc' else 'asc'
+        return self.url_args(sort=sort, dir=direction)
+
+
+# Dialects that already sort NULL below every value, so a plain ORDER BY on the
+# column matches the keyset predicate and can be served from its index.
+NULLS_SORT_LOW = {'sqlite', 'mysql', 'mariadb'}
+
+
+def _sort_key_order(column, pk, descending, dialect):
+    # NULLs always sort first ascending / last descending, on every dialect,
+    # so the keyset predicate below can rely on a single ordering.
+    order = []
+    if column is not pk:
+        ordered = column.desc() if descending else column.asc()
+        if column.nullable and dialect not in NULLS_SORT_LOW:
+            ordered = ordered.nulls_last() if descending else ordered.nulls_first()
+        order.append(ordered)
+    order.append(pk.desc() if descending else pk.asc())
+    return order
+
+
+def _after(column, pk, value, last_pk, descending):
+    """Rows strictly after (value, last_pk) in the (column, pk) ordering."""
+    if column is pk:
+        return pk < last_pk if descending else pk > last_pk
+    if descending:
+        if value is None:
+            return and_(column.is_(None), pk < last_pk)
+        return or_(column < value, column.is_(None), and_(column == value, pk < last_pk))
+    if value is None:
+        return or_(column.isnot(None), and_(column.is_(None), pk > last_pk))
+    return or_(column > value, and_(column == value, pk > last_pk))
+
+
+def keyset_paginate(query, pk, sortable, filterable=None, default_sort=None, default_direction='asc'):
+    """Paginate ``query`` by keyset on ``(sort column, primary key)``.
+
+    ``sortable`` and ``filterable`` map query-string names to columns; anything
+    else in the request is ignored so callers cannot sort or filter on
+    unindexed columns. Reads ``sort``, ``dir``, ``per_page``, ``after`` and
+    ``before`` from the request arguments; ``default_sort`` and
+    ``default_direction`` apply when ``sort`` and ``dir`` are absent.
+    """
+    filterable = filterable or {}
+    args = request.args
+
+    sort = args.get('sort', default_sort or next(iter(sortable)))
+    if sort not in sortable:
+        abort(400)
+    direction = args.get('dir', default_direction)
+    if direction not in ('asc', 'desc'):
+        abort(400)
+    column = sortable[sort]
+
+    per_page = args.get('per_page', current_app.config['LIST_PAGE_SIZE'], type=int)
+    per_page = max(1, min(per_page, current_app.config['LIST_MAX_PAGE_SIZE']))
+
+    filters = {}
+    for name, filter_column in filterable.items():
+        value = args.get(name)
+        if value in (None, ''):
+            continue
+        query = query.filter(filter_column == _decode_value(filter_column, value))
+        filters[name] = value
+
+    after, before = args.get('after'), args.get('before')
+    descending = direction == 'desc'
+    backwards = before is not None and after is None
+    if backwards:
+        value, last_pk = decode_cursor(before)
+        query = query.filter(_after(column, pk, _decode_value(column, value),
+                                    _decode_value(pk, last_pk), not descending))
+    elif after is not None:
+        value, last_pk = decode_cursor(after)
+        query = query.filter(_after(column, pk, _decode_value(column, value),
+                                    _decode_value(pk, last_pk), descending))
+
+    dialect = query.session.get_bind().dialect.name
+    order = _sort_key_order(column, pk, descending != backwards, dialect)
+    rows = query.order_by(*order).limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    def cursor_for(item):
+        return encode_cursor([getattr(item, column.key), getattr(item, pk.key)])
+
+    next_cursor = prev_cursor = None
+    if rows:
+        if backwards or has_more:
+            next_cursor = cursor_for(rows[-1])
+        if (backwards and has_more) or (not backwards and after is not None):
+            prev_cursor = cursor_for(rows[0])
+    elif backwards:
+        # Walked back past the first row; offer the way forward again.
+        next_cursor = before
+    return KeysetPage(rows, sort, direction, per_page, filters, next_cursor, prev_cursor)
@@ -0,0 +1,292 @@
+import csv
+import io
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from flask import current_app
+from sqlalchemy import func, select
+
+from app import db
+from app.models import (Affected_Area, Evacuation, Resource, Team, Team_Has_Resource,
+                        event_requires_task, task_doneby_team)
+
+# Share of an area's population that needs relief, by damage extent.
+DAMAGE_WEIGHTS = {'Minor': 0.25, 'Moderate': 0.5, 'Severe': 0.75, 'Total': 1.0}
+DEFAULT_DAMAGE_WEIGHT = 0.5
+# Rounds of proportional splitting over a team's linked areas; what is left
+# after them goes to the any-team pass.
+LINKED_ROUNDS = 8
+# Capacity of a team whose personnel is not recorded.
+UNLIMITED = 2 ** 62
+
+CSV_FIELDS = ['team_id', 'area_id', 'resource_type', 'units']
+
+
+class PlannerUnavailable(RuntimeError):
+    pass
+
+
+def _require_numpy():
+    if np is None:
+        raise PlannerUnavailable('The allocation planner needs NumPy (pip install numpy).')
+
+
+class Problem:
+    """Team stock and area needs as arrays, indexed by position in ``team_ids``/``area_ids``.
+
+    ``stock_team``, ``stock_type`` and ``stock_units`` hold one entry per
+    team and resource type it holds. ``evacuating`` and ``assigned`` are
+    (team, area) index pairs: teams already evacuating an area, and teams
+    doing a task of the area's event.
+    """
+
+    def __init__(self, team_ids, capacity, area_ids, need, types, stock_team, stock_type, stock_units,
+                 evacuating, assigned):
+        self.team_ids = team_ids
+        self.capacity = capacity
+        self.area_ids = area_ids
+        self.need = need
+        self.types = types
+        self.stock_team = stock_team
+        self.stock_type = stock_type
+        self.stock_units = stock_units
+        self.evacuating = evacuating
+        self.assigned = assigned
+
+
+class Plan:
+    """Units of each resource type to send from each team to each area."""
+
+    def __init__(self, problem, team, area, type_, units, unmet):
+        self.problem = problem
+        self.team = team
+        self.area = area
+        self.type = type_
+        self.units = units
+        # (types, areas) units still missing after the plan.
+        self.unmet = unmet
+
+    def __len__(self):
+        return len(self.units)
+
+    def summary(self):
+        """Per resource type: units needed, units sent and areas left short."""
+        problem = self.problem
+        sent = np.bincount(self.type, weights=self.units, minlength=len(problem.types))
+        return [{'resource_type': name, 'needed': int(problem.need.sum()), 'sent': int(sent[i]),
+                 'short_areas': int((self.unmet[i] > 0).sum())}
+                for i, name in enumerate(problem.types)]
+
+    def rows(self, limit=None):
+        """``CSV_FIELDS`` dicts, largest shipments first."""
+        order = np.argsort(-self.units, kind='stable')[:limit]
+        team_ids = self.problem.team_ids[self.team[order]].tolist()
+        area_ids = self.problem.area_ids[self.area[order]].tolist()
+        types = [self.problem.types[i] for i in self.type[order].tolist()]
+        for team_id, area_id, type_, units in zip(team_ids, area_ids, types, self.units[order].tolist()):
+            yield {'team_id': team_id, 'area_id': area_id, 'resource_type': type_, 'units': units}
+
+
+def _ids(rows, column=0):
+    return np.fromiter((row[column] for row in rows), dtype=np.int64, count=len(rows))
+
+
+def _lookup(sorted_ids, ids):
+    """Positions of ``ids`` in ``sorted_ids``, and which of them are there at all."""
+    positions = np.searchsorted(sorted_ids, ids)
+    found = positions < len(sorted_ids)
+    found[found] = sorted_ids[positions[found]] == ids[found]
+    return positions, found
+
+
+def _ranges(starts, counts):
+    """Concatenation of ``range(start, start + count)`` for each pair, without a Python loop."""
+    total = int(counts.sum())
+    offsets = np.repeat(starts - np.concatenate(([0], np.cumsum(counts)[:-1])), counts)
+    return np.arange(total, dtype=np.int64) + offsets
+
+
+def load_problem(event_id=None):
+    """Read team inventories and area needs (of one event, or all) into a ``Problem``."""
+    _require_numpy()
+    config = current_app.config
+    areas = select(Affected_Area.area_id, Affected_Area.population, Affected_Area.damage_extent,
+                   Affected_Area.event_id).order_by(Affected_Area.area_id)
+    if event_id is not None:
+        areas = areas.where(Affected_Area.event_id == event_id)
+    areas = db.session.execute(areas).all()
+    area_ids = _ids(areas)
+    population = np.fromiter((row.population or 0 for row in areas), dtype=np.float64, count=len(areas))
+    weight = np.fromiter((DAMAGE_WEIGHTS.get(row.damage_extent, DEFAULT_DAMAGE_WEIGHT) for row in areas),
+                         dtype=np.float64, count=len(areas))
+    area_events = _ids(areas, 3)
+    need = np.ceil(population * weight / config['PLANNER_PEOPLE_PER_UNIT']).astype(np.int64)
+
+    teams = db.session.execute(select(Team.team_id, Team.personnel).order_by(Team.team_id)).all()
+    team_ids = _ids(teams)
+    per_person = config['PLANNER_UNITS_PER_PERSON']
+    capacity = np.fromiter((UNLIMITED if row.personnel is None else max(row.personnel, 0) * per_person
+                            for row in teams), dtype=np.int64, count=len(teams))
+
+    stock = db.session.execute(
+        select(Team_Has_Resource.team_id, Resource.type, func.sum(Team_Has_Resource.quantity))
+        .join(Resource, Resource.res_id == Team_Has_Resource.res_id)
+        .where(Team_Has_Resource.quantity > 0)
+        .group_by(Team_Has_Resource.team_id, Resource.type)).all()
+    types = sorted({row[1] for row in stock})
+    type_index = {name: i for i, name in enumerate(types)}
+    stock_team = np.searchsorted(team_ids, _ids(stock))
+    stock_type = np.fromiter((type_index[row[1]] for row in stock), dtype=np.int64, count=len(stock))
+    stock_units = _ids(stock, 2)
+
+    evacuations = select(Evacuation.team_id, Evacuation.area_id).where(Evacuation.team_id.is_not(None)).distinct()
+    if event_id is not None:
+        evacuations = evacuations.join(Affected_Area).where(Affected_Area.event_id == event_id)
+    evacuations = db.session.execute(evacuations).all()
+    evacuating = (np.searchsorted(team_ids, _ids(evacuations)), np.searchsorted(area_ids, _ids(evacuations, 1)))
+
+    # Teams doing a task of an event, paired with every area of that event.
+    team_events = select(task_doneby_team.c.team_id, event_requires_task.c.event_id).join(
+        event_requires_task, event_requires_task.c.task_id == task_doneby_team.c.task_id).distinct()
+    if event_id is not None:
+        team_events = team_events.where(event_requires_task.c.event_id == event_id)
+    team_events = db.session.execute(team_events).all()
+    by_event = np.argsort(area_events, kind='stable')
+    event_ids, first, counts = np.unique(area_events[by_event], return_index=True, return_counts=True)
+    slot, has_areas = _lookup(event_ids, _ids(team_events, 1))
+    slot, team = slot[has_areas], np.searchsorted(team_ids, _ids(team_events)[has_areas])
+    assigned = (np.repeat(team, counts[slot]), by_event[_ranges(first[slot], counts[slot])])
+
+    return Problem(team_ids, capacity, area_ids, need, types, stock_team, stock_type, stock_units,
+                   evacuating, assigned)
+
+
+def _proportional(teams, areas, available, need):
+    """Split each team's units over its linked areas in proportion to what they still need.
+
+    ``available`` and ``need`` are reduced in place; returns the units per pair.
+    """
+    sent = np.zeros(len(teams), dtype=np.int64)
+    for _ in range(LINKED_ROUNDS):
+        # Integer shares, rounded down, so no team or area is ever overdrawn.
+        wanted = np.where(available[teams] > 0, need[areas], 0)
+        per_team = np.bincount(teams, weights=wanted, minlength=len(available)).astype(np.int64)[teams]
+        offer = np.zeros(len(teams), dtype=np.int64)
+        np.floor_divide(available[teams] * wanted, per_team, out=offer, where=per_team > 0)
+        offered = np.bincount(areas, weights=offer, minlength=len(need)).astype(np.int64)[areas]
+        take = offer.copy()
+        np.floor_divide(offer * need[areas], offered, out=take, where=offered > need[areas])
+        if not take.any():
+            break
+        available -= np.bincount(teams, weights=take, minlength=len(available)).astype(np.int64)
+        need -= np.bincount(areas, weights=take, minlength=len(need)).astype(np.int64)
+        sent += take
+    return sent
+
+
+def _northwest(supply, demand):
+    """Fill ``demand`` in order from ``supply`` in order (the north-west corner rule).
+
+    Returns (supplier, consumer, units) arrays with at most
+    ``len(supply) + len(demand) - 1`` entries.
+    """
+    supplied, demanded = np.cumsum(supply), np.cumsum(demand)
+    total = min(supplied[-1], demanded[-1]) if len(supply) and len(demand) else 0
+    if total <= 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty
+    bounds = np.union1d(supplied[supplied < total], demanded[demanded < total])
+    starts = np.concatenate(([0], bounds))
+    stops = np.concatenate((bounds, [total]))
+    return (np.searchsorted(supplied, starts, side='right'), np.searchsorted(demanded, starts, side='right'),
+            stops - starts)
+
+
+def allocate(problem):
+    """Send team stock to the areas that need it, cheapest assignments first.
+
+    Per resource type, each team first splits what it holds over the areas
+    it is evacuating, then over the areas of events it has tasks in, and
+    what remains fills the most needy areas from any team. A team never
+    sends more than it holds, nor more units in total than its personnel
+    times ``PLANNER_UNITS_PER_PERSON``; types are served in name order.
+    """
+    _require_numpy()
+    n_teams, n_areas = len(problem.team_ids), len(problem.area_ids)
+    capacity = problem.capacity.copy()
+    most_needy = np.argsort(-problem.need, kind='stable')
+    parts = []
+    unmet = np.zeros((len(problem.types), n_areas), dtype=np.int64)
+
+    for type_ in range(len(problem.types)):
+        holds = problem.stock_type == type_
+        available = np.zeros(n_teams, dtype=np.int64)
+        available[problem.stock_team[holds]] = problem.stock_units[holds]
+        np.minimum(available, capacity, out=available)
+        start = available.copy()
+        need = problem.need.copy()
+
+        for teams, areas in (problem.evacuating, problem.assigned):
+            linked = available[teams] > 0
+            teams, areas = teams[linked], areas[linked]
+            units = _proportional(teams, areas, available, need)
+            sent = units > 0
+            parts.append((teams[sent], areas[sent], units[sent], type_))
+
+        suppliers = np.flatnonzero(available > 0)
+        consumers = most_needy[need[most_needy] > 0]
+        i, j, units = _northwest(available[suppliers], need[consumers])
+        parts.append((suppliers[i], consumers[j], units, type_))
+        need[consumers] -= np.bincount(j, weights=units, minlength=len(consumers)).astype(np.int64)
+
+        capacity -= start - available + np.bincount(suppliers[i], weights=units, minlength=n_teams).astype(np.int64)
+        unmet[type_] = need
+
+    if parts:
+        team = np.concatenate([p[0] for p in parts])
+        area = np.concatenate([p[1] for p in parts])
+        units = np.concatenate([p[2] for p in parts])
+        type_ = np.concatenate([np.full(len(p[0]), p[3], dtype=np.int64) for p in parts])
+    else:
+        team = area = units = type_ = np.zeros(0, dtype=np.int64)
+    # A team can reach an area in more than one pass; report one row per pair.
+    key = (type_ * n_teams + team) * n_areas + area
+    key, inverse = np.unique(key, return_inverse=True)
+    units = np.bincount(inverse, weights=units, minlength=len(key)).astype(np.int64)
+    return Plan(problem, (key // n_areas) % max(n_teams, 1), key % max(n_areas, 1),
+                key // max(n_teams * n_areas, 1), units, unmet)
+
+
+def plan_allocation(event_id=None):
+    """Load, allocate and time; returns ``(plan, {'load_ms': ..., 'allocate_ms': ...})``."""
+    started = time.perf_counter()
+    problem = load_problem(event_id)
+    loaded = time.perf_counter()
+    plan = allocate(problem)
+    return plan, {'load_ms': (loaded - started) * 1000, 'allocate_ms': (time.perf_counter() - loaded) * 1000}
+
+
+def named_rows(plan, limit):
+    """The ``limit`` largest shipments, with team and area names for display."""
+    rows = list(plan.rows(limit))
+    teams = dict(db.session.execute(select(Team.team_id, Team.team_name)
+                                    .where(Team.team_id.in_({row['team_id'] for row in rows}))).all())
+    areas = dict(db.session.execute(select(Affected_Area.area_id, Affected_Area.location)
+                                    .where(Affected_Area.area_id.in_({row['area_id'] for row in rows}))).all())
+    for row in rows:
+        row['team_name'] = teams.get(row['team_id'])
+        row['location'] = areas.get(row['area_id'])
+    return rows
+
+
+def plan_csv(plan):
+    """The whole plan as CSV text."""
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=CSV_FIELDS)
+    writer.writeheader()
+    writer.writerows(plan.rows())
+    return out.getvalue()
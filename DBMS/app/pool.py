@@ -0,0 +1,115 @@
+import os
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import event, exc
+
+
+class PoolMetrics:
+    """Checkout counters for one engine's pool in this worker process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.invalidated = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record_wait(self, seconds, timed_out=False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def snapshot(self, pool):
+        with self._lock:
+            waits = self.checkouts + self.timeouts
+            data = {
+                'pool': type(pool).__name__,
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'connects': self.connects,
+                'invalidated': self.invalidated,
+                'wait_ms_avg': round(self.wait_total / waits * 1000, 3) if waits else 0.0,
+                'wait_ms_max': round(self.wait_max * 1000, 3),
+            }
+        # Gauges exist on QueuePool only (not on the StaticPool tests use).
+        for name in ('size', 'checkedin', 'checkedout', 'overflow'):
+            if hasattr(pool, name):
+                data[name] = getattr(pool, name)()
+        return data
+
+
+def _timed_checkout(pool, metrics):
+    # Pools fire no event before a checkout starts waiting, so the call
+    # itself is timed.
+    connect = pool.connect
+
+    def timed():
+        started = time.perf_counter()
+        try:
+            connection = connect()
+        except exc.TimeoutError:
+            metrics.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        metrics.record_wait(time.perf_counter() - started)
+        return connection
+
+    pool.connect = timed
+
+
+def _sqlite_pragmas(app, engine):
+    in_memory = engine.url.database in (None, '', ':memory:')
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        # Off by default in SQLite, and the models' ON DELETE CASCADE needs it.
+        cursor.execute('PRAGMA foreign_keys = ON')
+        if not in_memory:
+            # WAL lets readers run while a writer commits; the busy timeout makes
+            # a second writer wait instead of failing with "database is locked".
+            cursor.execute(f"PRAGMA journal_mode = {app.config['SQLITE_JOURNAL_MODE']}")
+            cursor.execute(f"PRAGMA synchronous = {app.config['SQLITE_SYNCHRONOUS']}")
+            cursor.execute(f"PRAGMA busy_timeout = {int(app.config['SQLITE_BUSY_TIMEOUT_MS'])}")
+        cursor.close()
+
+
+def _listen_engine(app, engine, metrics):
+    if engine.dialect.name == 'sqlite':
+        _sqlite_pragmas(app, engine)
+    _timed_checkout(engine.pool, metrics)
+    event.listen(engine.pool, 'connect', lambda *args: metrics.count('connects'))
+    event.listen(engine.pool, 'invalidate', lambda *args: metrics.count('invalidated'))
+
+    @event.listens_for(engine, 'engine_disposed')
+    def rewrap(engine_):
+        # dispose() swaps in a fresh pool (pool events carry over, the wrapper does not).
+        _timed_checkout(engine.pool, metrics)
+
+
+def init_pool(app, db):
+    """Apply SQLite pragmas and count pool checkouts for every engine of ``app``."""
+    metrics = app.extensions['pool_metrics'] = {}
+    with app.app_context():
+        for key, engine in db.engines.items():
+            metrics[key] = PoolMetrics()
+            _listen_engine(app, engine, metrics[key])
+
+
+def pool_status(db):
+    """``{'pid': ..., 'engines': {bind: counters and gauges}}`` for this worker process."""
+    engines = db.engines
+    return {'pid': os.getpid(),
+            'engines': {key or 'default': metrics.snapshot(engines[key].pool)
+                        for key, metrics in current_app.extensions['pool_metrics'].items()}}
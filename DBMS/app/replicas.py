@@ -0,0 +1,149 @@
+import itertools
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, g, has_request_context, session
+from flask_sqlalchemy.session import Session as FlaskSession
+from sqlalchemy import event, exc
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import UpdateBase
+
+# Flask session key: reads stay on the primary until this time.
+PIN_KEY = 'primary_until'
+
+
+class ReplicaSet:
+    """Round-robin over the read replica engines, skipping ones that recently failed."""
+
+    def __init__(self, engines, retry_after):
+        self.engines = engines
+        self.retry_after = retry_after
+        self._down = {}
+        self._lock = threading.Lock()
+        self._turn = itertools.count()
+
+    def choose(self):
+        now = time.monotonic()
+        with self._lock:
+            healthy = [engine for engine in self.engines if self._down.get(engine, 0) <= now]
+        if not healthy:
+            return None
+        return healthy[next(self._turn) % len(healthy)]
+
+    def mark_down(self, engine):
+        with self._lock:
+            self._down[engine] = time.monotonic() + self.retry_after
+
+    def is_down(self, engine):
+        with self._lock:
+            return self._down.get(engine, 0) > time.monotonic()
+
+
+def _request_replica():
+    return g.get('_replica') if has_request_context() else None
+
+
+class RoutingSession(FlaskSession):
+    """Sends reads in ``read_replica`` views to the request's replica.
+
+    Flushes and DML statements always go to the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        replica = _request_replica()
+        if (replica is not None and bind is None and not self._flushing
+                and not isinstance(clause, UpdateBase) and engine is self._db.engine):
+            return replica
+        return engine
+
+
+# --- Read-after-write pinning ---
+
+def _wrote(db_session, flush_context):
+    db_session.info['replica_pin'] = True
+
+
+def _wrote_statement(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info['replica_pin'] = True
+
+
+def _after_commit(db_session):
+    # The user's next reads go to the primary until the replicas have
+    # had time to catch up with what they just wrote.
+    if db_session.info.pop('replica_pin', False) and has_request_context():
+        seconds = current_app.config['REPLICA_PIN_SECONDS']
+        if seconds and current_app.extensions['replicas'].engines:
+            session[PIN_KEY] = time.time() + seconds
+
+
+def _after_soft_rollback(db_session, previous_transaction):
+    db_session.info.pop('replica_pin', None)
+
+
+event.listen(Session, 'after_flush', _wrote)
+event.listen(Session, 'do_orm_execute', _wrote_statement)
+event.listen(Session, 'after_commit', _after_commit)
+event.listen(Session, 'after_soft_rollback', _after_soft_rollback)
+
+
+# --- Views ---
+
+def read_replica(f):
+    """Run a read-only view against a replica, falling back to the primary.
+
+    The view runs on the primary when no replica is healthy or the user
+    wrote something in the last ``REPLICA_PIN_SECONDS``. If the replica
+    fails while the view runs, the view is run again on the primary; it
+    must therefore not write.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        replicas = current_app.extensions['replicas']
+        if session.get(PIN_KEY, 0) > time.time():
+            return f(*args, **kwargs)
+        replica = replicas.choose()
+        if replica is None:
+            return f(*args, **kwargs)
+        g._replica = replica
+        try:
+            return f(*args, **kwargs)
+        except exc.DBAPIError:
+            if not replicas.is_down(replica):
+                raise
+            current_app.logger.warning('Read replica %s failed; retrying on the primary', replica.url)
+            current_app.extensions['sqlalchemy'].session.rollback()
+            g._replica = None
+            return f(*args, **kwargs)
+    return decorated_function
+
+
+def connect_for_reading():
+    """A connection to the request's replica (or the primary if it is down), for Core reads."""
+    db = current_app.extensions['sqlalchemy']
+    replica = _request_replica()
+    if replica is not None:
+        try:
+            return replica.connect()
+        except exc.DBAPIError:
+            g._replica = None
+    return db.engine.connect()
+
+
+def init_replicas(app, db):
+    """Collect the ``replica_*`` binds and watch them for failures."""
+    with app.app_context():
+        engines = [engine for key, engine in sorted(db.engines.items(), key=lambda item: str(item[0]))
+                   if key is not None and key.startswith('replica_')]
+    replicas = app.extensions['replicas'] = ReplicaSet(engines, app.config['REPLICA_RETRY_SECONDS'])
+
+    def handle_error(context):
+        # A failed connect, or a dropped connection, takes the replica out
+        # of rotation for REPLICA_RETRY_SECONDS.
+        if context.connection is None or context.is_disconnect:
+            replicas.mark_down(context.engine)
+
+    for engine in engines:
+        event.listen(engine, 'handle_error', handle_error)
@@ -1,12 +1,69 @@
-from flask import render_template, flash, redirect, url_for, request, Blueprint
+from flask import render_template, flash, redirect, url_for, request, Blueprint, abort, jsonify, Response, stream_with_context, current_app
 from flask_login import login_user, logout_user, current_user, login_required
+import datetime
+import json
 from functools import wraps
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload, load_only, selectinload
 from app import db, limiter
+from app.pagination import keyset_paginate
+from app.replicas import read_replica
+from app.choices import choices
+from app.summaries import event_summary
+from app.coverage import readiness
+from app.search import search_individuals
+from app.feed import ENTITY_NAMES, FeedFull
+from app.associations import EVENT_TASKS, TEAM_TASKS, RESOURCE_TEAMS, linked_ids, sync_links
+from app.intake import IMPORTERS, import_records, detect_format
+from app.export import EXPORTS, FORMATS as EXPORT_FORMATS, export_chunks
+from app.planner import PlannerUnavailable, plan_allocation, plan_csv, named_rows
+from app.deletions import area_deletion, delete_now_or_later, deletion_job, event_deletion
+from app.archive import ArchiveError, set_status, start_archiving, start_restoring
 from app.models import User, Emergency_Event, Affected_Area, Affected_Individual, Donation, Team, Task, Resource, Evacuation, Team_Has_Resource
-from app.forms import LoginForm, RegistrationForm, EventForm, TeamForm, TaskForm, ResourceForm, AffectedAreaForm, AffectedIndividualForm, DonationForm, EvacuationForm
+from app.models import Archived_Event, Archived_Area, Archived_Individual, Archived_Donation, Archived_Evacuation
+from app.models import Audit_Log
+from app.forms import LoginForm, RegistrationForm, EventForm, TeamForm, TaskForm, ResourceForm, AffectedAreaForm, AffectedIndividualForm, DonationForm, EvacuationForm, ImportForm
 
 bp = Blueprint('main', __name__)
 
+# --- LIST LOADING PROFILES ---
+# Columns and relationships each list template renders. Related rows are
+# fetched in the same statement (or one extra for collections), so a page
+# costs the same number of queries however many rows it shows.
+EVENT_LIST_PROFILE = (
+    load_only(Emergency_Event.eme_id, Emergency_Event.disaster_type, Emergency_Event.status),
+)
+TEAM_LIST_PROFILE = (
+    load_only(Team.team_id, Team.team_name, Team.team_leader, Team.personnel, Team.equipment),
+)
+TASK_LIST_PROFILE = (
+    load_only(Task.task_id, Task.task_name),
+)
+RESOURCE_LIST_PROFILE = (
+    load_only(Resource.res_id, Resource.type),
+    selectinload(Resource.teams).joinedload(Team_Has_Resource.team).load_only(Team.team_name),
+)
+AREA_LIST_PROFILE = (
+    load_only(Affected_Area.area_id, Affected_Area.location, Affected_Area.population,
+              Affected_Area.damage_extent, Affected_Area.start_date, Affected_Area.event_id),
+    joinedload(Affected_Area.event).load_only(Emergency_Event.disaster_type),
+)
+INDIVIDUAL_LIST_PROFILE = (
+    load_only(Affected_Individual.individual_id, Affected_Individual.name, Affected_Individual.injury_type,
+              Affected_Individual.severity, Affected_Individual.area_id),
+    joinedload(Affected_Individual.area).load_only(Affected_Area.location),
+)
+DONATION_LIST_PROFILE = (
+    load_only(Donation.donation_id, Donation.name, Donation.type, Donation.amount, Donation.area_id),
+    joinedload(Donation.area).load_only(Affected_Area.location),
+)
+EVACUATION_LIST_PROFILE = (
+    load_only(Evacuation.eva_id, Evacuation.destination, Evacuation.location, Evacuation.transport,
+              Evacuation.area_id, Evacuation.team_id),
+    joinedload(Evacuation.area).load_only(Affected_Area.location),
+    joinedload(Evacuation.team).load_only(Team.team_name),
+)
+
 # --- DECORATOR FOR ADMIN ACCESS ---
 def admin_required(f):
     @wraps(f)
@@ -63,22 +120,27 @@ def register():
 # --- EMERGENCY EVENT CRUD (Updated for M:N with Tasks) ---
 @bp.route('/events')
 @login_required
+@read_replica
 def events():
-    all_events = Emergency_Event.query.all()
-    return render_template('events.html', events=all_events)
+    page = keyset_paginate(
+        Emergency_Event.query.options(*EVENT_LIST_PROFILE), Emergency_Event.eme_id,
+        sortable={'eme_id': Emergency_Event.eme_id, 'disaster_type': Emergency_Event.disaster_type},
+        filterable={'disaster_type': Emergency_Event.disaster_type, 'status': Emergency_Event.status},
+    )
+    return render_template('events.html', events=page.items, page=page)
 
 @bp.route('/event/new', methods=['GET', 'POST'])
 @login_required
 @admin_required
 def new_event():
     form = EventForm()
-    form.tasks.choices = [(t.task_id, t.task_name) for t in Task.query.order_by('task_name').all()]
+    form.tasks.choices = choices('tasks')
     if form.validate_on_submit():
         event = Emergency_Event(disaster_type=form.disaster_type.data)
-        for task_id in form.tasks.data:
-            task = Task.query.get(task_id)
-            event.tasks.append(task)
+        set_status(event, form.status.data)
         db.session.add(event)
+        db.session.flush()
+        sync_links(EVENT_TASKS, event, form.tasks.data, current=())
         db.session.commit()
         flash('The event has been created!', 'success')
         return redirect(url_for('main.events'))
@@ -89,14 +151,15 @@ def new_event():
 @admin_required
 def update_event(event_id):
     event = Emergency_Event.query.get_or_404(event_id)
+    if event.status not in ('active', 'closed'):
+        flash(f'The event cannot be edited while it is {event.status}.', 'warning')
+        return redirect(url_for('main.events'))
     form = EventForm(obj=event)
-    form.tasks.choices = [(t.task_id, t.task_name) for t in Task.query.order_by('task_name').all()]
+    form.tasks.choices = choices('tasks')
     if form.validate_on_submit():
         event.disaster_type = form.disaster_type.data
-        event.tasks.clear()
-        for task_id in form.tasks.data:
-            task = Task.query.get(task_id)
-            event.tasks.append(task)
+        set_status(event, form.status.data)
+        sync_links(EVENT_TASKS, event, form.tasks.data, current=[task.task_id for task in event.tasks])
         db.session.commit()
         flash('The event has been updated!', 'success')
         return redirect(url_for('main.events'))
@@ -108,32 +171,77 @@ def update_event(event_id):
 @login_required
 @admin_required
 def delete_event(event_id):
-    event = Emergency_Event.query.get_or_404(event_id)
-    db.session.delete(event)
-    db.session.commit()
+    Emergency_Event.query.get_or_404(event_id)
+    job = delete_now_or_later(event_deletion(event_id))
+    if job is not None:
+        flash('The event is large, so it is being deleted in the background.', 'info')
+        return redirect(url_for('main.deletion_status', job_id=job['id']))
     flash('The event has been deleted!', 'success')
     return redirect(url_for('main.events'))
 
+@bp.route('/event/<int:event_id>/archive', methods=['POST'])
+@login_required
+@admin_required
+def archive_event(event_id):
+    Emergency_Event.query.get_or_404(event_id)
+    try:
+        archiving = start_archiving(event_id)
+    except ArchiveError as exc:
+        flash(str(exc), 'warning')
+        return redirect(url_for('main.events'))
+    job = delete_now_or_later(archiving)
+    if job is not None:
+        flash('The event is large, so it is being archived in the background.', 'info')
+        return redirect(url_for('main.deletion_status', job_id=job['id']))
+    flash('The event has been archived!', 'success')
+    return redirect(url_for('main.archived_events'))
+
+@bp.route('/event/<int:event_id>/dashboard')
+@login_required
+@read_replica
+def event_dashboard(event_id):
+    event = Emergency_Event.query.get_or_404(event_id)
+    return render_template('event_dashboard.html', event=event, summary=event_summary(event_id))
+
+@bp.route('/event/<int:event_id>/readiness')
+@login_required
+@read_replica
+def event_readiness(event_id):
+    event = Emergency_Event.query.get_or_404(event_id)
+    report = readiness(event_id)
+    team_ids = {team_id for task in report['tasks'] for team_id in task['teams']}
+    team_ids.update(team_id for team_id, _ in report['suggested'])
+    teams = {team.team_id: team for team in
+             Team.query.options(load_only(Team.team_id, Team.team_name)).filter(Team.team_id.in_(team_ids))}
+    tasks = {task.task_id: task for task in
+             Task.query.filter(Task.task_id.in_([task['task_id'] for task in report['tasks']]))}
+    return render_template('event_readiness.html', event=event, report=report, teams=teams, tasks=tasks)
+
 
 # --- TEAM CRUD (Updated for M:N with Tasks) ---
 @bp.route('/teams')
 @login_required
+@read_replica
 def teams():
-    all_teams = Team.query.all()
-    return render_template('teams.html', teams=all_teams)
+    page = keyset_paginate(
+        Team.query.options(*TEAM_LIST_PROFILE), Team.team_id,
+        sortable={'team_id': Team.team_id, 'team_name': Team.team_name, 'personnel': Team.personnel},
+        filterable={'team_leader': Team.team_leader},
+    )
+    return render_template('teams.html', teams=page.items, page=page)
 
 @bp.route('/team/new', methods=['GET', 'POST'])
 @login_required
 @admin_required
 def new_team():
     form = TeamForm()
-    form.tasks.choices = [(t.task_id, t.task_name) for t in Task.query.order_by('task_name').all()]
+    form.tasks.choices = choices('tasks')
     if form.validate_on_submit():
-        team = Team(team_name=form.team_name.data, team_leader=form.team_leader.data, personnel=form.personnel.data, equipment=form.equipment.data)
-        for task_id in form.tasks.data:
-            task = Task.query.get(task_id)
-            team.tasks.append(task)
+        team = Team(team_name=form.team_name.data, team_leader=form.team_leader.data, personnel=form.personnel.data, equipment=form.equipment.data,
+                    latitude=form.latitude.data, longitude=form.longitude.data)
         db.session.add(team)
+        db.session.flush()
+        sync_links(TEAM_TASKS, team, form.tasks.data, current=())
         db.session.commit()
         flash('The team has been created!', 'success')
         return redirect(url_for('main.teams'))
@@ -145,16 +253,15 @@ def new_team():
 def update_team(team_id):
     team = Team.query.get_or_404(team_id)
     form = TeamForm(obj=team)
-    form.tasks.choices = [(t.task_id, t.task_name) for t in Task.query.order_by('task_name').all()]
+    form.tasks.choices = choices('tasks')
     if form.validate_on_submit():
         team.team_name = form.team_name.data
         team.team_leader = form.team_leader.data
         team.personnel = form.personnel.data
         team.equipment = form.equipment.data
-        team.tasks.clear()
-        for task_id in form.tasks.data:
-            task = Task.query.get(task_id)
-            team.tasks.append(task)
+        team.latitude = form.latitude.data
+        team.longitude = form.longitude.data
+        sync_links(TEAM_TASKS, team, form.tasks.data, current=[task.task_id for task in team.tasks])
         db.session.commit()
         flash('The team has been updated!', 'success')
         return redirect(url_for('main.teams'))
@@ -176,9 +283,13 @@ def delete_team(team_id):
 # --- TASK CRUD ---
 @bp.route('/tasks')
 @login_required
+@read_replica
 def tasks():
-    all_tasks = Task.query.all()
-    return render_template('tasks.html', tasks=all_tasks)
+    page = keyset_paginate(
+        Task.query.options(*TASK_LIST_PROFILE), Task.task_id,
+        sortable={'task_id': Task.task_id, 'task_name': Task.task_name},
+    )
+    return render_template('tasks.html', tasks=page.items, page=page)
 
 @bp.route('/task/new', methods=['GET', 'POST'])
 @login_required
@@ -220,23 +331,26 @@ def delete_task(task_id):
 # --- RESOURCE CRUD ---
 @bp.route('/resources')
 @login_required
+@read_replica
 def resources():
-    all_resources = Resource.query.all()
-    return render_template('resources.html', resources=all_resources)
+    page = keyset_paginate(
+        Resource.query.options(*RESOURCE_LIST_PROFILE), Resource.res_id,
+        sortable={'res_id': Resource.res_id, 'type': Resource.type},
+        filterable={'type': Resource.type},
+    )
+    return render_template('resources.html', resources=page.items, page=page)
 
 @bp.route('/resource/new', methods=['GET', 'POST'])
 @login_required
 @admin_required
 def new_resource():
     form = ResourceForm()
-    form.team_id.choices = [(t.team_id, t.team_name) for t in Team.query.order_by('team_name').all()]
+    form.team_id.choices = choices('teams')
     if form.validate_on_submit():
         resource = Resource(type=form.type.data)
         db.session.add(resource)
         db.session.flush()  # to get res_id
-        for team_id in form.team_id.data:
-            team_resource = Team_Has_Resource(team_id=team_id, res_id=resource.res_id, quantity=1)
-            db.session.add(team_resource)
+        sync_links(RESOURCE_TEAMS, resource, form.team_id.data, current=())
         db.session.commit()
         flash('The resource has been created!', 'success')
         return redirect(url_for('main.resources'))
@@ -248,16 +362,16 @@ def new_resource():
 def update_resource(res_id):
     resource = Resource.query.get_or_404(res_id)
     form = ResourceForm(obj=resource)
-    form.team_id.choices = [(t.team_id, t.team_name) for t in Team.query.order_by('team_name').all()]
+    form.team_id.choices = choices('teams')
     if form.validate_on_submit():
         resource.type = form.type.data
-        resource.team_id = form.team_id.data if form.team_id.data else None
+        sync_links(RESOURCE_TEAMS, resource, form.team_id.data)
         db.session.commit()
         flash('The resource has been updated!', 'success')
         return redirect(url_for('main.resources'))
     elif request.method == 'GET':
         form.type.data = resource.type
-        form.team_id.data = resource.team_id
+        form.team_id.data = linked_ids(RESOURCE_TEAMS, resource.res_id)
     return render_template('resource_form.html', title='Update Resource', form=form)
 
 @bp.route('/resource/<int:res_id>/delete', methods=['POST'])
@@ -274,22 +388,30 @@ def delete_resource(res_id):
 # --- AFFECTED AREA CRUD ---
 @bp.route('/areas')
 @login_required
+@read_replica
 def areas():
-    all_areas = Affected_Area.query.all()
-    return render_template('affected_areas.html', areas=all_areas)
+    page = keyset_paginate(
+        Affected_Area.query.options(*AREA_LIST_PROFILE), Affected_Area.area_id,
+        sortable={'area_id': Affected_Area.area_id, 'location': Affected_Area.location,
+                  'population': Affected_Area.population, 'start_date': Affected_Area.start_date},
+        filterable={'event_id': Affected_Area.event_id, 'damage_extent': Affected_Area.damage_extent},
+    )
+    return render_template('affected_areas.html', areas=page.items, page=page)
 
 @bp.route('/area/new', methods=['GET', 'POST'])
 @login_required
 @admin_required
 def new_area():
     form = AffectedAreaForm()
-    form.event_id.choices = [(e.eme_id, e.disaster_type) for e in Emergency_Event.query.order_by('disaster_type').all()]
+    form.event_id.choices = choices('events')
     if form.validate_on_submit():
         area = Affected_Area(
             location=form.location.data,
             population=form.population.data,
             damage_extent=form.damage_extent.data,
             start_date=form.start_date.data,
+            latitude=form.latitude.data,
+            longitude=form.longitude.data,
             event_id=form.event_id.data
         )
         db.session.add(area)
@@ -304,12 +426,14 @@ def new_area():
 def update_area(area_id):
     area = Affected_Area.query.get_or_404(area_id)
     form = AffectedAreaForm(obj=area)
-    form.event_id.choices = [(e.eme_id, e.disaster_type) for e in Emergency_Event.query.order_by('disaster_type').all()]
+    form.event_id.choices = choices('events')
     if form.validate_on_submit():
         area.location = form.location.data
         area.population = form.population.data
         area.damage_extent = form.damage_extent.data
         area.start_date = form.start_date.data
+        area.latitude = form.latitude.data
+        area.longitude = form.longitude.data
         area.event_id = form.event_id.data
         db.session.commit()
         flash('The area has been updated!', 'success')
@@ -320,26 +444,136 @@ def update_area(area_id):
 @login_required
 @admin_required
 def delete_area(area_id):
-    area = Affected_Area.query.get_or_404(area_id)
-    db.session.delete(area)
-    db.session.commit()
+    Affected_Area.query.get_or_404(area_id)
+    job = delete_now_or_later(area_deletion(area_id))
+    if job is not None:
+        flash('The area is large, so it is being deleted in the background.', 'info')
+        return redirect(url_for('main.deletion_status', job_id=job['id']))
     flash('The area has been deleted!', 'success')
     return redirect(url_for('main.areas'))
 
+# --- ARCHIVE (read-only until restored) ---
+@bp.route('/archive')
+@login_required
+@read_replica
+def archived_events():
+    page = keyset_paginate(
+        Archived_Event.query, Archived_Event.eme_id,
+        sortable={'eme_id': Archived_Event.eme_id, 'disaster_type': Archived_Event.disaster_type,
+                  'archived_at': Archived_Event.archived_at},
+        filterable={'disaster_type': Archived_Event.disaster_type},
+    )
+    return render_template('archived_events.html', events=page.items, page=page)
+
+@bp.route('/archive/<int:event_id>')
+@login_required
+@read_replica
+def archived_event(event_id):
+    event = Archived_Event.query.get_or_404(event_id)
+    areas = Archived_Area.query.filter_by(event_id=event_id).order_by(Archived_Area.location).all()
+    area_ids = select(Archived_Area.area_id).where(Archived_Area.event_id == event_id)
+    counts = {name: model.query.filter(model.area_id.in_(area_ids)).count()
+              for name, model in (('individuals', Archived_Individual), ('donations', Archived_Donation),
+                                  ('evacuations', Archived_Evacuation))}
+    # People are found by the start of their name (served by its index).
+    query = request.args.get('q', '').strip()
+    people = Archived_Individual.query.filter(Archived_Individual.area_id.in_(area_ids))
+    if query:
+        people = people.filter(Archived_Individual.name.startswith(query, autoescape=True))
+    page = keyset_paginate(
+        people, Archived_Individual.individual_id,
+        sortable={'name': Archived_Individual.name, 'individual_id': Archived_Individual.individual_id},
+        default_sort='name',
+    )
+    return render_template('archived_event.html', event=event, areas={area.area_id: area for area in areas},
+                           counts=counts, people=page.items, page=page, query=query)
+
+@bp.route('/archive/<int:event_id>/restore', methods=['POST'])
+@login_required
+@admin_required
+def restore_event(event_id):
+    Archived_Event.query.get_or_404(event_id)
+    try:
+        restoring = start_restoring(event_id)
+    except ArchiveError as exc:
+        flash(str(exc), 'danger')
+        return redirect(url_for('main.archived_event', event_id=event_id))
+    job = delete_now_or_later(restoring)
+    if job is not None:
+        flash('The event is large, so it is being restored in the background.', 'info')
+        return redirect(url_for('main.deletion_status', job_id=job['id']))
+    flash('The event has been restored!', 'success')
+    return redirect(url_for('main.events'))
+
+@bp.route('/deletions/<job_id>')
+@login_required
+@admin_required
+def deletion_status(job_id):
+    job = deletion_job(job_id)
+    if job is None:
+        abort(404)
+    if request.args.get('format') == 'json':
+        return jsonify(job)
+    return render_template('deletion_status.html', job=job)
+
+# --- AUDIT TRAIL ---
+def _audit_time(name):
+    value = request.args.get(name, '').strip()
+    if not value:
+        return None
+    try:
+        return datetime.datetime.fromisoformat(value)
+    except ValueError:
+        abort(400)
+
+@bp.route('/audit')
+@login_required
+@admin_required
+def audit_log():
+    # Newest first; an entity and a time range are served by (entity, created_at).
+    query = Audit_Log.query
+    since, until = _audit_time('since'), _audit_time('until')
+    if since is not None:
+        query = query.filter(Audit_Log.created_at >= since)
+    if until is not None:
+        query = query.filter(Audit_Log.created_at < until)
+    page = keyset_paginate(
+        query, Audit_Log.audit_id,
+        sortable={'created_at': Audit_Log.created_at, 'audit_id': Audit_Log.audit_id},
+        filterable={'entity': Audit_Log.entity, 'action': Audit_Log.action, 'row_id': Audit_Log.row_id,
+                    'user_id': Audit_Log.user_id},
+        default_direction='desc',
+    )
+    page.filters.update({name: request.args[name] for name in ('since', 'until') if request.args.get(name)})
+    if request.args.get('format') == 'json':
+        return jsonify({'entries': [{'audit_id': entry.audit_id, 'created_at': entry.created_at.isoformat(),
+                                     'entity': entry.entity, 'action': entry.action, 'row_id': entry.row_id,
+                                     'user_id': entry.user_id, 'username': entry.username, 'route': entry.route,
+                                     'request_id': entry.request_id, 'changes': json.loads(entry.changes)}
+                                    for entry in page.items],
+                        'next': page.url_args(after=page.next_cursor) if page.has_next else None})
+    return render_template('audit_log.html', entries=page.items, page=page)
+
 
 # --- AFFECTED INDIVIDUAL CRUD ---
 @bp.route('/individuals')
 @login_required
+@read_replica
 def individuals():
-    all_individuals = Affected_Individual.query.all()
-    return render_template('affected_individuals.html', individuals=all_individuals)
+    page = keyset_paginate(
+        Affected_Individual.query.options(*INDIVIDUAL_LIST_PROFILE), Affected_Individual.individual_id,
+        sortable={'individual_id': Affected_Individual.individual_id, 'name': Affected_Individual.name,
+                  'severity': Affected_Individual.severity},
+        filterable={'severity': Affected_Individual.severity, 'area_id': Affected_Individual.area_id},
+    )
+    return render_template('affected_individuals.html', individuals=page.items, page=page)
 
 @bp.route('/individual/new', methods=['GET', 'POST'])
 @login_required
 @admin_required
 def new_individual():
     form = AffectedIndividualForm()
-    form.area_id.choices = [(a.area_id, a.location) for a in Affected_Area.query.order_by('location').all()]
+    form.area_id.choices = choices('areas')
     if form.validate_on_submit():
         individual = Affected_Individual(
             name=form.name.data,
@@ -359,7 +593,7 @@ def new_individual():
 def update_individual(individual_id):
     individual = Affected_Individual.query.get_or_404(individual_id)
     form = AffectedIndividualForm(obj=individual)
-    form.area_id.choices = [(a.area_id, a.location) for a in Affected_Area.query.order_by('location').all()]
+    form.area_id.choices = choices('areas')
     if form.validate_on_submit():
         individual.name = form.name.data
         individual.injury_type = form.injury_type.data
@@ -384,16 +618,22 @@ def delete_individual(individual_id):
 # --- DONATION CRUD ---
 @bp.route('/donations')
 @login_required
+@read_replica
 def donations():
-    all_donations = Donation.query.all()
-    return render_template('donations.html', donations=all_donations)
+    page = keyset_paginate(
+        Donation.query.options(*DONATION_LIST_PROFILE), Donation.donation_id,
+        sortable={'donation_id': Donation.donation_id, 'name': Donation.name,
+                  'type': Donation.type, 'amount': Donation.amount},
+        filterable={'type': Donation.type, 'area_id': Donation.area_id},
+    )
+    return render_template('donations.html', donations=page.items, page=page)
 
 @bp.route('/donation/new', methods=['GET', 'POST'])
 @login_required
 @admin_required
 def new_donation():
     form = DonationForm()
-    form.area_id.choices = [(a.area_id, a.location) for a in Affected_Area.query.order_by('location').all()]
+    form.area_id.choices = choices('areas')
     if form.validate_on_submit():
         donation = Donation(
             name=form.name.data,
@@ -413,7 +653,7 @@ def new_donation():
 def update_donation(donation_id):
     donation = Donation.query.get_or_404(donation_id)
     form = DonationForm(obj=donation)
-    form.area_id.choices = [(a.area_id, a.location) for a in Affected_Area.query.order_by('location').all()]
+    form.area_id.choices = choices('areas')
     if form.validate_on_submit():
         donation.name = form.name.data
         donation.type = form.type.data
@@ -438,22 +678,31 @@ def delete_donation(donation_id):
 # --- EVACUATION CRUD ---
 @bp.route('/evacuations')
 @login_required
+@read_replica
 def evacuations():
-    all_evacuations = Evacuation.query.all()
-    return render_template('evacuations.html', evacuations=all_evacuations)
+    page = keyset_paginate(
+        Evacuation.query.options(*EVACUATION_LIST_PROFILE), Evacuation.eva_id,
+        sortable={'eva_id': Evacuation.eva_id, 'destination': Evacuation.destination,
+                  'transport': Evacuation.transport},
+        filterable={'transport': Evacuation.transport, 'area_id': Evacuation.area_id,
+                    'team_id': Evacuation.team_id},
+    )
+    return render_template('evacuations.html', evacuations=page.items, page=page)
 
 @bp.route('/evacuation/new', methods=['GET', 'POST'])
 @login_required
 @admin_required
 def new_evacuation():
     form = EvacuationForm()
-    form.area_id.choices = [(a.area_id, a.location) for a in Affected_Area.query.order_by('location').all()]
-    form.team_id.choices = [(t.team_id, t.team_name) for t in Team.query.order_by('team_name').all()]
+    form.area_id.choices = choices('areas')
+    form.team_id.choices = choices('teams')
     if form.validate_on_submit():
         evacuation = Evacuation(
             destination=form.destination.data,
             location=form.location.data,
             transport=form.transport.data,
+            latitude=form.latitude.data,
+            longitude=form.longitude.data,
             area_id=form.area_id.data,
             team_id=form.team_id.data if form.team_id.data else None
         )
@@ -469,12 +718,14 @@ def new_evacuation():
 def update_evacuation(eva_id):
     evacuation = Evacuation.query.get_or_404(eva_id)
     form = EvacuationForm(obj=evacuation)
-    form.area_id.choices = [(a.area_id, a.location) for a in Affected_Area.query.order_by('location').all()]
-    form.team_id.choices = [(t.team_id, t.team_name) for t in Team.query.order_by('team_name').all()]
+    form.area_id.choices = choices('areas')
+    form.team_id.choices = choices('teams')
     if form.validate_on_submit():
         evacuation.destination = form.destination.data
         evacuation.location = form.location.data
         evacuation.transport = form.transport.data
+        evacuation.latitude = form.latitude.data
+        evacuation.longitude = form.longitude.data
         evacuation.area_id = form.area_id.data
         evacuation.team_id = form.team_id.data if form.team_id.data else None
         db.session.commit()
@@ -491,3 +742,98 @@ def delete_evacuation(eva_id):
     db.session.commit()
     flash('The evacuation has been deleted!', 'success')
     return redirect(url_for('main.evacuations'))
+
+
+
+# --- SEARCH ---
+@bp.route('/search')
+@login_required
+@read_replica
+def search():
+    query = request.args.get('q', '').strip()
+    page_number = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', current_app.config['LIST_PAGE_SIZE'], type=int), 1),
+                   current_app.config['LIST_MAX_PAGE_SIZE'])
+    results = search_individuals(query, page_number, per_page)
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify(results.to_dict())
+    return render_template('search.html', results=results)
+
+
+# --- LIVE FEED ---
+@bp.route('/feed')
+@login_required
+def live_feed():
+    entities = request.args.getlist('entity')
+    if any(entity not in ENTITY_NAMES for entity in entities):
+        abort(400)
+    since = request.headers.get('Last-Event-ID', request.args.get('last_event_id'))
+    if since is not None:
+        if not since.isdigit():
+            abort(400)
+        since = int(since)
+    feed = current_app.extensions['change_feed']
+    try:
+        subscription = feed.subscribe(entities, request.args.getlist('event_id', type=int),
+                                      request.args.getlist('area_id', type=int))
+    except FeedFull:
+        # The list pages still work; they just show no live updates.
+        return Response(status=503, headers={'Retry-After': '30'})
+    response = Response(feed.stream(subscription, since), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    response.call_on_close(lambda: feed.unsubscribe(subscription))
+    return response
+
+
+# --- BULK IMPORT ---
+@bp.route('/import/<entity>', methods=['GET', 'POST'])
+@login_required
+@admin_required
+def bulk_import(entity):
+    if entity not in IMPORTERS:
+        abort(404)
+    form = ImportForm()
+    report = None
+    if form.validate_on_submit():
+        upload = form.file.data
+        report = import_records(entity, upload.stream, detect_format(upload.filename))
+        if request.accept_mimetypes.best == 'application/json':
+            return jsonify(report.to_dict())
+        flash(f'Imported {report.inserted} {entity}, rejected {report.rejected}.',
+              'warning' if report.rejected else 'success')
+    return render_template('import_form.html', title=f'Import {entity.title()}', form=form, entity=entity, report=report)
+
+
+# --- STREAMING EXPORT ---
+@bp.route('/export/<entity>.<fmt>')
+@login_required
+@read_replica
+def export(entity, fmt):
+    if entity not in EXPORTS or fmt not in EXPORT_FORMATS:
+        abort(404)
+    gzip = request.args.get('gzip') in ('1', 'true')
+    filename = f'{entity}.{fmt}.gz' if gzip else f'{entity}.{fmt}'
+    return Response(
+        stream_with_context(export_chunks(entity, fmt, gzip=gzip)),
+        mimetype='application/gzip' if gzip else EXPORT_FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename={filename}'},
+    )
+
+# --- RESOURCE ALLOCATION PLANNER ---
+@bp.route('/planner')
+@login_required
+@read_replica
+def planner():
+    event_id = request.args.get('event_id', type=int)
+    try:
+        plan, timings = plan_allocation(event_id)
+    except PlannerUnavailable as exc:
+        flash(str(exc), 'danger')
+        return redirect(url_for('main.index'))
+    if request.args.get('format') == 'csv':
+        return Response(plan_csv(plan), mimetype='text/csv',
+                        headers={'Content-Disposition': 'attachment; filename=allocation_plan.csv'})
+    return render_template('planner.html', plan=plan, summary=plan.summary(), timings=timings,
+                           rows=named_rows(plan, current_app.config['PLANNER_SHOWN_ROWS']),
+                           events=choices('events'), event_id=event_id)
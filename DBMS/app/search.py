@@ -0,0 +1,301 @@
+import re
+from difflib import SequenceMatcher
+
+from sqlalchemy import DDL, event, func, or_, select, text
+from sqlalchemy.dialects.mysql import match as mysql_match
+from sqlalchemy.orm import joinedload
+
+from app import db
+from app.models import Affected_Area, Affected_Individual
+
+# Candidates fetched per query stage; pages are cut from this ranked list.
+MAX_CANDIDATES = 500
+# Candidates scoring below this (see ``similarity``) are dropped.
+MIN_SIMILARITY = 0.7
+
+SEARCH_TABLE = 'Individual_Search'
+
+# Search structures per dialect. Names start with ``search_`` or the search
+# table name so autogenerate leaves them alone (see migrations/env.py); the
+# migration creating them carries a copy of these statements.
+SEARCH_DDL = {
+    'sqlite': [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+        "name, injury_type, location, tokenize = 'trigram')",
+        f"""CREATE TRIGGER IF NOT EXISTS search_individual_insert AFTER INSERT ON Affected_Individual BEGIN
+            INSERT INTO {SEARCH_TABLE} (rowid, name, injury_type, location)
+            SELECT new.individual_id, new.name, new.injury_type,
+                   (SELECT location FROM Affected_Area WHERE area_id = new.area_id);
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS search_individual_update
+            AFTER UPDATE OF name, injury_type, area_id ON Affected_Individual BEGIN
+            UPDATE {SEARCH_TABLE} SET name = new.name, injury_type = new.injury_type,
+                   location = (SELECT location FROM Affected_Area WHERE area_id = new.area_id)
+            WHERE rowid = new.individual_id;
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS search_individual_delete AFTER DELETE ON Affected_Individual BEGIN
+            DELETE FROM {SEARCH_TABLE} WHERE rowid = old.individual_id;
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS search_area_update AFTER UPDATE OF location ON Affected_Area BEGIN
+            UPDATE {SEARCH_TABLE} SET location = new.location
+            WHERE rowid IN (SELECT individual_id FROM Affected_Individual WHERE area_id = new.area_id);
+        END""",
+    ],
+    'postgresql': [
+        'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+        'CREATE INDEX IF NOT EXISTS search_individual_name_trgm ON "Affected_Individual" '
+        'USING gin (name gin_trgm_ops)',
+        'CREATE INDEX IF NOT EXISTS search_individual_injury_trgm ON "Affected_Individual" '
+        'USING gin (injury_type gin_trgm_ops)',
+        'CREATE INDEX IF NOT EXISTS search_area_location_trgm ON "Affected_Area" '
+        'USING gin (location gin_trgm_ops)',
+        'CREATE INDEX IF NOT EXISTS search_individual_tsv ON "Affected_Individual" '
+        "USING gin (to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(injury_type, '')))",
+    ],
+    'mysql': [
+        'ALTER TABLE Affected_Individual ADD FULLTEXT INDEX search_individual_text (name, injury_type) '
+        'WITH PARSER ngram',
+        'ALTER TABLE Affected_Area ADD FULLTEXT INDEX search_area_location (location) WITH PARSER ngram',
+    ],
+    # MariaDB has no ngram parser: whole words and prefixes only.
+    'mariadb': [
+        'ALTER TABLE Affected_Individual ADD FULLTEXT INDEX search_individual_text (name, injury_type)',
+        'ALTER TABLE Affected_Area ADD FULLTEXT INDEX search_area_location (location)',
+    ],
+}
+
+
+def _create_search_structures(target, connection, **kw):
+    for statement in SEARCH_DDL.get(connection.dialect.name, []):
+        connection.execute(DDL(statement))
+
+
+def _drop_search_table(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        connection.execute(DDL(f'DROP TABLE IF EXISTS {SEARCH_TABLE}'))
+
+
+# Affected_Area is created first (Affected_Individual references it), so both
+# tables exist when this runs.
+event.listen(Affected_Individual.__table__, 'after_create', _create_search_structures)
+event.listen(Affected_Individual.__table__, 'before_drop', _drop_search_table)
+
+
+def rebuild_search_index():
+    """Repopulate the SQLite search table from the base tables (other backends index in place)."""
+    connection = db.session.connection()
+    if connection.dialect.name == 'sqlite':
+        connection.execute(text(f'DELETE FROM {SEARCH_TABLE}'))
+        connection.execute(text(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, name, injury_type, location) '
+            'SELECT i.individual_id, i.name, i.injury_type, a.location '
+            'FROM Affected_Individual i JOIN Affected_Area a ON a.area_id = i.area_id'))
+    db.session.commit()
+
+
+# --- Querying ---
+
+def _terms(query):
+    return [term for term in re.findall(r'\w+', query.lower()) if term]
+
+
+def _trigrams(term):
+    term = f'  {term} '
+    return {term[i:i + 3] for i in range(len(term) - 2)}
+
+
+def _term_score(term, words, text):
+    if term in text:
+        return 1.0
+    return max((SequenceMatcher(None, term, word).ratio() for word in words), default=0.0)
+
+
+def _whole_words(terms, *values):
+    words = set(re.findall(r'\w+', ' '.join(v.lower() for v in values if v)))
+    return sum(term in words for term in terms)
+
+
+def similarity(terms, *values):
+    """How well ``values`` match the query ``terms`` (0..1).
+
+    Each term scores 1 when it occurs in any value, otherwise its best edit
+    similarity to a single word (so "jonh" still scores 0.75 against "john");
+    the result is the mean over terms.
+    """
+    text = ' '.join(v.lower() for v in values if v)
+    words = re.findall(r'\w+', text)
+    return sum(_term_score(term, words, text) for term in terms) / len(terms)
+
+
+def _fts_phrase(term):
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _sqlite_candidates(terms, limit):
+    """Exact substring matches first, then rows sharing trigrams with the terms."""
+    long_terms = [t for t in terms if len(t) >= 3]
+    if not long_terms:
+        # Too short for trigrams: prefix match on the name instead.
+        return db.session.execute(
+            select(Affected_Individual.individual_id)
+            .where(or_(*[Affected_Individual.name.ilike(f'{t}%') for t in terms]))
+            .order_by(Affected_Individual.name).limit(limit)).scalars().all()
+
+    def match(expression, limit):
+        # No ORDER BY rank: bm25 would have to score every hit before the
+        # LIMIT applies. Hits come back in rowid order and stop at ``limit``;
+        # ``search_individuals`` does the ranking.
+        return db.session.execute(text(
+            f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :q LIMIT :limit'),
+            {'q': expression, 'limit': limit}).scalars().all()
+
+    def any_gram(terms):
+        grams = sorted({g for t in terms for g in _trigrams(t) if ' ' not in g})
+        return '(' + ' OR '.join(_fts_phrase(g) for g in grams) + ')'
+
+    candidates = match(' AND '.join(_fts_phrase(t) for t in long_terms), limit)
+    # Then rows near every term, then rows near any term: each stage is
+    # narrower than the next, so a common trigram never crowds out the
+    # likelier near-misses.
+    stages = [any_gram(long_terms)]
+    if len(long_terms) > 1:
+        stages.insert(0, ' AND '.join(any_gram([t]) for t in long_terms))
+    seen = set(candidates)
+    for expression in stages:
+        if len(candidates) >= limit:
+            break
+        for row in match(expression, limit):
+            if row not in seen and len(candidates) < limit:
+                seen.add(row)
+                candidates.append(row)
+    return candidates
+
+
+def _postgresql_candidates(terms, limit):
+    # A low threshold lets the trigram indexes return typo'd rows too; the
+    # final cut happens in ``search_individuals``.
+    db.session.execute(text("SET LOCAL pg_trgm.similarity_threshold = 0.1"))
+    query = ' '.join(terms)
+    tsquery = func.to_tsquery('simple', ' & '.join(f'{t}:*' for t in terms))
+    document = func.to_tsvector('simple', func.coalesce(Affected_Individual.name, '') + ' ' +
+                                func.coalesce(Affected_Individual.injury_type, ''))
+    score = func.greatest(func.similarity(Affected_Individual.name, query),
+                          func.similarity(Affected_Individual.injury_type, query),
+                          func.similarity(Affected_Area.location, query),
+                          func.ts_rank(document, tsquery))
+    rows = db.session.execute(
+        select(Affected_Individual.individual_id)
+        .join(Affected_Area, Affected_Individual.area_id == Affected_Area.area_id)
+        .where(or_(document.op('@@')(tsquery), Affected_Individual.name.op('%')(query),
+                   Affected_Individual.injury_type.op('%')(query), Affected_Area.location.op('%')(query)))
+        .order_by(score.desc()).limit(limit)).scalars().all()
+    return rows
+
+
+def _mysql_candidates(terms, limit):
+    # The ngram parser indexes 2-grams, so natural language mode returns any
+    # row sharing a bigram with the query, typo'd or not.
+    query = ' '.join(terms)
+    individual = mysql_match(Affected_Individual.name, Affected_Individual.injury_type,
+                             against=query).in_natural_language_mode()
+    area = mysql_match(Affected_Area.location, against=query).in_natural_language_mode()
+    score = individual + area
+    rows = db.session.execute(
+        select(Affected_Individual.individual_id)
+        .join(Affected_Area, Affected_Individual.area_id == Affected_Area.area_id)
+        .where(or_(individual > 0, area > 0))
+        .order_by(score.desc()).limit(limit)).scalars().all()
+    return rows
+
+
+def _mariadb_candidates(terms, limit):
+    # Word indexes: boolean mode with every term as a prefix, any term matching.
+    query = ' '.join(f'{t}*' for t in terms)
+    individual = mysql_match(Affected_Individual.name, Affected_Individual.injury_type,
+                             against=query).in_boolean_mode()
+    area = mysql_match(Affected_Area.location, against=query).in_boolean_mode()
+    rows = db.session.execute(
+        select(Affected_Individual.individual_id)
+        .join(Affected_Area, Affected_Individual.area_id == Affected_Area.area_id)
+        .where(or_(individual > 0, area > 0))
+        .order_by((individual + area).desc()).limit(limit)).scalars().all()
+    return rows
+
+
+def _like_candidates(terms, limit):
+    conditions = [or_(Affected_Individual.name.ilike(f'%{t}%'), Affected_Individual.injury_type.ilike(f'%{t}%'),
+                      Affected_Area.location.ilike(f'%{t}%')) for t in terms]
+    return db.session.execute(
+        select(Affected_Individual.individual_id)
+        .join(Affected_Area, Affected_Individual.area_id == Affected_Area.area_id)
+        .where(*conditions).order_by(Affected_Individual.name).limit(limit)).scalars().all()
+
+
+BACKENDS = {
+    'sqlite': _sqlite_candidates,
+    'postgresql': _postgresql_candidates,
+    'mysql': _mysql_candidates,
+    'mariadb': _mariadb_candidates,
+}
+
+
+class SearchPage:
+    def __init__(self, query, items, page, per_page, has_next):
+        self.query = query
+        self.items = items
+        self.page = page
+        self.per_page = per_page
+        self.has_next = has_next
+        self.has_prev = page > 1
+
+    def to_dict(self):
+        return {
+            'query': self.query,
+            'page': self.page,
+            'per_page': self.per_page,
+            'has_next': self.has_next,
+            'results': [{'individual_id': i.individual_id, 'name': i.name, 'injury_type': i.injury_type,
+                         'severity': i.severity, 'area_id': i.area_id, 'location': i.area.location,
+                         'score': round(score, 3)} for i, score in self.items],
+        }
+
+
+def search_individuals(query, page=1, per_page=20):
+    """Ranked ``(individual, score)`` pairs whose name, injury or area location matches ``query``.
+
+    The dialect's text index finds candidates (prefixes and rows sharing
+    trigrams with a misspelt term included), which are then ranked by
+    ``similarity``. Pages are cut from the first ``MAX_CANDIDATES`` rows.
+    """
+    terms = _terms(query)
+    if not terms:
+        return SearchPage(query, [], page, per_page, False)
+    dialect = db.session.get_bind().dialect.name
+    candidates = BACKENDS.get(dialect, _like_candidates)(terms, MAX_CANDIDATES)
+
+    rows = {}
+    if candidates:
+        for individual in (Affected_Individual.query
+                           .options(joinedload(Affected_Individual.area).load_only(Affected_Area.location))
+                           .filter(Affected_Individual.individual_id.in_(candidates))):
+            rows[individual.individual_id] = individual
+
+    # Rescore every candidate the same way whatever the backend. Substring
+    # hits all score 1, so ties go to an exact name, then to the most terms
+    # matching whole words ("Person 12345" over "Person 123450"), then to
+    # the index's own order.
+    name = ' '.join(terms)
+    scored = []
+    for individual_id in candidates:
+        individual = rows.get(individual_id)
+        if individual is None:
+            continue
+        values = (individual.name, individual.injury_type, individual.area.location)
+        score = similarity(terms, *values)
+        if score >= MIN_SIMILARITY:
+            exact = ' '.join(_terms(individual.name or '')) == name
+            scored.append((individual, score, (-score, not exact, -_whole_words(terms, *values))))
+    ranked = [(individual, score) for individual, score, _ in sorted(scored, key=lambda r: r[2])]
+
+    start = (page - 1) * per_page
+    return SearchPage(query, ranked[start:start + per_page], page, per_page, len(ranked) > start + per_page)
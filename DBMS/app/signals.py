@@ -0,0 +1,8 @@
+from blinker import Namespace
+
+_signals = Namespace()
+
+# Sent with the model class as sender and ``rows`` (list of column dicts)
+# after a Core bulk insert, inside the inserting transaction. ORM events do
+# not see these rows, so anything derived from them listens here.
+bulk_inserted = _signals.signal('bulk-inserted')
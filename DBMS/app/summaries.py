@@ -0,0 +1,333 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from sqlalchemy import delete, event, func, insert, inspect, select, update
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import (Emergency_Event, Affected_Area, Affected_Individual, Donation, Evacuation, Team,
+                        Event_Summary, Event_Summary_Bucket)
+from app.signals import bulk_inserted
+
+SUMMARY = Event_Summary.__table__
+BUCKETS = Event_Summary_Bucket.__table__
+SUMMARY_FIELDS = ['area_count', 'population', 'individual_count', 'donation_count', 'donation_total',
+                  'evacuation_count']
+
+# Columns whose values feed the rollups, per summarised model.
+TRACKED = {
+    Affected_Area: ('event_id', 'population'),
+    Affected_Individual: ('area_id', 'severity'),
+    Donation: ('area_id', 'type', 'amount'),
+    Evacuation: ('area_id', 'transport', 'team_id'),
+}
+
+
+def _contribution(model, values):
+    """``(summary deltas, [(dimension, bucket, count, total)])`` one row adds to its event."""
+    if model is Affected_Area:
+        return {'area_count': 1, 'population': values['population'] or 0}, []
+    if model is Affected_Individual:
+        return {'individual_count': 1}, [('severity', values['severity'] or '', 1, 0)]
+    if model is Donation:
+        amount = Decimal(values['amount'] or 0)
+        return ({'donation_count': 1, 'donation_total': amount},
+                [('donation_type', values['type'] or '', 1, amount)])
+    buckets = [('transport', values['transport'] or '', 1, 0)]
+    if values['team_id']:
+        buckets.append(('team', str(values['team_id']), 1, 0))
+    return {'evacuation_count': 1}, buckets
+
+
+class _Deltas:
+    """Per-event changes accumulated over a flush or a bulk insert."""
+
+    def __init__(self):
+        self.summary = defaultdict(lambda: defaultdict(int))
+        self.buckets = defaultdict(lambda: [0, 0])
+
+    def add(self, event_id, model, values, sign):
+        summary, buckets = _contribution(model, values)
+        for field, amount in summary.items():
+            self.summary[event_id][field] += sign * amount
+        for dimension, bucket, count, total in buckets:
+            entry = self.buckets[event_id, dimension, bucket]
+            entry[0] += sign * count
+            entry[1] += sign * total
+
+    def remove(self, summary, buckets):
+        """Take away totals in the shape ``_totals`` returns."""
+        for event_id, fields in summary.items():
+            for field, amount in fields.items():
+                self.summary[event_id][field] -= amount
+        for row in buckets:
+            entry = self.buckets[row['event_id'], row['dimension'], row['bucket']]
+            entry[0] -= row['count']
+            entry[1] -= row['total']
+
+    def apply(self, connection):
+        summary_rows = [dict({f: 0 for f in SUMMARY_FIELDS}, event_id=event_id, **fields)
+                        for event_id, fields in self.summary.items() if any(fields.values())]
+        bucket_rows = [{'event_id': e, 'dimension': d, 'bucket': b, 'count': c, 'total': t}
+                       for (e, d, b), (c, t) in self.buckets.items() if c or t]
+        if summary_rows:
+            _upsert_add(connection, SUMMARY, ['event_id'], SUMMARY_FIELDS, summary_rows)
+            emptied = {row['event_id'] for row in summary_rows if row['area_count'] < 0}
+            if emptied:
+                # Everything hangs off an area, so an event without areas has nothing to show.
+                connection.execute(delete(SUMMARY).where(SUMMARY.c.event_id.in_(emptied),
+                                                         SUMMARY.c.area_count <= 0))
+        if bucket_rows:
+            _upsert_add(connection, BUCKETS, ['event_id', 'dimension', 'bucket'], ['count', 'total'],
+                        bucket_rows)
+            if any(row['count'] < 0 for row in bucket_rows):
+                connection.execute(delete(BUCKETS).where(
+                    BUCKETS.c.event_id.in_({row['event_id'] for row in bucket_rows}), BUCKETS.c.count <= 0))
+
+
+def _upsert_add(connection, table, keys, fields, rows):
+    """Add each row's ``fields`` onto the stored row, inserting it if missing."""
+    dialect = connection.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        statement = dialect_insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=keys, set_={f: table.c[f] + statement.excluded[f] for f in fields})
+        connection.execute(statement, rows)
+    elif dialect in ('mysql', 'mariadb'):
+        from sqlalchemy.dialects.mysql import insert as dialect_insert
+        statement = dialect_insert(table)
+        statement = statement.on_duplicate_key_update({f: table.c[f] + statement.inserted[f] for f in fields})
+        connection.execute(statement, rows)
+    else:
+        for row in rows:
+            result = connection.execute(
+                update(table).where(*[table.c[k] == row[k] for k in keys])
+                .values({f: table.c[f] + row[f] for f in fields}))
+            if not result.rowcount:
+                connection.execute(insert(table), row)
+
+
+# --- ORM write tracking ---
+
+def _changes(session):
+    return session.info.setdefault('summary_changes', [])
+
+
+def _values(target, model):
+    return {key: getattr(target, key) for key in TRACKED[model]}
+
+
+def _after_insert(mapper, connection, target):
+    _changes(inspect(target).session).append((mapper.class_, None, _values(target, mapper.class_)))
+
+
+def _before_update(mapper, connection, target):
+    model = mapper.class_
+    state = inspect(target)
+    changed = [key for key in TRACKED[model] if state.attrs[key].history.has_changes()]
+    if not changed:
+        return
+    new = _values(target, model)
+    old = dict(new)
+    unknown = []
+    for key in changed:
+        deleted = state.attrs[key].history.deleted
+        if deleted:
+            old[key] = deleted[0]
+        else:
+            unknown.append(key)
+    if unknown:
+        # Overwritten without being loaded first; the row still has the old value.
+        table = mapper.local_table
+        old.update(connection.execute(
+            select(*[table.c[key] for key in unknown])
+            .where(*[column == value for column, value in zip(mapper.primary_key, state.identity)])
+        ).one()._mapping)
+    if old != new:
+        _changes(state.session).append((model, old, new))
+
+
+def _before_delete(mapper, connection, target):
+    model = mapper.class_
+    session = inspect(target).session
+    values = _values(target, model)
+    if model is Affected_Area:
+        # The area row is gone by the time the flush ends; remember its event.
+        session.info.setdefault('summary_area_events', {})[target.area_id] = values['event_id']
+        # Its individuals, donations and evacuations go by ON DELETE CASCADE
+        # without mapper events (children deleted in this flush already are).
+        removed = session.info.setdefault('summary_removed', _Deltas())
+        summary, buckets = _totals(connection, Affected_Area.area_id == target.area_id)
+        for fields in summary.values():
+            fields['area_count'] = fields['population'] = 0
+        removed.remove(summary, buckets)
+    _changes(session).append((model, values, None))
+
+
+def _before_event_delete(mapper, connection, target):
+    for table in (BUCKETS, SUMMARY):
+        connection.execute(delete(table).where(table.c.event_id == target.eme_id))
+    inspect(target).session.info.setdefault('summary_dropped_events', set()).add(target.eme_id)
+
+
+def _area_events(connection, area_ids, known):
+    """Map area ids to event ids with one IN query for the ones not already known."""
+    events = {area_id: known[area_id] for area_id in area_ids if area_id in known}
+    missing = set(area_ids) - set(events)
+    if missing:
+        events.update(connection.execute(
+            select(Affected_Area.area_id, Affected_Area.event_id).where(Affected_Area.area_id.in_(missing))).all())
+    return events
+
+
+def _apply_changes(connection, changes, known_areas=None, dropped=(), removed=None):
+    """Turn ``(model, old values, new values)`` records (and ``removed`` totals) into one batch of upserts."""
+    known_areas = dict(known_areas or {})
+    area_ids = {values['area_id'] for model, old, new in changes if model is not Affected_Area
+                for values in (old, new) if values is not None}
+    areas = _area_events(connection, area_ids, known_areas)
+
+    deltas, rebuild = removed or _Deltas(), set()
+    for model, old, new in changes:
+        if model is Affected_Area:
+            if old is not None and new is not None and old['event_id'] != new['event_id']:
+                # The area took all of its rows to another event.
+                rebuild.update((old['event_id'], new['event_id']))
+                continue
+            old_event = old and old['event_id']
+            new_event = new and new['event_id']
+        else:
+            old_event = old and areas.get(old['area_id'])
+            new_event = new and areas.get(new['area_id'])
+        if old is not None and old_event is not None:
+            deltas.add(old_event, model, old, -1)
+        if new is not None and new_event is not None:
+            deltas.add(new_event, model, new, +1)
+
+    for event_id in set(deltas.summary) | {key[0] for key in deltas.buckets}:
+        if event_id in dropped or event_id in rebuild:
+            deltas.summary.pop(event_id, None)
+            for key in [key for key in deltas.buckets if key[0] == event_id]:
+                del deltas.buckets[key]
+    deltas.apply(connection)
+    if rebuild:
+        _rebuild(connection, rebuild - set(dropped))
+
+
+def _after_flush(session, flush_context):
+    changes = session.info.pop('summary_changes', None)
+    known = session.info.pop('summary_area_events', None)
+    dropped = session.info.pop('summary_dropped_events', ())
+    removed = session.info.pop('summary_removed', None)
+    if changes:
+        _apply_changes(session.connection(), changes, known, dropped, removed)
+
+
+def _on_bulk_inserted(model, rows):
+    if model in TRACKED:
+        _apply_changes(db.session.connection(), [(model, None, row) for row in rows])
+
+
+def remove_rows(connection, model, rows):
+    """Take ``rows`` (dicts with at least the tracked columns) out of the rollups.
+
+    For set-based deletes, which no mapper event sees; call it before the
+    rows (and, for children, their areas) are gone.
+    """
+    if model in TRACKED:
+        _apply_changes(connection, [(model, row, None) for row in rows])
+
+
+for model in TRACKED:
+    event.listen(model, 'after_insert', _after_insert)
+    event.listen(model, 'before_update', _before_update)
+    event.listen(model, 'before_delete', _before_delete)
+event.listen(Emergency_Event, 'before_delete', _before_event_delete)
+event.listen(Session, 'after_flush', _after_flush)
+bulk_inserted.connect(_on_bulk_inserted)
+
+
+# --- Full rebuild ---
+
+def _totals(connection, *where):
+    """``(summary fields per event, bucket rows)`` of the areas matching ``where`` and all under them."""
+    summary = defaultdict(lambda: dict.fromkeys(SUMMARY_FIELDS, 0))
+    buckets = []
+    area_event = Affected_Area.event_id
+
+    for event_id, count, population in connection.execute(
+            select(area_event, func.count(), func.coalesce(func.sum(Affected_Area.population), 0))
+            .where(*where).group_by(area_event)):
+        summary[event_id].update(area_count=count, population=population)
+
+    grouped = [
+        (Affected_Individual, 'individual_count', None, 'severity', Affected_Individual.severity, None),
+        (Donation, 'donation_count', 'donation_total', 'donation_type', Donation.type, Donation.amount),
+        (Evacuation, 'evacuation_count', None, 'transport', Evacuation.transport, None),
+        (Evacuation, None, None, 'team', Evacuation.team_id, None),
+    ]
+    for model, count_field, total_field, dimension, column, amount in grouped:
+        total = func.coalesce(func.sum(amount), 0) if amount is not None else func.sum(0)
+        statement = (select(area_event, column, func.count(), total)
+                     .join(Affected_Area, model.area_id == Affected_Area.area_id)
+                     .group_by(area_event, column))
+        if dimension == 'team':
+            statement = statement.where(column.isnot(None))
+        for event_id, bucket, count, bucket_total in connection.execute(statement.where(*where)):
+            bucket_total = bucket_total or 0
+            buckets.append({'event_id': event_id, 'dimension': dimension,
+                            'bucket': '' if bucket is None else str(bucket),
+                            'count': count, 'total': bucket_total})
+            if count_field:
+                summary[event_id][count_field] += count
+            if total_field:
+                summary[event_id][total_field] += bucket_total
+    return summary, buckets
+
+
+def _rebuild(connection, event_ids=None):
+    """Recompute the rollups of ``event_ids`` (all events if None) from the base tables."""
+    for table in (BUCKETS, SUMMARY):
+        statement = delete(table)
+        if event_ids is not None:
+            statement = statement.where(table.c.event_id.in_(event_ids))
+        connection.execute(statement)
+
+    summary, buckets = _totals(connection, *([] if event_ids is None else [Affected_Area.event_id.in_(event_ids)]))
+    if summary:
+        connection.execute(insert(SUMMARY), [dict(fields, event_id=e) for e, fields in summary.items()])
+    if buckets:
+        connection.execute(insert(BUCKETS), buckets)
+
+
+def rebuild_summaries(event_ids=None):
+    """Recompute the rollups from scratch (all events, or just ``event_ids``) and commit."""
+    _rebuild(db.session.connection(), event_ids)
+    db.session.commit()
+
+
+# --- Reading ---
+
+BUCKET_LABELS = {'severity': 'Unspecified', 'donation_type': 'Unspecified', 'transport': 'Unspecified'}
+
+
+def event_summary(event_id):
+    """Everything the dashboard shows for one event, read from the summary rows only."""
+    row = db.session.get(Event_Summary, event_id)
+    totals = {field: getattr(row, field) if row else 0 for field in SUMMARY_FIELDS}
+    dimensions = defaultdict(list)
+    for bucket in db.session.execute(
+            select(Event_Summary_Bucket).where(Event_Summary_Bucket.event_id == event_id)
+            .order_by(Event_Summary_Bucket.dimension, Event_Summary_Bucket.count.desc())).scalars():
+        label = bucket.bucket or BUCKET_LABELS.get(bucket.dimension, '')
+        dimensions[bucket.dimension].append((label, bucket.count, bucket.total))
+    team_ids = [int(label) for label, _, _ in dimensions.pop('team', [])]
+    teams = db.session.execute(select(Team.team_id, Team.team_name).where(Team.team_id.in_(team_ids))
+                               .order_by(Team.team_name)).all() if team_ids else []
+    return {'totals': totals, 'severity': dimensions['severity'],
+            'donation_type': dimensions['donation_type'], 'transport': dimensions['transport'],
+            'teams': teams}
@@ -0,0 +1,157 @@
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, has_app_context
+from flask_login import UserMixin
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session, object_session
+
+from app import cache, db, login_manager
+from app.models import User
+
+# Changing any of these drops the cached user.
+TRACKED = ('username', 'role', 'password_hash')
+
+
+class CachedUser(UserMixin):
+    """What a request needs of the logged-in ``User``, detached from any session."""
+
+    def __init__(self, id, username, role):
+        self.id = id
+        self.username = username
+        self.role = role
+
+    def __repr__(self):
+        return f'<User {self.username}>'
+
+
+class UserCache:
+    """Bounded LRU of recently loaded users, each trusted for ``ttl`` seconds."""
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None:
+                return None
+            user, expires = entry
+            if expires <= time.monotonic():
+                del self._users[user_id]
+                return None
+            self._users.move_to_end(user_id)
+            return user
+
+    def put(self, user):
+        if not self.size or self.ttl <= 0:
+            return
+        with self._lock:
+            self._users[user.id] = (user, time.monotonic() + self.ttl)
+            self._users.move_to_end(user.id)
+            while len(self._users) > self.size:
+                self._users.popitem(last=False)
+
+    def discard(self, *user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                self._users.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+
+
+def _key(user_id):
+    return f'user:{user_id}'
+
+
+@login_manager.user_loader
+def load_user(user_id):
+    """The session's user, from the local cache, then the shared one, then the database.
+
+    A role or password change committed by this process takes effect on
+    the next request; one made elsewhere within ``USER_CACHE_TTL`` seconds.
+    """
+    user_id = int(user_id)
+    users = current_app.extensions['user_cache']
+    user = users.get(user_id)
+    if user is not None:
+        return user
+    shared = current_app.config['USER_CACHE_SHARED']
+    row = cache.get(_key(user_id)) if shared else None
+    if row is None:
+        row = db.session.execute(select(User.id, User.username, User.role).where(User.id == user_id)).first()
+        if row is None:
+            return None
+        row = tuple(row)
+        if shared:
+            cache.set(_key(user_id), row, timeout=users.ttl)
+    user = CachedUser(*row)
+    users.put(user)
+    return user
+
+
+def invalidate_users(*user_ids):
+    """Forget the given users (every locally cached user if none are given)."""
+    users = current_app.extensions['user_cache']
+    if not user_ids:
+        users.clear()
+        return
+    users.discard(*user_ids)
+    if current_app.config['USER_CACHE_SHARED']:
+        for user_id in user_ids:
+            cache.delete(_key(user_id))
+
+
+def init_user_cache(app):
+    app.extensions['user_cache'] = UserCache(app.config['USER_CACHE_SIZE'], app.config['USER_CACHE_TTL'])
+
+
+# --- Invalidation ---
+
+def _pending(session):
+    return session.info.setdefault('stale_users', set())
+
+
+def _mark_changed(mapper, connection, target):
+    session = object_session(target)
+    state = inspect(target)
+    if session is not None and any(state.attrs[key].history.has_changes() for key in TRACKED):
+        _pending(session).add(target.id)
+
+
+def _mark_deleted(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        _pending(session).add(target.id)
+
+
+def _mark_bulk(orm_execute_state):
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and mapper.class_ is User:
+            # Affected ids are unknown: clear this process's cache; the shared
+            # cache catches up within USER_CACHE_TTL.
+            _pending(orm_execute_state.session).add(None)
+
+
+def _after_commit(session):
+    stale = session.info.pop('stale_users', None)
+    if stale and has_app_context():
+        invalidate_users(*([] if None in stale else stale))
+
+
+def _after_soft_rollback(session, previous_transaction):
+    session.info.pop('stale_users', None)
+
+
+event.listen(User, 'after_update', _mark_changed)
+event.listen(User, 'after_delete', _mark_deleted)
+event.listen(Session, 'do_orm_execute', _mark_bulk)
+event.listen(Session, 'after_commit', _after_commit)
+event.listen(Session, 'after_soft_rollback', _after_soft_rollback)
@@ -0,0 +1,97 @@
+import datetime
+import functools
+
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import Delete, UpdateBase
+
+from app import db
+from app.models import Table_Version
+
+VERSIONS = Table_Version.__table__
+
+
+def _utcnow():
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+
+def _written(connection):
+    return connection.info.setdefault('written_tables', set())
+
+
+@functools.lru_cache(maxsize=None)
+def _cascaded(name):
+    """``name`` and every table a delete from it reaches through ON DELETE CASCADE."""
+    reached, pending = {name}, [name]
+    while pending:
+        parent = pending.pop()
+        for table in db.metadata.tables.values():
+            if table.name not in reached and any(
+                    (fk.ondelete or '').upper() == 'CASCADE' and fk.column.table.name == parent
+                    for fk in table.foreign_keys):
+                reached.add(table.name)
+                pending.append(table.name)
+    return frozenset(reached)
+
+
+def _record_write(conn, clauseelement, multiparams, params, execution_options, result):
+    # Every INSERT/UPDATE/DELETE goes through here, whether it came from an
+    # ORM flush, a Core statement or a raw connection.
+    if isinstance(clauseelement, UpdateBase):
+        name = clauseelement.table.name
+        if name in db.metadata.tables and name != VERSIONS.name:
+            # Rows the database removes by cascade count as written too.
+            _written(conn).update(_cascaded(name) if isinstance(clauseelement, Delete) else (name,))
+
+
+def _forget_writes(conn):
+    conn.info.pop('written_tables', None)
+
+
+def bump_versions(connection, tables=None):
+    """Bump the counters of ``tables``, or of every table ``connection`` wrote since the last bump.
+
+    Runs in the caller's transaction, so the counters move exactly when the
+    data does. Sessions do this on commit; code writing through a raw
+    connection calls it before committing. Returns the names bumped.
+    """
+    names = set(tables) if tables is not None else connection.info.pop('written_tables', set())
+    if not names:
+        return names
+    now = _utcnow()
+    result = connection.execute(update(VERSIONS).where(VERSIONS.c.table_name.in_(names))
+                                .values(version=VERSIONS.c.version + 1, changed_at=now))
+    if result.rowcount < len(names):
+        known = set(connection.execute(
+            select(VERSIONS.c.table_name).where(VERSIONS.c.table_name.in_(names))).scalars())
+        connection.execute(insert(VERSIONS), [{'table_name': name, 'version': 1, 'changed_at': now}
+                                              for name in sorted(names - known)])
+    return names
+
+
+def _before_commit(session):
+    # Flush first so writes from the final flush (and its after_flush hooks)
+    # are counted too.
+    session.flush()
+    session.info['bumped_tables'] = bump_versions(session.connection())
+
+
+def _seed(target, connection, **kw):
+    now = _utcnow()
+    connection.execute(insert(VERSIONS), [{'table_name': table.name, 'version': 0, 'changed_at': now}
+                                          for table in target.metadata.sorted_tables])
+
+
+event.listen(Engine, 'after_execute', _record_write)
+event.listen(Engine, 'rollback', _forget_writes)
+event.listen(Session, 'before_commit', _before_commit)
+event.listen(VERSIONS, 'after_create', _seed)
+
+
+def table_versions(*names):
+    """``{table name: (version, changed_at)}`` read by primary key, without touching the tables themselves."""
+    rows = db.session.execute(select(VERSIONS.c.table_name, VERSIONS.c.version, VERSIONS.c.changed_at)
+                              .where(VERSIONS.c.table_name.in_(names)))
+    versions = {name: (version, changed_at) for name, version, changed_at in rows}
+    return {name: versions.get(name, (0, None)) for name in names}
@@ -0,0 +1,74 @@
+"""Compare two benchmark reports written by ``benchmarks.suite``.
+
+    python -m benchmarks.compare baseline.json candidate.json --threshold 0.2
+
+A route regresses when its p95 grows by more than ``--threshold`` (a
+fraction of the baseline), when it issues more SQL statements per request,
+or when it starts returning errors. Exits 1 if any route regressed.
+"""
+import argparse
+import json
+import sys
+
+
+def _load(path):
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def compare(baseline, candidate, threshold=0.2, min_ms=1.0):
+    """Return ``(rows, regressions)`` for every route present in both reports.
+
+    Latency changes under ``min_ms`` are ignored; they are timer noise on
+    routes that take a millisecond or two.
+    """
+    rows, regressions = [], []
+    for mode, routes in candidate['results'].items():
+        old_routes = baseline['results'].get(mode, {})
+        for name, new in routes.items():
+            old = old_routes.get(name)
+            if old is None:
+                continue
+            reasons = []
+            limit = max(old['p95_ms'] * (1 + threshold), old['p95_ms'] + min_ms)
+            if new['p95_ms'] > limit:
+                reasons.append(f"p95 {old['p95_ms']:.2f} -> {new['p95_ms']:.2f} ms")
+            if old['statements'] is not None and new['statements'] is not None \
+                    and new['statements'] > old['statements']:
+                reasons.append(f"statements {old['statements']} -> {new['statements']}")
+            if new['errors'] > old['errors']:
+                reasons.append(f"errors {old['errors']} -> {new['errors']}")
+            row = (mode, name, old['p95_ms'], new['p95_ms'], reasons)
+            rows.append(row)
+            if reasons:
+                regressions.append(row)
+    return rows, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='allowed relative p95 growth before flagging (default 0.2)')
+    parser.add_argument('--min-ms', type=float, default=1.0,
+                        help='ignore p95 changes smaller than this many ms (default 1.0)')
+    args = parser.parse_args(argv)
+
+    baseline, candidate = _load(args.baseline), _load(args.candidate)
+    if baseline['meta'].get('scale') != candidate['meta'].get('scale'):
+        print(f"warning: comparing scale {baseline['meta'].get('scale')} "
+              f"with scale {candidate['meta'].get('scale')}", file=sys.stderr)
+
+    rows, regressions = compare(baseline, candidate, args.threshold, args.min_ms)
+    for mode, name, old, new, reasons in rows:
+        change = (new - old) / old * 100 if old else 0.0
+        flag = 'REGRESSED ' + '; '.join(reasons) if reasons else ''
+        print(f'{mode:<12} {name:<45} {old:>9.2f} {new:>9.2f} ms {change:>+7.1f}%  {flag}')
+    print(f"\n{len(regressions)} regression(s) between {baseline['meta'].get('commit')} "
+          f"and {candidate['meta'].get('commit')}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,13 @@
+import os
+from config import Config
+
+
+class BenchmarkConfig(Config):
+    # TESTING keeps the app from writing logs/, but a failing route should
+    # be counted as an error rather than abort the run. CSRF and rate limits
+    # are off so the driver can post forms freely.
+    TESTING = True
+    PROPAGATE_EXCEPTIONS = False
+    SQLALCHEMY_DATABASE_URI = os.environ.get('BENCH_DATABASE_URL', 'sqlite:///bench.db')
+    WTF_CSRF_ENABLED = False
+    RATELIMIT_ENABLED = False
@@ -0,0 +1,86 @@
+"""Statements saved by loading Emergency_Event.tasks / Team.tasks on demand.
+
+Runs each page twice against a seeded in-memory database: once with the
+tasks collections forced back to the old ``lazy='subquery'`` behaviour and
+once with the current mapping, and prints the SQL statement count and mean
+latency of both.
+
+    python -m benchmarks.relationship_loading --rows 200
+"""
+import argparse
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, subqueryload
+
+from app import create_app, db
+from app.models import User, Emergency_Event, Affected_Area, Team, Task
+from config import TestConfig
+
+PAGES = ['/teams?per_page=100', '/events?per_page=100', '/area/new', '/evacuation/new']
+
+
+def seed(rows):
+    for i in range(rows):
+        task = Task(task_name=f'Task {i}')
+        event_ = Emergency_Event(disaster_type=f'Event {i}', tasks=[task])
+        team = Team(team_name=f'Team {i}', tasks=[task])
+        db.session.add_all([task, event_, team, Affected_Area(location=f'Area {i}', event=event_)])
+    admin = User(username='admin', role='admin')
+    admin.set_password('admin')
+    db.session.add(admin)
+    db.session.commit()
+
+
+def legacy_subquery_loading(state):
+    """Re-apply the old mapping: every SELECT of events/teams subquery-loads tasks."""
+    if not state.is_select or state.is_relationship_load or state.bind_mapper is None:
+        return
+    cls = state.bind_mapper.class_
+    if cls in (Emergency_Event, Team):
+        state.statement = state.statement.options(subqueryload(cls.tasks))
+
+
+def measure(client, url, repeat):
+    statements = []
+
+    def record(*args):
+        statements.append(args[2])
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            assert client.get(url).status_code == 200
+        elapsed = (time.perf_counter() - started) / repeat
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    return len(statements) // repeat, elapsed * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        seed(args.rows)
+        client = app.test_client()
+        client.post('/login', data={'username': 'admin', 'password': 'admin'})
+
+        print(f'{"page":<26}{"subquery":>10}{"on demand":>11}{"saved":>7}{"ms before":>11}{"ms after":>10}')
+        for url in PAGES:
+            event.listen(Session, 'do_orm_execute', legacy_subquery_loading)
+            try:
+                before, before_ms = measure(client, url, args.repeat)
+            finally:
+                event.remove(Session, 'do_orm_execute', legacy_subquery_loading)
+            after, after_ms = measure(client, url, args.repeat)
+            print(f'{url:<26}{before:>10}{after:>11}{before - after:>7}{before_ms:>11.2f}{after_ms:>10.2f}')
+
+
+if __name__ == '__main__':
+    main()
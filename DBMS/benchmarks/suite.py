@@ -0,0 +1,365 @@
+"""Route-level benchmark suite for the ``main`` blueprint.
+
+Loads a scaled synthetic dataset, then drives every route through the Flask
+test client and, optionally, through a real gunicorn process, recording
+latency percentiles, throughput, SQL statement count and peak RSS per route.
+
+    python -m benchmarks.suite --scale 100 --requests 50 --output bench.json
+    python -m benchmarks.suite --gunicorn --workers 4 --concurrency 8
+    python -m benchmarks.compare baseline.json bench.json
+
+Delete routes and logout are not driven: they destroy the fixtures every
+other route depends on.
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+
+from sqlalchemy import event
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_USER = ('bench', 'bench-password')
+
+# Values for URL arguments; every generated table has a row with id 1.
+SAMPLE_ARGS = {
+    'event_id': 1, 'team_id': 1, 'task_id': 1, 'res_id': 1, 'area_id': 1,
+    'individual_id': 1, 'donation_id': 1, 'eva_id': 1, 'fmt': 'csv',
+}
+ENDPOINT_ARGS = {
+    'main.bulk_import': {'entity': 'individuals'},
+    'main.export': {'entity': 'teams'},
+}
+
+# POST bodies per entity, shared by the new_* and update_* routes.
+FORM_DATA = {
+    'event': {'disaster_type': 'Benchmark', 'tasks': [1, 2]},
+    'team': {'team_name': 'Benchmark', 'personnel': 10, 'tasks': [1, 2]},
+    'task': {'task_name': 'Benchmark'},
+    'resource': {'type': 'Benchmark', 'team_id': [1]},
+    'area': {'location': 'Benchmark', 'population': 100, 'start_date': '2024-01-01', 'event_id': 1},
+    'individual': {'name': 'Benchmark', 'severity': 'Mild', 'area_id': 1},
+    'donation': {'name': 'Benchmark', 'type': 'Money', 'amount': '10.00', 'area_id': 1},
+    'evacuation': {'destination': 'Benchmark', 'transport': 'Bus', 'area_id': 1, 'team_id': 1},
+}
+# The live feed streams until the client goes away.
+SKIPPED = {'main.logout', 'main.live_feed'}
+LIST_ENDPOINTS = {'main.events', 'main.teams', 'main.tasks', 'main.resources', 'main.areas',
+                  'main.individuals', 'main.donations', 'main.evacuations'}
+ANONYMOUS = {'main.login', 'main.register'}
+
+
+class Case:
+    def __init__(self, endpoint, method, path, data=None, anonymous=False):
+        self.endpoint = endpoint
+        self.method = method
+        self.path = path
+        self.data = data
+        self.anonymous = anonymous
+
+    @property
+    def name(self):
+        return f'{self.method} {self.path}'
+
+
+def build_cases(app, list_args='per_page=50'):
+    """One case per (route, method) of the main blueprint, in URL-map order."""
+    cases = []
+    seen = set()
+    for rule in app.url_map.iter_rules():
+        endpoint = rule.endpoint
+        if not endpoint.startswith('main.') or endpoint in SKIPPED or endpoint.startswith('main.delete_'):
+            continue
+        args = dict(SAMPLE_ARGS, **ENDPOINT_ARGS.get(endpoint, {}))
+        if not set(rule.arguments) <= set(args):
+            continue
+        with app.test_request_context():
+            path = app.url_for(endpoint, **{k: args[k] for k in rule.arguments})
+        if (endpoint, path) in seen:
+            continue
+        seen.add((endpoint, path))
+        anonymous = endpoint in ANONYMOUS
+        is_list = endpoint in LIST_ENDPOINTS
+        cases.append(Case(endpoint, 'GET', f'{path}?{list_args}' if is_list else path, anonymous=anonymous))
+        if 'POST' in rule.methods:
+            if endpoint == 'main.login':
+                cases.append(Case(endpoint, 'POST', path, {'username': BENCH_USER[0], 'password': BENCH_USER[1]},
+                                  anonymous=True))
+            elif endpoint.startswith(('main.new_', 'main.update_')):
+                entity = endpoint.split('_', 1)[1]
+                cases.append(Case(endpoint, 'POST', path, FORM_DATA[entity]))
+    return cases
+
+
+def summarize(latencies, wall, statements, errors, rss_kb):
+    latencies_ms = sorted(l * 1000 for l in latencies)
+    cuts = statistics.quantiles(latencies_ms, n=100, method='inclusive') if len(latencies_ms) > 1 \
+        else latencies_ms * 99
+    return {
+        'requests': len(latencies_ms),
+        'errors': errors,
+        'p50_ms': round(cuts[49], 3),
+        'p95_ms': round(cuts[94], 3),
+        'p99_ms': round(cuts[98], 3),
+        'mean_ms': round(statistics.fmean(latencies_ms), 3),
+        'throughput_rps': round(len(latencies_ms) / wall, 1) if wall else None,
+        'statements': statements,
+        'peak_rss_kb': rss_kb,
+    }
+
+
+def _peak_rss_kb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+# --- in-process: Flask test client ---
+
+def run_test_client(app, cases, requests, warmup):
+    from app import db
+
+    statements = []
+    event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(1))
+
+    client = app.test_client()
+    client.post('/login', data={'username': BENCH_USER[0], 'password': BENCH_USER[1]})
+
+    results = {}
+    for case in cases:
+        def send():
+            c = app.test_client() if case.anonymous else client
+            return c.open(case.path, method=case.method, data=case.data)
+
+        for _ in range(warmup):
+            send()
+        latencies, errors = [], 0
+        del statements[:]
+        started = time.perf_counter()
+        for _ in range(requests):
+            t0 = time.perf_counter()
+            response = send()
+            response.get_data()  # drain streamed bodies, as a real client would
+            latencies.append(time.perf_counter() - t0)
+            errors += response.status_code >= 400
+            response.close()
+        wall = time.perf_counter() - started
+        results[case.name] = summarize(latencies, wall, round(len(statements) / requests, 2), errors,
+                                       _peak_rss_kb())
+        print(f'  {case.name:<45} p95 {results[case.name]["p95_ms"]:>9.2f} ms  '
+              f'{results[case.name]["statements"]:>6} stmts', file=sys.stderr)
+    return results
+
+
+# --- out of process: gunicorn ---
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def _opener(base, login=True):
+    # Talisman marks the session cookie Secure; send it over plain http too.
+    jar = CookieJar(DefaultCookiePolicy(secure_protocols=('https', 'wss', 'http')))
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar), _NoRedirect)
+    if login:
+        _send(opener, base, 'POST', '/login', {'username': BENCH_USER[0], 'password': BENCH_USER[1]})
+    return opener
+
+
+def _send(opener, base, method, path, data=None):
+    body = urllib.parse.urlencode(data, doseq=True).encode() if data is not None else None
+    request = urllib.request.Request(base + path, data=body, method=method)
+    try:
+        with opener.open(request, timeout=120) as response:
+            response.read()
+            return response.status, _server_timing_queries(response.headers)
+    except urllib.error.HTTPError as exc:
+        exc.read()
+        return exc.code, _server_timing_queries(exc.headers)
+
+
+def _server_timing_queries(headers):
+    """Statement count from the app's ``Server-Timing`` header, if present."""
+    match = re.search(r'desc="(\d+) queries"', headers.get('Server-Timing') or '')
+    return int(match.group(1)) if match else None
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _gunicorn_peak_rss_kb(master_pid):
+    """Largest VmHWM among gunicorn workers (Linux only)."""
+    try:
+        with open(f'/proc/{master_pid}/task/{master_pid}/children') as fh:
+            pids = [int(p) for p in fh.read().split()]
+        peaks = []
+        for pid in pids:
+            with open(f'/proc/{pid}/status') as fh:
+                for line in fh:
+                    if line.startswith('VmHWM:'):
+                        peaks.append(int(line.split()[1]))
+        return max(peaks) if peaks else None
+    except OSError:
+        return None
+
+
+def run_gunicorn(database_url, cases, requests, warmup, workers, concurrency):
+    port = _free_port()
+    base = f'http://127.0.0.1:{port}'
+    env = dict(os.environ, BENCH_DATABASE_URL=database_url)
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-w', str(workers), '-b', f'127.0.0.1:{port}',
+         '--log-level', 'warning', 'benchmarks.wsgi:app'],
+        cwd=ROOT, env=env)
+    try:
+        deadline = time.time() + 30
+        while True:
+            try:
+                _send(_opener(base, login=False), base, 'GET', '/login')
+                break
+            except OSError:
+                if time.time() > deadline or process.poll() is not None:
+                    raise RuntimeError('gunicorn did not start')
+                time.sleep(0.2)
+
+        openers = [_opener(base) for _ in range(concurrency)]
+        results = {}
+        for case in cases:
+            def worker(index, count):
+                opener = openers[index]
+                latencies, errors, queries = [], 0, []
+                for _ in range(count):
+                    if case.anonymous:
+                        opener = _opener(base, login=False)
+                    t0 = time.perf_counter()
+                    status, statements = _send(opener, base, case.method, case.path, case.data)
+                    latencies.append(time.perf_counter() - t0)
+                    errors += status >= 400
+                    if statements is not None:
+                        queries.append(statements)
+                return latencies, errors, queries
+
+            for _ in range(warmup):
+                worker(0, 1)
+            shares = [requests // concurrency + (i < requests % concurrency) for i in range(concurrency)]
+            started = time.perf_counter()
+            with ThreadPoolExecutor(concurrency) as pool:
+                outcomes = list(pool.map(worker, range(concurrency), shares))
+            wall = time.perf_counter() - started
+            latencies = [l for lats, _, _ in outcomes for l in lats]
+            errors = sum(e for _, e, _ in outcomes)
+            queries = [q for _, _, qs in outcomes for q in qs]
+            statements = round(statistics.fmean(queries), 2) if queries else None
+            results[case.name] = summarize(latencies, wall, statements, errors,
+                                           _gunicorn_peak_rss_kb(process.pid))
+            print(f'  {case.name:<45} p95 {results[case.name]["p95_ms"]:>9.2f} ms  '
+                  f'{results[case.name]["throughput_rps"]:>8} rps', file=sys.stderr)
+        return results
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def prepare(app, scale, seed, load):
+    from app import db
+    from app.datagen import generate
+    from app.models import User
+
+    with app.app_context():
+        db.create_all()
+        if load:
+            started = time.perf_counter()
+            generate(scale=scale, seed=seed)
+            print(f'Loaded scale {scale} dataset in {time.perf_counter() - started:.1f}s', file=sys.stderr)
+        User.query.filter_by(username=BENCH_USER[0]).delete()
+        user = User(username=BENCH_USER[0], role='admin')
+        user.set_password(BENCH_USER[1])
+        db.session.add(user)
+        db.session.commit()
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark every route of the main blueprint.')
+    parser.add_argument('--scale', type=float, default=50, help='Dataset scale factor (see populate_db.py).')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--database-url', help='Defaults to a fresh SQLite file in a temp directory.')
+    parser.add_argument('--skip-load', action='store_true', help='Reuse the data already in --database-url.')
+    parser.add_argument('--requests', type=int, default=30, help='Timed requests per route.')
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--only', help='Only run cases whose name contains this substring.')
+    parser.add_argument('--gunicorn', action='store_true', help='Also benchmark through a gunicorn process.')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--output', help='Write JSON results here (default: stdout).')
+    args = parser.parse_args(argv)
+
+    tmpdir = None
+    if not args.database_url:
+        tmpdir = tempfile.mkdtemp(prefix='dbms-bench-')
+        args.database_url = f'sqlite:///{os.path.join(tmpdir, "bench.db")}'
+    os.environ['BENCH_DATABASE_URL'] = args.database_url
+
+    from app import create_app
+    from benchmarks.config import BenchmarkConfig
+
+    class SuiteConfig(BenchmarkConfig):
+        SQLALCHEMY_DATABASE_URI = args.database_url
+
+    app = create_app(SuiteConfig)
+    prepare(app, args.scale, args.seed, load=not args.skip_load)
+    cases = [c for c in build_cases(app) if not args.only or args.only in c.name]
+
+    report = {
+        'meta': {
+            'commit': _git_commit(),
+            'scale': args.scale,
+            'seed': args.seed,
+            'database': app.config['SQLALCHEMY_DATABASE_URI'].split(':', 1)[0],
+            'requests': args.requests,
+            'python': platform.python_version(),
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': {},
+    }
+    print('Flask test client:', file=sys.stderr)
+    with app.app_context():
+        report['results']['test_client'] = run_test_client(app, cases, args.requests, args.warmup)
+    if args.gunicorn:
+        print(f'gunicorn ({args.workers} workers, {args.concurrency} clients):', file=sys.stderr)
+        report['meta'].update(workers=args.workers, concurrency=args.concurrency)
+        report['results']['gunicorn'] = run_gunicorn(args.database_url, cases, args.requests, args.warmup,
+                                                     args.workers, args.concurrency)
+
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as fh:
+            fh.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
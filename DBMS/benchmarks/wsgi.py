@@ -0,0 +1,5 @@
+"""WSGI entry point used when the suite benchmarks a real gunicorn process."""
+from app import create_app
+from benchmarks.config import BenchmarkConfig
+
+app = create_app(BenchmarkConfig)
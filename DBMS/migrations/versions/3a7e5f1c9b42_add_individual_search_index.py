@@ -0,0 +1,96 @@
+"""Add text search index over individuals and area locations
+
+Revision ID: 3a7e5f1c9b42
+Revises: 8d3f0b6c2e15
+Create Date: 2026-10-18 13:41:05.218374
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '3a7e5f1c9b42'
+down_revision = '8d3f0b6c2e15'
+branch_labels = None
+depends_on = None
+
+
+# A copy of app.search.SEARCH_DDL as of this revision.
+UPGRADE = {
+    'sqlite': [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS Individual_Search USING fts5("
+        "name, injury_type, location, tokenize = 'trigram')",
+        """CREATE TRIGGER IF NOT EXISTS search_individual_insert AFTER INSERT ON Affected_Individual BEGIN
+            INSERT INTO Individual_Search (rowid, name, injury_type, location)
+            SELECT new.individual_id, new.name, new.injury_type,
+                   (SELECT location FROM Affected_Area WHERE area_id = new.area_id);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS search_individual_update
+            AFTER UPDATE OF name, injury_type, area_id ON Affected_Individual BEGIN
+            UPDATE Individual_Search SET name = new.name, injury_type = new.injury_type,
+                   location = (SELECT location FROM Affected_Area WHERE area_id = new.area_id)
+            WHERE rowid = new.individual_id;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS search_individual_delete AFTER DELETE ON Affected_Individual BEGIN
+            DELETE FROM Individual_Search WHERE rowid = old.individual_id;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS search_area_update AFTER UPDATE OF location ON Affected_Area BEGIN
+            UPDATE Individual_Search SET location = new.location
+            WHERE rowid IN (SELECT individual_id FROM Affected_Individual WHERE area_id = new.area_id);
+        END""",
+        "INSERT INTO Individual_Search (rowid, name, injury_type, location) "
+        "SELECT i.individual_id, i.name, i.injury_type, a.location "
+        "FROM Affected_Individual i JOIN Affected_Area a ON a.area_id = i.area_id",
+    ],
+    'postgresql': [
+        'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+        'CREATE INDEX IF NOT EXISTS search_individual_name_trgm ON "Affected_Individual" '
+        'USING gin (name gin_trgm_ops)',
+        'CREATE INDEX IF NOT EXISTS search_individual_injury_trgm ON "Affected_Individual" '
+        'USING gin (injury_type gin_trgm_ops)',
+        'CREATE INDEX IF NOT EXISTS search_area_location_trgm ON "Affected_Area" '
+        'USING gin (location gin_trgm_ops)',
+        'CREATE INDEX IF NOT EXISTS search_individual_tsv ON "Affected_Individual" '
+        "USING gin (to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(injury_type, '')))",
+    ],
+    'mysql': [
+        'ALTER TABLE Affected_Individual ADD FULLTEXT INDEX search_individual_text (name, injury_type) '
+        'WITH PARSER ngram',
+        'ALTER TABLE Affected_Area ADD FULLTEXT INDEX search_area_location (location) WITH PARSER ngram',
+    ],
+    'mariadb': [
+        'ALTER TABLE Affected_Individual ADD FULLTEXT INDEX search_individual_text (name, injury_type)',
+        'ALTER TABLE Affected_Area ADD FULLTEXT INDEX search_area_location (location)',
+    ],
+}
+
+DOWNGRADE = {
+    'sqlite': [
+        'DROP TRIGGER IF EXISTS search_area_update',
+        'DROP TRIGGER IF EXISTS search_individual_delete',
+        'DROP TRIGGER IF EXISTS search_individual_update',
+        'DROP TRIGGER IF EXISTS search_individual_insert',
+        'DROP TABLE IF EXISTS Individual_Search',
+    ],
+    'postgresql': [
+        'DROP INDEX IF EXISTS search_individual_tsv',
+        'DROP INDEX IF EXISTS search_area_location_trgm',
+        'DROP INDEX IF EXISTS search_individual_injury_trgm',
+        'DROP INDEX IF EXISTS search_individual_name_trgm',
+    ],
+    'mysql': [
+        'ALTER TABLE Affected_Area DROP INDEX search_area_location',
+        'ALTER TABLE Affected_Individual DROP INDEX search_individual_text',
+    ],
+}
+DOWNGRADE['mariadb'] = DOWNGRADE['mysql']
+
+
+def upgrade():
+    for statement in UPGRADE.get(op.get_bind().dialect.name, []):
+        op.execute(statement)
+
+
+def downgrade():
+    for statement in DOWNGRADE.get(op.get_bind().dialect.name, []):
+        op.execute(statement)
@@ -0,0 +1,51 @@
+"""Add secondary indexes on foreign keys and filter columns
+
+Revision ID: 5c2e9d41a7b3
+Revises: 1439a2148737
+Create Date: 2026-10-18 09:12:40.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c2e9d41a7b3'
+down_revision = '1439a2148737'
+branch_labels = None
+depends_on = None
+
+# (table, index name, columns, leading column is a foreign key)
+INDEXES = [
+    ('Emergency_Event', 'ix_Emergency_Event_disaster_type', ['disaster_type'], False),
+    ('Affected_Area', 'ix_Affected_Area_event_id', ['event_id'], True),
+    ('Affected_Area', 'ix_Affected_Area_location', ['location'], False),
+    ('Affected_Individual', 'ix_Affected_Individual_area_id_severity', ['area_id', 'severity'], True),
+    ('Affected_Individual', 'ix_Affected_Individual_severity', ['severity'], False),
+    ('Donation', 'ix_Donation_area_id_type', ['area_id', 'type'], True),
+    ('Evacuation', 'ix_Evacuation_area_id_transport', ['area_id', 'transport'], True),
+    ('Evacuation', 'ix_Evacuation_team_id', ['team_id'], True),
+    ('Evacuation', 'ix_Evacuation_transport', ['transport'], False),
+    ('Team', 'ix_Team_team_name', ['team_name'], False),
+    ('Task', 'ix_Task_task_name', ['task_name'], False),
+    ('Event_Requires_Task', 'ix_Event_Requires_Task_task_id', ['task_id'], True),
+    ('Task_DoneBy_Team', 'ix_Task_DoneBy_Team_team_id', ['team_id'], True),
+    ('Team_Has_Resource', 'ix_Team_Has_Resource_res_id', ['res_id'], True),
+]
+
+
+def upgrade():
+    for table, name, columns, _ in INDEXES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.create_index(batch_op.f(name), columns, unique=False)
+
+
+def downgrade():
+    # InnoDB drops its implicit foreign key index once one of ours covers the
+    # column, and then refuses to drop ours while the constraint exists.
+    keep_fk_indexes = op.get_bind().dialect.name == 'mysql'
+    for table, name, _, backs_foreign_key in reversed(INDEXES):
+        if backs_foreign_key and keep_fk_indexes:
+            continue
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(batch_op.f(name))
@@ -0,0 +1,45 @@
+"""Add per-event summary rollup tables
+
+Revision ID: 8d3f0b6c2e15
+Revises: 5c2e9d41a7b3
+Create Date: 2026-10-18 11:02:17.530912
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d3f0b6c2e15'
+down_revision = '5c2e9d41a7b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('Event_Summary',
+    sa.Column('event_id', sa.Integer(), nullable=False),
+    sa.Column('area_count', sa.Integer(), nullable=False),
+    sa.Column('population', sa.BigInteger(), nullable=False),
+    sa.Column('individual_count', sa.Integer(), nullable=False),
+    sa.Column('donation_count', sa.Integer(), nullable=False),
+    sa.Column('donation_total', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('evacuation_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['event_id'], ['Emergency_Event.eme_id'], ),
+    sa.PrimaryKeyConstraint('event_id')
+    )
+    op.create_table('Event_Summary_Bucket',
+    sa.Column('event_id', sa.Integer(), nullable=False),
+    sa.Column('dimension', sa.String(length=20), nullable=False),
+    sa.Column('bucket', sa.String(length=255), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.Column('total', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.ForeignKeyConstraint(['event_id'], ['Emergency_Event.eme_id'], ),
+    sa.PrimaryKeyConstraint('event_id', 'dimension', 'bucket')
+    )
+    # Existing rows are rolled up afterwards with `flask rebuild-summaries`.
+
+
+def downgrade():
+    op.drop_table('Event_Summary_Bucket')
+    op.drop_table('Event_Summary')
@@ -0,0 +1,152 @@
+"""Add event lifecycle status and the archive tables
+
+Revision ID: a4d81f6c3b97
+Revises: f3b9d6e2c471
+Create Date: 2026-10-18 21:40:12.318044
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4d81f6c3b97'
+down_revision = 'f3b9d6e2c471'
+branch_labels = None
+depends_on = None
+
+# Archived rows keep their ids, so SQLite must stop reusing the ids of
+# deleted rows: these tables are rebuilt with AUTOINCREMENT. The rebuild
+# trips the search triggers naming them, which are dropped first and put
+# back after (a copy of app.search.SEARCH_DDL as of this revision).
+AUTOINCREMENT_TABLES = ['Emergency_Event', 'Affected_Area', 'Affected_Individual', 'Donation', 'Evacuation']
+SQLITE_TRIGGERS = {
+    'search_individual_insert':
+        """CREATE TRIGGER IF NOT EXISTS search_individual_insert AFTER INSERT ON Affected_Individual BEGIN
+            INSERT INTO Individual_Search (rowid, name, injury_type, location)
+            SELECT new.individual_id, new.name, new.injury_type,
+                   (SELECT location FROM Affected_Area WHERE area_id = new.area_id);
+        END""",
+    'search_individual_update':
+        """CREATE TRIGGER IF NOT EXISTS search_individual_update
+            AFTER UPDATE OF name, injury_type, area_id ON Affected_Individual BEGIN
+            UPDATE Individual_Search SET name = new.name, injury_type = new.injury_type,
+                   location = (SELECT location FROM Affected_Area WHERE area_id = new.area_id)
+            WHERE rowid = new.individual_id;
+        END""",
+    'search_individual_delete':
+        """CREATE TRIGGER IF NOT EXISTS search_individual_delete AFTER DELETE ON Affected_Individual BEGIN
+            DELETE FROM Individual_Search WHERE rowid = old.individual_id;
+        END""",
+    'search_area_update':
+        """CREATE TRIGGER IF NOT EXISTS search_area_update AFTER UPDATE OF location ON Affected_Area BEGIN
+            UPDATE Individual_Search SET location = new.location
+            WHERE rowid IN (SELECT individual_id FROM Affected_Individual WHERE area_id = new.area_id);
+        END""",
+}
+
+
+def _set_sqlite_autoincrement(autoincrement):
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for name in SQLITE_TRIGGERS:
+        op.execute(f'DROP TRIGGER IF EXISTS {name}')
+    for table in AUTOINCREMENT_TABLES:
+        with op.batch_alter_table(table, recreate='always',
+                                  table_kwargs={'sqlite_autoincrement': autoincrement}):
+            pass
+    for statement in SQLITE_TRIGGERS.values():
+        op.execute(statement)
+
+
+def upgrade():
+    _set_sqlite_autoincrement(True)
+
+    # Existing events are all active.
+    op.add_column('Emergency_Event', sa.Column('status', sa.String(length=20), nullable=False,
+                                               server_default='active'))
+    op.add_column('Emergency_Event', sa.Column('closed_at', sa.DateTime(), nullable=True))
+    op.create_index(op.f('ix_Emergency_Event_status'), 'Emergency_Event', ['status'], unique=False)
+
+    op.create_table('Archived_Event',
+    sa.Column('eme_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('disaster_type', sa.String(length=100), nullable=False),
+    sa.Column('closed_at', sa.DateTime(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('eme_id')
+    )
+    op.create_index(op.f('ix_Archived_Event_archived_at'), 'Archived_Event', ['archived_at'], unique=False)
+    op.create_index(op.f('ix_Archived_Event_disaster_type'), 'Archived_Event', ['disaster_type'], unique=False)
+    op.create_table('Archived_Event_Task',
+    sa.Column('event_id', sa.Integer(), nullable=False),
+    sa.Column('task_id', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('event_id', 'task_id')
+    )
+    op.create_table('Archived_Area',
+    sa.Column('area_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('location', sa.String(length=255), nullable=False),
+    sa.Column('population', sa.Integer(), nullable=True),
+    sa.Column('damage_extent', sa.String(length=255), nullable=True),
+    sa.Column('start_date', sa.Date(), nullable=True),
+    sa.Column('event_id', sa.Integer(), nullable=False),
+    sa.Column('latitude', sa.Float(), nullable=True),
+    sa.Column('longitude', sa.Float(), nullable=True),
+    sa.Column('grid_cell', sa.Integer(), nullable=True),
+    sa.PrimaryKeyConstraint('area_id')
+    )
+    op.create_index(op.f('ix_Archived_Area_event_id'), 'Archived_Area', ['event_id'], unique=False)
+    op.create_table('Archived_Individual',
+    sa.Column('individual_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('injury_type', sa.String(length=100), nullable=True),
+    sa.Column('severity', sa.String(length=50), nullable=True),
+    sa.Column('area_id', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('individual_id')
+    )
+    op.create_index(op.f('ix_Archived_Individual_area_id'), 'Archived_Individual', ['area_id'], unique=False)
+    op.create_index(op.f('ix_Archived_Individual_name'), 'Archived_Individual', ['name'], unique=False)
+    op.create_table('Archived_Donation',
+    sa.Column('donation_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('type', sa.String(length=50), nullable=True),
+    sa.Column('amount', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('area_id', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('donation_id')
+    )
+    op.create_index(op.f('ix_Archived_Donation_area_id'), 'Archived_Donation', ['area_id'], unique=False)
+    op.create_table('Archived_Evacuation',
+    sa.Column('eva_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('destination', sa.String(length=255), nullable=False),
+    sa.Column('location', sa.String(length=255), nullable=True),
+    sa.Column('transport', sa.String(length=100), nullable=True),
+    sa.Column('area_id', sa.Integer(), nullable=False),
+    sa.Column('team_id', sa.Integer(), nullable=True),
+    sa.Column('latitude', sa.Float(), nullable=True),
+    sa.Column('longitude', sa.Float(), nullable=True),
+    sa.Column('grid_cell', sa.Integer(), nullable=True),
+    sa.PrimaryKeyConstraint('eva_id')
+    )
+    op.create_index(op.f('ix_Archived_Evacuation_area_id'), 'Archived_Evacuation', ['area_id'], unique=False)
+
+
+def downgrade():
+    # Restore archived events first (`flask restore-event`); their rows go with these tables.
+    op.drop_index(op.f('ix_Archived_Evacuation_area_id'), table_name='Archived_Evacuation')
+    op.drop_table('Archived_Evacuation')
+    op.drop_index(op.f('ix_Archived_Donation_area_id'), table_name='Archived_Donation')
+    op.drop_table('Archived_Donation')
+    op.drop_index(op.f('ix_Archived_Individual_name'), table_name='Archived_Individual')
+    op.drop_index(op.f('ix_Archived_Individual_area_id'), table_name='Archived_Individual')
+    op.drop_table('Archived_Individual')
+    op.drop_index(op.f('ix_Archived_Area_event_id'), table_name='Archived_Area')
+    op.drop_table('Archived_Area')
+    op.drop_table('Archived_Event_Task')
+    op.drop_index(op.f('ix_Archived_Event_disaster_type'), table_name='Archived_Event')
+    op.drop_index(op.f('ix_Archived_Event_archived_at'), table_name='Archived_Event')
+    op.drop_table('Archived_Event')
+
+    op.drop_index(op.f('ix_Emergency_Event_status'), table_name='Emergency_Event')
+    op.drop_column('Emergency_Event', 'closed_at')
+    op.drop_column('Emergency_Event', 'status')
+
+    _set_sqlite_autoincrement(False)
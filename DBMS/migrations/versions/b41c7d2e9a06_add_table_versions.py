@@ -0,0 +1,40 @@
+"""Add per-table change counters for API validators
+
+Revision ID: b41c7d2e9a06
+Revises: 3a7e5f1c9b42
+Create Date: 2026-10-18 15:12:44.093517
+
+"""
+import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b41c7d2e9a06'
+down_revision = '3a7e5f1c9b42'
+branch_labels = None
+depends_on = None
+
+
+TABLES = [
+    'User', 'Emergency_Event', 'Task', 'Team', 'Resource', 'Affected_Area', 'Affected_Individual',
+    'Donation', 'Evacuation', 'Event_Requires_Task', 'Task_DoneBy_Team', 'Team_Has_Resource',
+    'Event_Summary', 'Event_Summary_Bucket', 'Table_Version',
+]
+
+
+def upgrade():
+    table_version = op.create_table('Table_Version',
+    sa.Column('table_name', sa.String(length=64), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('changed_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('table_name')
+    )
+    now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    op.bulk_insert(table_version, [{'table_name': name, 'version': 0, 'changed_at': now} for name in TABLES])
+
+
+def downgrade():
+    op.drop_table('Table_Version')
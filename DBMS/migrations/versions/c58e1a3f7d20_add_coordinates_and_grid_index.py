@@ -0,0 +1,37 @@
+"""Add coordinates and a grid spatial index to areas, evacuations and teams
+
+Revision ID: c58e1a3f7d20
+Revises: e7a2c94f1d38
+Create Date: 2026-10-18 19:02:37.551904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c58e1a3f7d20'
+down_revision = 'e7a2c94f1d38'
+branch_labels = None
+depends_on = None
+
+# Existing rows have no coordinates yet, so there are no cells to fill in.
+# Plain ALTERs rather than batch mode: rebuilding Affected_Area on SQLite
+# would trip the search index triggers that name it.
+LOCATED_TABLES = ['Affected_Area', 'Evacuation', 'Team']
+
+
+def upgrade():
+    for table in LOCATED_TABLES:
+        op.add_column(table, sa.Column('latitude', sa.Float(), nullable=True))
+        op.add_column(table, sa.Column('longitude', sa.Float(), nullable=True))
+        op.add_column(table, sa.Column('grid_cell', sa.Integer(), nullable=True))
+        op.create_index(op.f(f'ix_{table}_grid_cell'), table, ['grid_cell'], unique=False)
+
+
+def downgrade():
+    for table in reversed(LOCATED_TABLES):
+        op.drop_index(op.f(f'ix_{table}_grid_cell'), table_name=table)
+        op.drop_column(table, 'grid_cell')
+        op.drop_column(table, 'longitude')
+        op.drop_column(table, 'latitude')
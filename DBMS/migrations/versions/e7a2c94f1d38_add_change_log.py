@@ -0,0 +1,47 @@
+"""Add live feed change log outbox
+
+Revision ID: e7a2c94f1d38
+Revises: b41c7d2e9a06
+Create Date: 2026-10-18 17:26:51.402118
+
+"""
+import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7a2c94f1d38'
+down_revision = 'b41c7d2e9a06'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('Change_Log',
+    sa.Column('change_id', sa.Integer(), nullable=False),
+    sa.Column('entity', sa.String(length=20), nullable=False),
+    sa.Column('action', sa.String(length=10), nullable=False),
+    sa.Column('row_id', sa.Integer(), nullable=True),
+    sa.Column('area_id', sa.Integer(), nullable=True),
+    sa.Column('event_id', sa.Integer(), nullable=True),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('change_id')
+    )
+    with op.batch_alter_table('Change_Log', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_Change_Log_created_at'), ['created_at'], unique=False)
+    now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    op.bulk_insert(sa.table('Table_Version', sa.column('table_name'), sa.column('version'),
+                            sa.column('changed_at')),
+                   [{'table_name': 'Change_Log', 'version': 0, 'changed_at': now}])
+
+
+def downgrade():
+    versions = sa.table('Table_Version', sa.column('table_name'))
+    op.execute(versions.delete().where(versions.c.table_name == 'Change_Log'))
+    with op.batch_alter_table('Change_Log', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_Change_Log_created_at'))
+
+    op.drop_table('Change_Log')
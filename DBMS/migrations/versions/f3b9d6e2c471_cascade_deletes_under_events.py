@@ -0,0 +1,93 @@
+"""Cascade deletes from events to areas and from areas to their rows
+
+Revision ID: f3b9d6e2c471
+Revises: c58e1a3f7d20
+Create Date: 2026-10-18 20:14:09.338127
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3b9d6e2c471'
+down_revision = 'c58e1a3f7d20'
+branch_labels = None
+depends_on = None
+
+# Gives SQLite's unnamed foreign keys a name batch mode can drop them by.
+NAMING = {'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s'}
+
+# (table, column, referred table, referred column)
+FOREIGN_KEYS = [
+    ('Affected_Individual', 'area_id', 'Affected_Area', 'area_id'),
+    ('Donation', 'area_id', 'Affected_Area', 'area_id'),
+    ('Evacuation', 'area_id', 'Affected_Area', 'area_id'),
+    ('Affected_Area', 'event_id', 'Emergency_Event', 'eme_id'),
+    ('Event_Requires_Task', 'event_id', 'Emergency_Event', 'eme_id'),
+    ('Event_Summary', 'event_id', 'Emergency_Event', 'eme_id'),
+    ('Event_Summary_Bucket', 'event_id', 'Emergency_Event', 'eme_id'),
+]
+
+# SQLite rebuilds the tables to change their foreign keys, which the search
+# triggers name; they are dropped first and put back after. A copy of the
+# triggers in app.search.SEARCH_DDL as of this revision.
+SQLITE_TRIGGERS = {
+    'search_individual_insert':
+        """CREATE TRIGGER IF NOT EXISTS search_individual_insert AFTER INSERT ON Affected_Individual BEGIN
+            INSERT INTO Individual_Search (rowid, name, injury_type, location)
+            SELECT new.individual_id, new.name, new.injury_type,
+                   (SELECT location FROM Affected_Area WHERE area_id = new.area_id);
+        END""",
+    'search_individual_update':
+        """CREATE TRIGGER IF NOT EXISTS search_individual_update
+            AFTER UPDATE OF name, injury_type, area_id ON Affected_Individual BEGIN
+            UPDATE Individual_Search SET name = new.name, injury_type = new.injury_type,
+                   location = (SELECT location FROM Affected_Area WHERE area_id = new.area_id)
+            WHERE rowid = new.individual_id;
+        END""",
+    'search_individual_delete':
+        """CREATE TRIGGER IF NOT EXISTS search_individual_delete AFTER DELETE ON Affected_Individual BEGIN
+            DELETE FROM Individual_Search WHERE rowid = old.individual_id;
+        END""",
+    'search_area_update':
+        """CREATE TRIGGER IF NOT EXISTS search_area_update AFTER UPDATE OF location ON Affected_Area BEGIN
+            UPDATE Individual_Search SET location = new.location
+            WHERE rowid IN (SELECT individual_id FROM Affected_Individual WHERE area_id = new.area_id);
+        END""",
+}
+
+
+def _conventional_name(table, column, referred):
+    return NAMING['fk'] % {'table_name': table, 'column_0_name': column, 'referred_table_name': referred}
+
+
+def _foreign_key_name(table, column, referred):
+    for foreign_key in sa.inspect(op.get_bind()).get_foreign_keys(table):
+        if foreign_key['constrained_columns'] == [column]:
+            return foreign_key['name'] or _conventional_name(table, column, referred)
+    return None
+
+
+def _set_ondelete(ondelete):
+    sqlite = op.get_bind().dialect.name == 'sqlite'
+    if sqlite:
+        for name in SQLITE_TRIGGERS:
+            op.execute(f'DROP TRIGGER IF EXISTS {name}')
+    for table, column, referred, referred_column in FOREIGN_KEYS:
+        name = _foreign_key_name(table, column, referred)
+        with op.batch_alter_table(table, naming_convention=NAMING) as batch_op:
+            if name is not None:
+                batch_op.drop_constraint(name, type_='foreignkey')
+            batch_op.create_foreign_key(_conventional_name(table, column, referred), referred, [column], [referred_column], ondelete=ondelete)
+    if sqlite:
+        for statement in SQLITE_TRIGGERS.values():
+            op.execute(statement)
+
+
+def upgrade():
+    _set_ondelete('CASCADE')
+
+
+def downgrade():
+    _set_ondelete(None)
@@ -1,12 +1,18 @@
 import pytest
+from contextlib import contextmanager
+from flask import g, has_app_context
+from sqlalchemy import event
 from app import create_app, db
 from app.models import User
+from config import TestConfig
 
 @pytest.fixture(scope='module')
 def test_client():
-    flask_app = create_app()
-    flask_app.config['TESTING'] = True
-    flask_app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    flask_app = create_app(TestConfig)
+
+    # Requests share the app context pushed below, and with it ``g``. Drop the
+    # user Flask-Login keeps there so each request loads it, as in production.
+    flask_app.teardown_request(lambda exc: has_app_context() and g.pop('_login_user', None))
 
     with flask_app.test_client() as testing_client:
         with flask_app.app_context():
@@ -25,3 +31,33 @@ def init_database(test_client):
 
     db.session.delete(user)
     db.session.commit()
+
+@pytest.fixture(scope='module')
+def admin_client(test_client):
+    admin = User(username='admin', role='admin')
+    admin.set_password('adminpass')
+    db.session.add(admin)
+    db.session.commit()
+    test_client.post('/login', data=dict(username='admin', password='adminpass'))
+    test_client.get('/')  # caches the user, as any later request would find it
+
+    yield test_client
+
+    test_client.get('/logout')
+
+@pytest.fixture
+def count_queries():
+    """Context manager collecting every SQL statement sent to the engine."""
+    @contextmanager
+    def counter():
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+    return counter
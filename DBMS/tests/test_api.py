@@ -0,0 +1,95 @@
+import datetime
+from decimal import Decimal
+from app import db, api
+from app.models import Emergency_Event, Affected_Area, Affected_Individual, Donation, Task
+from app.associations import EVENT_TASKS, sync_links
+from app.versions import table_versions
+
+def _seed():
+    event = Emergency_Event(disaster_type='Flood')
+    area = Affected_Area(location='Delta', population=900, start_date=datetime.date(2024, 3, 1), event=event)
+    db.session.add_all([event, area])
+    db.session.flush()
+    db.session.add_all([Affected_Individual(name=f'Person {i}', severity='Severe' if i % 2 else 'Mild',
+                                            area_id=area.area_id) for i in range(5)])
+    db.session.add(Donation(name='Co-op', type='Money', amount=Decimal('12.50'), area_id=area.area_id))
+    db.session.commit()
+    return event, area
+
+def test_fast_and_stdlib_encoders_agree(monkeypatch):
+    payload = {'items': [{'name': 'José', 'amount': Decimal('1.10'), 'day': datetime.date(2024, 1, 2),
+                          'missing': None}], 'next': None}
+    fast = api.dumps(payload)
+    monkeypatch.setattr(api, 'orjson', None)
+    assert api.dumps(payload) == fast
+
+def test_requires_login(test_client):
+    response = test_client.get('/api/v1/individuals')
+    assert response.status_code == 401
+    assert response.get_json()['error'] == 'Unauthorized'
+
+def test_fields_filters_and_cursors(admin_client):
+    _, area = _seed()
+    response = admin_client.get('/api/v1/individuals?fields=name&severity=Severe&per_page=1')
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['items'] == [{'name': 'Person 1'}]
+    body = admin_client.get(body['next']).get_json()
+    assert body['items'] == [{'name': 'Person 3'}]
+    assert body['next'] is None and body['prev'] is not None
+
+    area_row = admin_client.get(f'/api/v1/areas/{area.area_id}').get_json()
+    assert area_row['start_date'] == '2024-03-01'
+    donation = admin_client.get('/api/v1/donations?fields=amount').get_json()['items'][0]
+    assert donation == {'amount': '12.50'}
+
+    assert admin_client.get('/api/v1/individuals?fields=password').status_code == 400
+    assert admin_client.get('/api/v1/individuals/999999').get_json()['error'] == 'Not Found'
+    assert admin_client.get('/api/v1/users').status_code == 404
+    assert 'team-resources' in admin_client.get('/api/v1/').get_json()['resources']
+
+def test_unchanged_poll_gets_304_without_reading_the_table(admin_client, count_queries):
+    first = admin_client.get('/api/v1/individuals?per_page=2')
+    etag = first.headers['ETag']
+    assert first.headers['Last-Modified']
+
+    with count_queries() as statements:
+        response = admin_client.get('/api/v1/individuals?per_page=2', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag
+    assert not any('FROM "Affected_Individual"' in s for s in statements)
+
+    since = admin_client.get('/api/v1/individuals?per_page=2',
+                             headers={'If-Modified-Since': first.headers['Last-Modified']})
+    assert since.status_code == 304
+    # Another query string is another representation.
+    assert admin_client.get('/api/v1/individuals?per_page=3', headers={'If-None-Match': etag}).status_code == 200
+
+def test_writes_bump_versions_transactionally(admin_client):
+    etag = admin_client.get('/api/v1/individuals').headers['ETag']
+    before = table_versions('Affected_Individual', 'Event_Summary')
+
+    person = Affected_Individual.query.filter_by(name='Person 0').one()
+    person.severity = 'Critical'
+    db.session.commit()
+    after = table_versions('Affected_Individual', 'Event_Summary')
+    assert after['Affected_Individual'][0] == before['Affected_Individual'][0] + 1
+    # The rollup written from the flush hook is counted too.
+    assert after['Event_Summary'][0] >= before['Event_Summary'][0]
+    assert admin_client.get('/api/v1/individuals', headers={'If-None-Match': etag}).status_code == 200
+
+    person.severity = 'Mild'
+    db.session.flush()
+    db.session.rollback()
+    assert table_versions('Affected_Individual') == {'Affected_Individual': after['Affected_Individual']}
+
+    event = Emergency_Event.query.filter_by(disaster_type='Flood').first()
+    task = Task(task_name='Sandbags')
+    db.session.add(task)
+    db.session.commit()
+    links = table_versions('Event_Requires_Task')['Event_Requires_Task'][0]
+    sync_links(EVENT_TASKS, event, [task.task_id])
+    db.session.commit()
+    assert table_versions('Event_Requires_Task')['Event_Requires_Task'][0] == links + 1
+    items = admin_client.get(f'/api/v1/event-tasks?event_id={event.eme_id}').get_json()['items']
+    assert items == [{'event_id': event.eme_id, 'task_id': task.task_id}]
@@ -21,6 +21,7 @@ def test_login_with_valid_credentials(test_client, init_database):
     ), follow_redirects=True)
     assert response.status_code == 200
     assert b'Welcome' in response.data
+    test_client.get('/logout')
 
 def test_login_with_invalid_credentials(test_client):
     response = test_client.post('/login', data=dict(
@@ -0,0 +1,161 @@
+import datetime
+import pytest
+from sqlalchemy import func, select
+from app import db
+from app.archive import ArchiveError, event_archiving, start_restoring
+from app.choices import choices
+from app.models import (Emergency_Event, Affected_Area, Affected_Individual, Donation, Evacuation, Task, Team,
+                        Event_Summary, Event_Summary_Bucket, event_requires_task, Archived_Event, Archived_Area,
+                        Archived_Individual, Archived_Donation, Archived_Evacuation, archived_event_task)
+from app.summaries import event_summary, rebuild_summaries
+
+HOT = (Affected_Area, Affected_Individual, Donation, Evacuation)
+COLD = (Archived_Area, Archived_Individual, Archived_Donation, Archived_Evacuation)
+
+def _event(name, areas=2, per_area=4, status='closed'):
+    team = Team(team_name=f'{name} team')
+    event = Emergency_Event(disaster_type=name, status=status, tasks=[Task(task_name=f'{name} task')])
+    db.session.add_all([team, event])
+    for a in range(areas):
+        area = Affected_Area(location=f'{name} {a}', population=50, event=event, latitude=10.0 + a, longitude=20.0)
+        db.session.add(area)
+        for i in range(per_area):
+            area.individuals.append(Affected_Individual(name=f'{name} person {a}.{i}', severity='Mild'))
+            area.donations.append(Donation(name=f'{name} donor {a}.{i}', type='Food', amount=5))
+            area.evacuations.append(Evacuation(destination='Shelter', transport='Bus', team=team))
+    db.session.commit()
+    return event.eme_id
+
+def _rows(models, event_id):
+    """Every row under ``event_id`` in ``models`` (operational or archive), keyed by table."""
+    # Part way through a move, rows can sit in one place and their area in the other.
+    areas = (select(Affected_Area.area_id).where(Affected_Area.event_id == event_id)
+             .union(select(Archived_Area.area_id).where(Archived_Area.event_id == event_id)))
+    found = {}
+    for model in models:
+        table = model.__table__
+        where = table.c.event_id == event_id if 'event_id' in table.c else table.c.area_id.in_(areas)
+        found[model.__tablename__] = [tuple(row) for row in db.session.execute(
+            select(table).where(where).order_by(*table.primary_key.columns))]
+    return found
+
+def _hot(event_id):
+    return _rows(HOT, event_id)
+
+def _cold(event_id):
+    return _rows(COLD, event_id)
+
+def _total(rows):
+    return sum(len(table) for table in rows.values())
+
+def _summary(event_id):
+    return (db.session.execute(select(Event_Summary.__table__).where(Event_Summary.event_id == event_id)).all(),
+            db.session.execute(select(Event_Summary_Bucket.__table__).where(Event_Summary_Bucket.event_id == event_id)
+                               .order_by('dimension', 'bucket')).all())
+
+def test_archive_and_restore_round_trip(admin_client):
+    event_id = _event('Landslide')
+    before, summary = _hot(event_id), _summary(event_id)
+
+    response = admin_client.post(f'/event/{event_id}/archive', follow_redirects=True)
+    assert b'The event has been archived!' in response.data
+    assert db.session.get(Emergency_Event, event_id) is None
+    assert _total(_hot(event_id)) == 0
+    assert _total(_cold(event_id)) == _total(before) == 26
+    assert db.session.get(Event_Summary, event_id) is None
+    assert db.session.execute(select(func.count()).select_from(archived_event_task)
+                              .where(archived_event_task.c.event_id == event_id)).scalar() == 1
+    assert all(label != 'Landslide' for _, label in choices('events'))
+
+    listing = admin_client.get('/archive').get_data(as_text=True)
+    assert 'Landslide' in listing
+    page = admin_client.get(f'/archive/{event_id}?q=Landslide+person+1').get_data(as_text=True)
+    assert 'Landslide person 1.3' in page and 'Landslide person 0.0' not in page
+    assert admin_client.get(f'/archive/{event_id}?q=100%25').status_code == 200
+
+    response = admin_client.post(f'/archive/{event_id}/restore', follow_redirects=True)
+    assert b'The event has been restored!' in response.data
+    assert _hot(event_id) == before
+    assert _total(_cold(event_id)) == 0
+    assert db.session.get(Archived_Event, event_id) is None
+    event = db.session.get(Emergency_Event, event_id)
+    assert event.status == 'closed' and [task.task_name for task in event.tasks] == ['Landslide task']
+    assert _summary(event_id) == summary
+    assert event_summary(event_id)['totals']['individual_count'] == 8
+
+def test_only_closed_events_are_archived(admin_client):
+    event_id = _event('Heatwave', status='active')
+    response = admin_client.post(f'/event/{event_id}/archive', follow_redirects=True)
+    assert b'Only closed events can be archived.' in response.data
+    assert _total(_hot(event_id)) == 26 and _total(_cold(event_id)) == 0
+
+    admin_client.post(f'/event/{event_id}/update', data={'disaster_type': 'Heatwave', 'status': 'closed'})
+    event = db.session.get(Emergency_Event, event_id)
+    assert event.status == 'closed' and event.closed_at is not None
+    assert admin_client.get('/events?status=closed').get_data(as_text=True).count('Heatwave') == 1
+
+def test_stopped_moves_keep_every_row_in_one_place(test_client):
+    event_id = _event('Cyclone')
+    total = _total(_hot(event_id))
+    done = []
+
+    def stop(moved):
+        done.append(moved)
+        if moved >= 5:
+            raise RuntimeError('worker stopped')
+
+    with pytest.raises(RuntimeError):
+        event_archiving(event_id).run(3, commit_chunks=True, progress=stop)
+    db.session.rollback()
+    assert 0 < _total(_cold(event_id)) < total
+    assert _total(_hot(event_id)) + _total(_cold(event_id)) == total
+    incremental = _summary(event_id)
+    rebuild_summaries([event_id])
+    assert _summary(event_id) == incremental
+
+    assert event_archiving(event_id).run(3, commit_chunks=True) == total - done[-1]
+    assert _total(_cold(event_id)) == total
+
+    with pytest.raises(RuntimeError):
+        start_restoring(event_id).run(3, commit_chunks=True, progress=stop)
+    db.session.rollback()
+    assert db.session.get(Emergency_Event, event_id).status == 'restoring'
+    assert _total(_hot(event_id)) + _total(_cold(event_id)) == total
+    assert start_restoring(event_id).run(3, commit_chunks=True) == total - done[-1]
+    assert _total(_hot(event_id)) == total
+    assert db.session.get(Emergency_Event, event_id).status == 'closed'
+
+def test_restore_survives_deleted_teams_and_refuses_reused_ids(test_client):
+    event_id = _event('Drought', areas=1, per_area=2)
+    event_archiving(event_id).run(100)
+    team = Team.query.filter_by(team_name='Drought team').one()
+    db.session.delete(team)
+    db.session.commit()
+    start_restoring(event_id).run(100)
+    assert [evacuation.team_id for evacuation in
+            Evacuation.query.join(Affected_Area).filter(Affected_Area.event_id == event_id)] == [None, None]
+
+    event_archiving(event_id).run(100)
+    individual_id = db.session.execute(select(func.min(Archived_Individual.individual_id)).join(
+        Archived_Area, Archived_Area.area_id == Archived_Individual.area_id)
+        .where(Archived_Area.event_id == event_id)).scalar()
+    squatter = _event('Squatter', areas=1, per_area=0, status='active')
+    db.session.add(Affected_Individual(individual_id=individual_id, name='Squatter',
+                                       area_id=Affected_Area.query.filter_by(event_id=squatter).one().area_id))
+    db.session.commit()
+    with pytest.raises(ArchiveError, match='Affected_Individual'):
+        start_restoring(event_id)
+
+def test_cli_archives_events_closed_long_ago(test_client):
+    old, recent = _event('Old flood', areas=1, per_area=1), _event('New flood', areas=1, per_area=1)
+    db.session.get(Emergency_Event, old).closed_at = datetime.datetime(2020, 1, 1)
+    db.session.get(Emergency_Event, recent).closed_at = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    db.session.commit()
+    runner = test_client.application.test_cli_runner()
+    result = runner.invoke(args=['archive-events', '--days', '30'])
+    assert f'Archived event {old} (4 rows).' in result.output
+    assert db.session.get(Emergency_Event, recent) is not None
+
+    result = runner.invoke(args=['restore-event', str(old)])
+    assert f'Restored event {old} (4 rows).' in result.output
+    assert runner.invoke(args=['restore-event', str(old)]).exit_code != 0
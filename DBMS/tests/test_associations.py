@@ -0,0 +1,74 @@
+from app import db
+from app.associations import EVENT_TASKS, linked_ids, sync_links
+from app.models import Emergency_Event, Team, Task, Resource, Team_Has_Resource
+
+def _tasks(*names):
+    tasks = [Task(task_name=name) for name in names]
+    db.session.add_all(tasks)
+    db.session.commit()
+    return [task.task_id for task in tasks]
+
+def _link_statements(statements, table):
+    return [s.split()[0] for s in statements if f'"{table}"' in s and not s.startswith('SELECT')]
+
+def test_update_team_applies_diff_in_one_delete_and_one_insert(admin_client, count_queries):
+    a, b, c, d = _tasks('Sort', 'Load', 'Haul', 'Unload')
+    team = Team(team_name='Logistics')
+    db.session.add(team)
+    db.session.commit()
+    admin_client.post(f'/team/{team.team_id}/update', data={'team_name': 'Logistics', 'tasks': [a, b, c]})
+
+    with count_queries() as statements:
+        response = admin_client.post(f'/team/{team.team_id}/update',
+                                     data={'team_name': 'Logistics', 'tasks': [b, c, d]})
+    assert response.status_code == 302
+    assert _link_statements(statements, 'Task_DoneBy_Team') == ['DELETE', 'INSERT']
+    assert sum('WHERE "Task".task_id IN' in s for s in statements) == 1
+    db.session.expire_all()
+    assert sorted(task.task_id for task in db.session.get(Team, team.team_id).tasks) == [b, c, d]
+
+def test_unchanged_links_write_nothing(admin_client, count_queries):
+    a, b = _tasks('Patrol', 'Report')
+    event = Emergency_Event(disaster_type='Wildfire')
+    db.session.add(event)
+    db.session.commit()
+    admin_client.post(f'/event/{event.eme_id}/update', data={'disaster_type': 'Wildfire', 'tasks': [a, b]})
+
+    with count_queries() as statements:
+        admin_client.post(f'/event/{event.eme_id}/update', data={'disaster_type': 'Wildfire', 'tasks': [b, a]})
+    assert _link_statements(statements, 'Event_Requires_Task') == []
+    assert linked_ids(EVENT_TASKS, event.eme_id) == sorted([a, b])
+
+def test_new_event_inserts_links_in_one_statement(admin_client, count_queries):
+    ids = _tasks('Map', 'Survey', 'Mark')
+    with count_queries() as statements:
+        admin_client.post('/event/new', data={'disaster_type': 'Blizzard', 'tasks': ids})
+    assert _link_statements(statements, 'Event_Requires_Task') == ['INSERT']
+    event = Emergency_Event.query.filter_by(disaster_type='Blizzard').one()
+    assert linked_ids(EVENT_TASKS, event.eme_id) == sorted(ids)
+
+def test_resource_update_keeps_quantities_of_kept_links(admin_client):
+    teams = [Team(team_name=f'Depot {i}') for i in range(3)]
+    resource = Resource(type='Tarps')
+    db.session.add_all(teams + [resource])
+    db.session.flush()
+    db.session.add(Team_Has_Resource(team_id=teams[0].team_id, res_id=resource.res_id, quantity=40))
+    db.session.commit()
+
+    response = admin_client.get(f'/resource/{resource.res_id}/update')
+    assert response.status_code == 200
+    admin_client.post(f'/resource/{resource.res_id}/update',
+                      data={'type': 'Tarps', 'team_id': [teams[0].team_id, teams[2].team_id]})
+    rows = dict(db.session.query(Team_Has_Resource.team_id, Team_Has_Resource.quantity)
+                .filter_by(res_id=resource.res_id))
+    assert rows == {teams[0].team_id: 40, teams[2].team_id: 1}
+
+def test_sync_links_drops_unknown_targets(test_client):
+    event = Emergency_Event(disaster_type='Fog')
+    db.session.add(event)
+    db.session.flush()
+    (a,) = _tasks('Guide')
+    added, removed = sync_links(EVENT_TASKS, event, [a, 987654], current=())
+    db.session.commit()
+    assert added == {a} and removed == set()
+    assert [task.task_id for task in event.tasks] == [a]
@@ -0,0 +1,115 @@
+import datetime
+import json
+import pytest
+from flask import current_app
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import DatabaseError
+from app import db
+from app.models import Emergency_Event, Affected_Area, Affected_Individual, Team, User, Audit_Log
+
+def _writer():
+    return current_app.extensions['audit']
+
+def _entries(**filters):
+    _writer().flush()
+    return Audit_Log.query.filter_by(**filters).order_by(Audit_Log.audit_id).all()
+
+def test_route_changes_record_user_route_and_values(admin_client):
+    admin_client.post('/event/new', data={'disaster_type': 'Tsunami', 'status': 'active'})
+    event_id = Emergency_Event.query.filter_by(disaster_type='Tsunami').one().eme_id
+    # Nothing is written until the buffer is flushed.
+    assert Audit_Log.query.filter_by(entity='Emergency_Event').count() == 0
+    admin_client.post(f'/event/{event_id}/update', data={'disaster_type': 'Tidal wave', 'status': 'active'})
+    area = Affected_Area(location='Harbour', population=10, event_id=event_id)
+    db.session.add(area)
+    db.session.commit()
+    admin_client.post(f'/area/{area.area_id}/delete')
+
+    created, updated = _entries(entity='Emergency_Event', row_id=str(event_id))
+    assert (created.action, created.username, created.route) == ('insert', 'admin', 'main.new_event')
+    assert created.user_id == User.query.filter_by(username='admin').one().id and created.request_id
+    assert json.loads(created.changes)['disaster_type'] == 'Tsunami'
+    assert (updated.action, updated.route) == ('update', 'main.update_event')
+    assert json.loads(updated.changes) == {'disaster_type': ['Tsunami', 'Tidal wave']}
+    deleted, = _entries(entity='Affected_Area', action='delete')
+    assert deleted.row_id == str(area.area_id) and deleted.route == 'main.delete_area'
+    assert json.loads(deleted.changes)['location'] == 'Harbour'
+
+def test_passwords_stay_out_of_the_trail(test_client):
+    user = User(username='auditee')
+    user.set_password('secret')
+    db.session.add(user)
+    db.session.commit()
+    entry, = _entries(entity='User', row_id=str(user.id))
+    assert 'password_hash' not in json.loads(entry.changes)
+
+def test_bulk_inserts_are_buffered_and_written_in_batches(test_client, count_queries):
+    event = Emergency_Event(disaster_type='Flood surge')
+    area = Affected_Area(location='Delta', population=500, event=event)
+    db.session.add_all([event, area])
+    db.session.commit()
+    _writer().flush()
+    rows = [{'name': f'Evacuee {i}', 'severity': 'Mild', 'area_id': area.area_id} for i in range(10)]
+    with count_queries() as statements:
+        db.session.execute(insert(Affected_Individual), rows)
+        db.session.commit()
+    assert not [s for s in statements if 'Audit_Log' in s]
+    assert _writer().pending() == 10
+
+    _writer().batch_size = 4
+    try:
+        with count_queries() as statements:
+            assert _writer().flush() == 10
+    finally:
+        _writer().batch_size = current_app.config['AUDIT_BATCH_SIZE']
+    assert len([s for s in statements if s.startswith('INSERT INTO "Audit_Log"')]) == 3
+    assert sorted(json.loads(entry.changes)['name'] for entry in
+                  _entries(entity='Affected_Individual', action='insert')) == sorted(row['name'] for row in rows)
+
+def test_rolled_back_changes_are_not_audited(test_client):
+    _writer().flush()
+    db.session.add(Team(team_name='Phantom'))
+    db.session.flush()
+    db.session.rollback()
+    assert _writer().pending() == 0
+
+def test_full_buffer_drops_new_entries(test_client):
+    writer = _writer()
+    writer.flush()
+    writer.max_size, dropped = 3, writer.dropped
+    try:
+        db.session.add_all([Team(team_name=f'Crew {i}') for i in range(5)])
+        db.session.commit()
+        assert writer.pending() == 3 and writer.dropped == dropped + 2
+    finally:
+        writer.max_size = current_app.config['AUDIT_BUFFER_SIZE']
+    assert writer.flush() == 3
+
+def test_audit_log_is_append_only(test_client):
+    db.session.add(Team(team_name='Ledger'))
+    db.session.commit()
+    entry = _entries(entity='Team')[-1]
+    for statement in (update(Audit_Log).where(Audit_Log.audit_id == entry.audit_id).values(entity='x'),
+                      delete(Audit_Log).where(Audit_Log.audit_id == entry.audit_id)):
+        with pytest.raises(DatabaseError, match='append-only'):
+            db.session.execute(statement)
+        db.session.rollback()
+    assert db.session.execute(select(Audit_Log.entity).where(Audit_Log.audit_id == entry.audit_id)).scalar() == 'Team'
+
+def test_query_view_filters_by_entity_and_time(admin_client):
+    db.session.add_all([Team(team_name='Alpha'), Team(team_name='Bravo')])
+    db.session.commit()
+    _writer().flush()
+    teams = admin_client.get('/audit?entity=Team&format=json').get_json()
+    assert {entry['entity'] for entry in teams['entries']} == {'Team'}
+    assert [entry['changes']['team_name'] for entry in teams['entries']][:2] == ['Bravo', 'Alpha']
+
+    first = teams['entries'][0]
+    later = (datetime.datetime.fromisoformat(first['created_at']) + datetime.timedelta(seconds=1)).isoformat()
+    assert admin_client.get(f'/audit?entity=Team&since={later}&format=json').get_json()['entries'] == []
+    until = admin_client.get(f'/audit?entity=Team&until={later}&per_page=1&format=json').get_json()
+    assert len(until['entries']) == 1 and until['next']['until'] == later
+
+    page = admin_client.get('/audit?entity=Team').get_data(as_text=True)
+    assert 'Bravo' in page and 'main.new_event' not in page
+    assert admin_client.get('/audit?since=yesterday').status_code == 400
@@ -0,0 +1,26 @@
+from benchmarks.suite import build_cases, summarize
+from benchmarks.compare import compare
+
+def _report(p95, statements, errors=0):
+    return {'meta': {}, 'results': {'test_client': {'GET /events': {
+        'p95_ms': p95, 'statements': statements, 'errors': errors}}}}
+
+def test_build_cases_covers_routes_but_not_deletes(test_client):
+    names = [case.name for case in build_cases(test_client.application)]
+    assert 'GET /events?per_page=50' in names
+    assert 'POST /event/1/update' in names
+    assert not any('delete' in name or 'logout' in name for name in names)
+
+def test_summarize_percentiles():
+    summary = summarize([i / 1000 for i in range(1, 101)], 1.0, 2.0, 0, 1024)
+    assert summary['p50_ms'] == 50.5
+    assert summary['p99_ms'] >= summary['p95_ms'] >= summary['p50_ms']
+    assert summary['throughput_rps'] == 100.0
+
+def test_compare_flags_latency_and_statement_regressions():
+    _, regressions = compare(_report(10.0, 2), _report(11.0, 2))
+    assert regressions == []
+    _, regressions = compare(_report(10.0, 2), _report(15.0, 2))
+    assert len(regressions) == 1
+    _, regressions = compare(_report(10.0, 2), _report(10.0, 3))
+    assert 'statements 2 -> 3' in regressions[0][4]
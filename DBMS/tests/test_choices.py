@@ -0,0 +1,49 @@
+from app import db, cache
+from app.choices import choices
+from app.models import Emergency_Event, Affected_Area, Task
+
+def test_choice_list_is_served_from_cache(admin_client, count_queries):
+    db.session.add(Task(task_name='Triage'))
+    db.session.commit()
+    admin_client.get('/event/new')
+    with count_queries() as statements:
+        response = admin_client.get('/event/new')
+    assert response.status_code == 200
+    assert b'Triage' in response.data
+    assert not any('FROM "Task"' in statement for statement in statements)
+
+def test_orm_writes_invalidate_on_commit(test_client):
+    before = choices('tasks')
+    task = Task(task_name='Airlift')
+    db.session.add(task)
+    db.session.flush()
+    assert choices('tasks') == before
+    db.session.commit()
+    assert (task.task_id, 'Airlift') in choices('tasks')
+
+    task.task_name = 'Airdrop'
+    db.session.commit()
+    assert (task.task_id, 'Airdrop') in choices('tasks')
+
+def test_rollback_keeps_cached_list(test_client):
+    before = choices('tasks')
+    db.session.add(Task(task_name='Never saved'))
+    db.session.flush()
+    db.session.rollback()
+    assert cache.get('choices:tasks') == before
+
+def test_bulk_update_and_event_delete_invalidate(test_client):
+    event = Emergency_Event(disaster_type='Landslide')
+    area = Affected_Area(location='Hillside', event=event)
+    db.session.add_all([event, area])
+    db.session.commit()
+    assert (area.area_id, 'Hillside') in choices('areas')
+
+    Affected_Area.query.filter_by(area_id=area.area_id).update({'location': 'Valley'})
+    db.session.commit()
+    assert (area.area_id, 'Valley') in choices('areas')
+
+    db.session.delete(event)
+    db.session.commit()
+    assert all(label != 'Valley' for _, label in choices('areas'))
+    assert all(label != 'Landslide' for _, label in choices('events'))
@@ -0,0 +1,88 @@
+import time
+import pytest
+from sqlalchemy import delete
+from app import db
+from app.associations import TEAM_TASKS, sync_links
+from app.coverage import CoverageIndex, readiness
+from app.models import Emergency_Event, Task, Team, Resource, Team_Has_Resource, task_doneby_team
+
+@pytest.fixture(scope='module')
+def quake(test_client):
+    rescue, medical, shelter = Task(task_name='Rescue'), Task(task_name='Medical'), Task(task_name='Shelter')
+    event = Emergency_Event(disaster_type='Quake', tasks=[rescue, medical, shelter])
+    alpha = Team(team_name='Alpha', tasks=[rescue])
+    bravo = Team(team_name='Bravo', tasks=[medical])
+    radios = Resource(type='Radios')
+    db.session.add_all([event, alpha, bravo, radios])
+    db.session.flush()
+    db.session.add(Team_Has_Resource(team_id=alpha.team_id, res_id=radios.res_id, quantity=4))
+    db.session.commit()
+    return event
+
+def _statuses(event):
+    names = {task.task_id: task.task_name for task in Task.query}
+    return {names[task['task_id']]: task['status'] for task in readiness(event.eme_id)['tasks']}
+
+def _team(name):
+    return Team.query.filter_by(team_name=name).one()
+
+def test_task_statuses_and_suggested_teams(quake):
+    assert _statuses(quake) == {'Rescue': 'ready', 'Medical': 'unequipped', 'Shelter': 'uncovered'}
+    report = readiness(quake.eme_id)
+    assert report['counts'] == {'ready': 1, 'unequipped': 1, 'uncovered': 1}
+    rescue = Task.query.filter_by(task_name='Rescue').one()
+    assert report['suggested'] == [(_team('Alpha').team_id, [rescue.task_id])]
+    assert len(report['unfixable']) == 2
+
+def test_local_commits_reload_only_what_they_touched(quake, test_client, monkeypatch):
+    index = test_client.application.extensions['coverage']
+    readiness(quake.eme_id)
+    rebuilds = []
+    monkeypatch.setattr(index, '_clear', lambda: rebuilds.append(1))
+
+    bravo, shelter = _team('Bravo'), Task.query.filter_by(task_name='Shelter').one()
+    sync_links(TEAM_TASKS, bravo, [task.task_id for task in bravo.tasks] + [shelter.task_id])
+    db.session.commit()
+    assert index.dirty
+    assert _statuses(quake)['Shelter'] == 'unequipped'
+
+    radios = Resource.query.filter_by(type='Radios').one()
+    db.session.add(Team_Has_Resource(team_id=bravo.team_id, res_id=radios.res_id, quantity=1))
+    db.session.commit()
+    assert _statuses(quake) == {'Rescue': 'ready', 'Medical': 'ready', 'Shelter': 'ready'}
+
+    quake.tasks.remove(shelter)
+    db.session.commit()
+    assert set(_statuses(quake)) == {'Rescue', 'Medical'}
+    assert rebuilds == []
+
+def test_other_writes_rebuild_the_index(quake):
+    db.session.execute(delete(task_doneby_team).where(task_doneby_team.c.team_id == _team('Alpha').team_id))
+    db.session.commit()
+    assert _statuses(quake)['Rescue'] == 'uncovered'
+
+def test_readiness_page(admin_client, quake):
+    page = admin_client.get(f'/event/{quake.eme_id}/readiness').get_data(as_text=True)
+    assert 'Rescue' in page and 'Uncovered' in page
+    assert 'Bravo' in page
+
+def test_queries_take_microseconds():
+    index = CoverageIndex()
+    for team_id in range(1, 2001):
+        index.team_tasks[team_id] = sum(index._bit(task_id) for task_id in range(team_id % 150, team_id % 150 + 3))
+        if team_id % 3:
+            index.team_stock[team_id][1] = 1
+    for event_id in range(1, 1001):
+        index.event_tasks[event_id] = sum(index._bit(task_id) for task_id in range(event_id % 197, event_id % 197 + 5))
+    index._derive()
+
+    started = time.perf_counter()
+    for event_id in range(1, 1001):
+        index.gaps(event_id)
+    assert (time.perf_counter() - started) / 1000 < 50e-6
+    started = time.perf_counter()
+    gaps = index.events_with_gaps()
+    assert time.perf_counter() - started < 0.01
+    assert gaps and all(mask for mask in gaps.values())
+    teams, left = index.best_teams(index.event_tasks[7])
+    assert teams and not left & index.ready
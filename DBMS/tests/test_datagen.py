@@ -0,0 +1,63 @@
+from sqlalchemy import func, select
+from app import db
+from app.datagen import generate, row_counts, table_sizes
+from app.choices import choices
+from app.versions import table_versions
+from app.models import Affected_Area, Affected_Individual, User
+
+def _snapshot():
+    individuals = db.session.execute(
+        select(Affected_Individual.individual_id, Affected_Individual.name,
+               Affected_Individual.severity, Affected_Individual.area_id)
+        .order_by(Affected_Individual.individual_id)).all()
+    areas = db.session.execute(
+        select(Affected_Area.area_id, Affected_Area.event_id, Affected_Area.population)
+        .order_by(Affected_Area.area_id)).all()
+    return individuals, areas
+
+def test_generate_is_deterministic_for_a_seed(test_client):
+    generate(scale=20, seed=7, chunk_size=100)
+    first = _snapshot()
+    generate(scale=20, seed=7, chunk_size=37)
+    assert _snapshot() == first
+    generate(scale=20, seed=8)
+    assert _snapshot() != first
+
+def test_generate_writes_the_scaled_row_counts(test_client):
+    written = generate(scale=50, seed=1)
+    counts = row_counts(50)
+    sizes = table_sizes()
+    assert written['individuals'] == counts['individuals'] == sizes['Affected_Individual'] == 1000
+    assert sizes['Emergency_Event'] == counts['events']
+    assert sizes['Team_Has_Resource'] == written['team_resources']
+
+def test_generate_skews_casualties_towards_few_events(test_client):
+    generate(scale=200, seed=3)
+    per_event = db.session.execute(
+        select(func.count()).select_from(Affected_Individual)
+        .join(Affected_Area, Affected_Individual.area_id == Affected_Area.area_id)
+        .group_by(Affected_Area.event_id)
+        .order_by(func.count().desc())).scalars().all()
+    total = sum(per_event)
+    assert per_event[0] > total / len(per_event) * 3
+
+def test_generate_keeps_users(test_client):
+    db.session.add(User(username='keeper', password_hash='x'))
+    db.session.commit()
+    generate(scale=1)
+    assert User.query.filter_by(username='keeper').count() == 1
+
+def test_generate_invalidates_cached_choices(test_client):
+    generate(scale=1, seed=3)
+    assert len(choices('teams')) == row_counts(1)['teams']
+    generate(scale=20, seed=3)
+    assert len(choices('teams')) == row_counts(20)['teams']
+
+def test_generate_bumps_table_versions(test_client):
+    before = table_versions('Affected_Individual', 'Team_Has_Resource', 'User')
+    generate(scale=1, seed=5)
+    db.session.rollback()
+    after = table_versions('Affected_Individual', 'Team_Has_Resource', 'User')
+    assert after['Affected_Individual'][0] > before['Affected_Individual'][0]
+    assert after['Team_Has_Resource'][0] > before['Team_Has_Resource'][0]
+    assert after['User'] == before['User']
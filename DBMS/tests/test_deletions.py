@@ -0,0 +1,123 @@
+import pytest
+from sqlalchemy import func, select
+from app import db
+from app.choices import choices
+from app.deletions import area_deletion, event_deletion
+from app.feed import CHANGES
+from app.models import (Emergency_Event, Affected_Area, Affected_Individual, Donation, Evacuation, Task,
+                        Event_Summary, Event_Summary_Bucket)
+from app.summaries import event_summary, rebuild_summaries
+from app.versions import table_versions
+
+def _event(name, areas=2, per_area=5):
+    event = Emergency_Event(disaster_type=name, tasks=[Task(task_name=f'{name} task')])
+    db.session.add(event)
+    for a in range(areas):
+        area = Affected_Area(location=f'{name} {a}', population=100, event=event)
+        db.session.add(area)
+        for i in range(per_area):
+            area.individuals.append(Affected_Individual(name=f'{name} person {a}.{i}', severity='Mild'))
+            area.donations.append(Donation(name=f'{name} donor {a}.{i}', type='Food', amount=10))
+            area.evacuations.append(Evacuation(destination='Shelter', transport='Bus'))
+    db.session.commit()
+    return event.eme_id
+
+def _rows(event_id):
+    areas = select(Affected_Area.area_id).where(Affected_Area.event_id == event_id)
+    return {model.__tablename__: db.session.execute(select(func.count()).select_from(model)
+                                                    .where(model.area_id.in_(areas))).scalar()
+            for model in (Affected_Individual, Donation, Evacuation)}
+
+def _deletes_logged(since):
+    return dict(db.session.execute(select(CHANGES.c.entity, func.count()).where(
+        CHANGES.c.change_id > since, CHANGES.c.action == 'delete').group_by(CHANGES.c.entity)).all())
+
+def _last_change():
+    return db.session.execute(select(func.coalesce(func.max(CHANGES.c.change_id), 0))).scalar()
+
+def _assert_summaries_match_rebuild():
+    def snapshot():
+        return (db.session.execute(select(Event_Summary.__table__).order_by('event_id')).all(),
+                db.session.execute(select(Event_Summary_Bucket.__table__)
+                                   .order_by('event_id', 'dimension', 'bucket')).all())
+    incremental = snapshot()
+    rebuild_summaries()
+    assert snapshot() == incremental
+
+def test_orm_delete_leaves_children_to_the_database(test_client, count_queries):
+    event_id = _event('Mudslide')
+    area = Affected_Area.query.filter_by(event_id=event_id).first()
+    before = table_versions('Affected_Individual', 'Donation')
+    since = _last_change()
+    with count_queries() as statements:
+        db.session.delete(area)
+        db.session.commit()
+    # The children go by ON DELETE CASCADE, not one ORM DELETE per row.
+    assert not [s for s in statements if s.startswith('DELETE FROM "Affected_Individual"')]
+    assert _rows(event_id) == {'Affected_Individual': 5, 'Donation': 5, 'Evacuation': 5}
+    assert _deletes_logged(since) == {'areas': 1, 'individuals': 5, 'donations': 5, 'evacuations': 5}
+    after = table_versions('Affected_Individual', 'Donation')
+    assert all(after[name][0] == before[name][0] + 1 for name in before)
+    assert event_summary(event_id)['totals']['individual_count'] == 5
+    _assert_summaries_match_rebuild()
+
+def test_delete_routes_use_set_based_statements(admin_client, count_queries):
+    small, large = _event('Flood', per_area=3), _event('Quake', per_area=30)
+    since = _last_change()
+    with count_queries() as statements:
+        admin_client.post(f'/event/{small}/delete')
+    few = len(statements)
+    with count_queries() as statements:
+        response = admin_client.post(f'/event/{large}/delete')
+    assert response.status_code == 302
+    # Ten times the rows, the same statements (one chunk per table).
+    assert len(statements) == few
+    for event_id in (small, large):
+        assert db.session.get(Emergency_Event, event_id) is None
+        assert _rows(event_id) == {'Affected_Individual': 0, 'Donation': 0, 'Evacuation': 0}
+        assert db.session.get(Event_Summary, event_id) is None
+    assert _deletes_logged(since) == {'areas': 4, 'individuals': 66, 'donations': 66, 'evacuations': 66}
+    assert all(label not in ('Flood', 'Quake') for _, label in choices('events'))
+    _assert_summaries_match_rebuild()
+
+    area = Affected_Area.query.first()
+    admin_client.post(f'/area/{area.area_id}/delete')
+    assert db.session.get(Affected_Area, area.area_id) is None
+
+@pytest.fixture
+def background(test_client):
+    config = test_client.application.config
+    previous = config['DELETE_BACKGROUND_ROWS'], config['DELETE_CHUNK_SIZE']
+    config['DELETE_BACKGROUND_ROWS'], config['DELETE_CHUNK_SIZE'] = 10, 4
+    yield
+    config['DELETE_BACKGROUND_ROWS'], config['DELETE_CHUNK_SIZE'] = previous
+
+def test_large_deletions_run_as_jobs_with_progress(admin_client, background):
+    event_id = _event('Wildfire')
+    response = admin_client.post(f'/event/{event_id}/delete')
+    job_url = response.headers['Location']
+    assert '/deletions/' in job_url
+
+    job = admin_client.get(job_url + '?format=json').get_json()
+    assert job['status'] == 'done' and job['deleted'] == job['total'] == 32
+    assert 'Finished.' in admin_client.get(job_url).get_data(as_text=True)
+    assert db.session.get(Emergency_Event, event_id) is None
+    assert admin_client.get('/deletions/unknown').status_code == 404
+
+def test_chunked_deletion_stopped_halfway_stays_consistent(test_client):
+    event_id = _event('Storm')
+
+    def stop(deleted):
+        if deleted >= 6:
+            raise RuntimeError('worker stopped')
+
+    with pytest.raises(RuntimeError):
+        event_deletion(event_id).run(3, commit_chunks=True, progress=stop)
+    db.session.rollback()
+    assert _rows(event_id)['Affected_Individual'] == 4
+    assert event_summary(event_id)['totals']['individual_count'] == 4
+    _assert_summaries_match_rebuild()
+
+    assert event_deletion(event_id).run(3, commit_chunks=True) == 26
+    assert db.session.get(Emergency_Event, event_id) is None
+    assert area_deletion(event_id).count() == 0
@@ -0,0 +1,49 @@
+import csv
+import gzip
+import io
+import json
+import pytest
+from app import db
+from app.models import Emergency_Event, Affected_Area, Affected_Individual, Team, Evacuation
+from app.export import EXPORTS, export_chunks
+
+@pytest.fixture(scope='module')
+def seeded(test_client):
+    event = Emergency_Event(disaster_type='Wildfire')
+    area = Affected_Area(location='Ridge', event=event)
+    team = Team(team_name='Engine 7')
+    db.session.add_all([event, area, team])
+    db.session.flush()
+    for i in range(7):
+        db.session.add(Affected_Individual(name=f'Resident {i}', severity='Mild', area_id=area.area_id))
+    db.session.add(Evacuation(destination='Gym', area_id=area.area_id, team_id=team.team_id))
+    db.session.add(Evacuation(destination='Library', area_id=area.area_id))
+    db.session.commit()
+
+def test_csv_export_joins_parent_names(admin_client, seeded):
+    response = admin_client.get('/export/individuals.csv')
+    assert response.status_code == 200
+    assert response.headers['Content-Disposition'] == 'attachment; filename=individuals.csv'
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert len(rows) == 7
+    assert rows[0]['area_location'] == 'Ridge'
+    assert rows[0]['event_type'] == 'Wildfire'
+
+def test_ndjson_gzip_export_keeps_rows_without_team(admin_client, seeded):
+    response = admin_client.get('/export/evacuations.ndjson?gzip=1')
+    assert response.mimetype == 'application/gzip'
+    lines = gzip.decompress(response.data).decode().splitlines()
+    records = [json.loads(line) for line in lines]
+    assert [r['team_name'] for r in records] == ['Engine 7', None]
+
+def test_export_is_chunked_by_batch(test_client, seeded):
+    chunks = list(export_chunks('individuals', 'csv', batch_size=3))
+    assert len(chunks) == 3
+    assert sum(chunk.count(b'\n') for chunk in chunks) == 8  # header + 7 rows
+
+@pytest.mark.parametrize('entity', sorted(EXPORTS))
+def test_every_export_streams(admin_client, seeded, entity):
+    assert admin_client.get(f'/export/{entity}.ndjson').status_code == 200
+
+def test_users_are_not_exportable(admin_client):
+    assert admin_client.get('/export/users.csv').status_code == 404
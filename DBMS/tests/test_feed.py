@@ -0,0 +1,163 @@
+import datetime
+import io
+import json
+import pytest
+from sqlalchemy import insert, select, func
+from app import db
+from app import feed as feed_module
+from app.models import Emergency_Event, Affected_Area, Affected_Individual, Evacuation, Change_Log
+from app.feed import CHANGES, FeedFull, prune_changes
+from app.intake import import_records
+
+@pytest.fixture(scope='module')
+def areas(test_client):
+    flood, quake = Emergency_Event(disaster_type='Flood'), Emergency_Event(disaster_type='Quake')
+    north = Affected_Area(location='North', event=flood)
+    east = Affected_Area(location='East', event=quake)
+    db.session.add_all([flood, quake, north, east])
+    db.session.commit()
+    return north, east
+
+@pytest.fixture
+def feed(test_client):
+    feed = test_client.application.extensions['change_feed']
+    yield feed
+    for subscription in list(feed._subscribers):
+        feed.unsubscribe(subscription)
+    feed.poll()
+
+def _drain(subscription):
+    changes = []
+    while not subscription.queue.empty():
+        message = subscription.queue.get_nowait()['message']
+        changes.append(json.loads(message.split('data: ', 1)[1]))
+    return changes
+
+def _last_change_id():
+    return db.session.execute(select(func.max(CHANGES.c.change_id))).scalar()
+
+def test_orm_writes_reach_subscribers(feed, areas):
+    north, _ = areas
+    subscription = feed.subscribe()
+    ana = Affected_Individual(name='Ana', severity='Mild', area_id=north.area_id)
+    db.session.add(ana)
+    db.session.commit()
+    ana.severity = 'Severe'
+    db.session.commit()
+    ana.name = ana.name  # no tracked column changed
+    db.session.commit()
+    db.session.delete(ana)
+    db.session.commit()
+    feed.poll()
+
+    changes = _drain(subscription)
+    assert [(c['entity'], c['action']) for c in changes] == [
+        ('individuals', 'insert'), ('individuals', 'update'), ('individuals', 'delete')]
+    assert changes[1]['data']['severity'] == 'Severe'
+    assert all(c['area_id'] == north.area_id and c['event_id'] == north.event_id for c in changes)
+
+def test_rolled_back_writes_are_not_published(feed, areas):
+    north, _ = areas
+    subscription = feed.subscribe()
+    db.session.add(Affected_Individual(name='Ghost', area_id=north.area_id))
+    db.session.flush()
+    db.session.rollback()
+    feed.poll()
+    assert _drain(subscription) == []
+
+def test_event_area_and_entity_filters(feed, areas):
+    north, east = areas
+    by_event = feed.subscribe(event_ids=[east.event_id])
+    by_area = feed.subscribe(area_ids=[north.area_id])
+    evacuations_only = feed.subscribe(entities=['evacuations'])
+    db.session.add_all([Affected_Individual(name='Bo', area_id=north.area_id),
+                        Affected_Individual(name='Cy', area_id=east.area_id),
+                        Evacuation(destination='Gym', area_id=east.area_id)])
+    db.session.commit()
+    feed.poll()
+
+    assert sorted(c['data'].get('name', 'gym') for c in _drain(by_event)) == ['Cy', 'gym']
+    assert [c['data']['name'] for c in _drain(by_area)] == ['Bo']
+    assert [c['data']['destination'] for c in _drain(evacuations_only)] == ['Gym']
+
+def test_bulk_import_is_captured(feed, areas):
+    north, _ = areas
+    subscription = feed.subscribe(entities=['individuals'])
+    body = f'name,severity,area_id\nDee,Mild,{north.area_id}\nEd,Mild,{north.area_id}\n'
+    report = import_records('individuals', io.BytesIO(body.encode()), 'csv')
+    assert report.inserted == 2
+    feed.poll()
+    changes = _drain(subscription)
+    assert [c['data']['name'] for c in changes] == ['Dee', 'Ed']
+    assert all(c['row_id'] is None and c['event_id'] == north.event_id for c in changes)
+
+def test_late_commits_fill_cursor_gaps(feed, monkeypatch):
+    subscription = feed.subscribe()
+    head = feed._cursor
+    row = {'entity': 'areas', 'action': 'update', 'area_id': 1, 'payload': '{}',
+           'created_at': datetime.datetime(2024, 1, 1)}
+    db.session.execute(insert(CHANGES), [dict(row, change_id=head + 2)])
+    db.session.commit()
+    feed.poll()
+    assert [c['id'] for c in _drain(subscription)] == [head + 2]
+
+    # An id handed out earlier but committed later is still delivered.
+    db.session.execute(insert(CHANGES), [dict(row, change_id=head + 1)])
+    db.session.commit()
+    feed.poll()
+    assert [c['id'] for c in _drain(subscription)] == [head + 1]
+
+    # Gaps that never fill are given up after GAP_TIMEOUT.
+    monkeypatch.setattr(feed_module, 'GAP_TIMEOUT', 0)
+    db.session.execute(insert(CHANGES), [dict(row, change_id=head + 4)])
+    db.session.commit()
+    feed.poll()
+    assert feed._gaps == {}
+
+def test_overflowing_subscriber_is_cut_off(feed, areas, monkeypatch):
+    north, _ = areas
+    monkeypatch.setattr(feed, 'queue_size', 1)
+    subscription = feed.subscribe()
+    db.session.add_all([Affected_Individual(name=f'Flood {i}', area_id=north.area_id) for i in range(3)])
+    db.session.commit()
+    feed.poll()
+    assert subscription.overflowed
+    frames = list(feed.stream(subscription))
+    # The queued change is sent, then the stream ends so the client resumes by id.
+    assert len([f for f in frames if f.startswith('id: ')]) == 1
+
+def test_stream_resumes_from_last_event_id(admin_client, feed, areas):
+    north, east = areas
+    since = _last_change_id()
+    db.session.add_all([Affected_Individual(name='Fay', area_id=north.area_id),
+                        Affected_Individual(name='Gus', area_id=east.area_id)])
+    db.session.commit()
+
+    feed.max_stream = 0
+    try:
+        response = admin_client.get(f'/feed?area_id={north.area_id}', headers={'Last-Event-ID': str(since)})
+        assert response.status_code == 200
+        assert response.mimetype == 'text/event-stream'
+        body = response.get_data(as_text=True)
+    finally:
+        feed.max_stream = feed.app.config['CHANGE_FEED_MAX_STREAM_SECONDS']
+    assert body.startswith('retry: ')
+    assert 'Fay' in body and 'Gus' not in body
+    assert f'id: {since + 1}\nevent: individuals\n' in body
+
+    assert admin_client.get('/feed?entity=users').status_code == 400
+    assert admin_client.get('/feed', headers={'Last-Event-ID': 'abc'}).status_code == 400
+
+def test_full_worker_refuses_new_streams(admin_client, feed, monkeypatch):
+    monkeypatch.setattr(feed, 'max_clients', 1)
+    feed.subscribe()
+    with pytest.raises(FeedFull):
+        feed.subscribe()
+    assert admin_client.get('/feed').status_code == 503
+
+def test_prune_changes(feed):
+    old = {'entity': 'areas', 'action': 'update', 'payload': '{}', 'created_at': datetime.datetime(2000, 1, 1)}
+    db.session.execute(insert(CHANGES), [old])
+    db.session.commit()
+    assert prune_changes(datetime.timedelta(hours=1)) >= 1
+    assert db.session.execute(select(func.min(Change_Log.created_at))).scalar() > datetime.datetime(2000, 1, 1)
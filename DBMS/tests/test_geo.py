@@ -0,0 +1,90 @@
+import random
+import time
+import pytest
+from sqlalchemy import delete, insert, select
+from app import db
+from app.geo import LOCATED, distance_km, nearest, within
+from app.models import Emergency_Event, Affected_Area, Team, grid_cell
+
+@pytest.fixture(scope='module')
+def manila(test_client):
+    event = Emergency_Event(disaster_type='Typhoon')
+    db.session.add_all([
+        event,
+        Affected_Area(location='Tondo', latitude=14.6186, longitude=120.9685, event=event),
+        Affected_Area(location='Makati', latitude=14.5547, longitude=121.0244, event=event),
+        Affected_Area(location='Quezon City', latitude=14.6760, longitude=121.0437, event=event),
+        Affected_Area(location='Cebu', latitude=10.3157, longitude=123.8854, event=event),
+        Affected_Area(location='Unmapped', event=event),
+        # Either side of the antimeridian.
+        Affected_Area(location='Taveuni', latitude=-16.85, longitude=179.95, event=event),
+        Affected_Area(location='Niuafo\'ou', latitude=-16.85, longitude=-179.95, event=event),
+    ])
+    db.session.commit()
+    return event
+
+def _names(items):
+    return [item['location'] for item in items]
+
+def test_radius_search_is_exact_and_nearest_first(manila):
+    areas = LOCATED['areas']
+    assert _names(within(areas, 14.5995, 120.9842, 12)) == ['Tondo', 'Makati', 'Quezon City']
+    assert _names(within(areas, 14.5995, 120.9842, 5)) == ['Tondo']
+    item = within(areas, 14.5995, 120.9842, 5)[0]
+    assert item['distance_km'] == round(distance_km(14.5995, 120.9842, 14.6186, 120.9685), 3)
+    assert _names(within(areas, -16.85, 179.99, 20)) == ['Taveuni', 'Niuafo\'ou']
+
+def test_nearest_widens_until_it_has_k_points(manila):
+    areas = LOCATED['areas']
+    assert _names(nearest(areas, 14.5995, 120.9842, 4)) == ['Tondo', 'Makati', 'Quezon City', 'Cebu']
+    located = Affected_Area.query.filter(Affected_Area.grid_cell.isnot(None)).count()
+    assert len(nearest(areas, 0, 0, located + 5)) == located
+
+def test_moving_a_point_moves_its_cell(manila):
+    area = Affected_Area.query.filter_by(location='Cebu').one()
+    area.latitude, area.longitude = 14.60, 120.98
+    db.session.commit()
+    assert area.grid_cell == grid_cell(14.60, 120.98)
+    assert 'Cebu' in _names(within(LOCATED['areas'], 14.5995, 120.9842, 1))
+
+def test_api_endpoints(admin_client, manila):
+    response = admin_client.get('/api/v1/areas/within?lat=14.5995&lon=120.9842&radius_km=10')
+    assert response.status_code == 200 and response.get_json()['truncated'] is False
+    assert 'Tondo' in _names(response.get_json()['items'])
+    assert admin_client.get('/api/v1/areas/within?lat=14.5995&lon=120.9842&radius_km=10',
+                            headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+
+    teams = admin_client.get('/api/v1/teams/nearest?lat=0&lon=0&k=3').get_json()['items']
+    assert [team['distance_km'] for team in teams] == sorted(team['distance_km'] for team in teams)
+    assert admin_client.get('/api/v1/areas/within?lat=95&lon=0&radius_km=1').status_code == 400
+    assert admin_client.get('/api/v1/areas/within?lat=0&lon=0&radius_km=100000').status_code == 400
+    assert admin_client.get('/api/v1/areas/nearest?lat=0&lon=0&k=0').status_code == 400
+    assert admin_client.get('/api/v1/donations/nearest?lat=0&lon=0').status_code == 404
+
+def test_hundreds_of_thousands_of_points_match_a_full_scan(test_client):
+    rng = random.Random(5)
+    # Clustered the way incidents are: dense around a few centres.
+    centres = [(rng.uniform(-50, 60), rng.uniform(-180, 180)) for _ in range(40)]
+    points = []
+    for i in range(200000):
+        latitude, longitude = rng.choice(centres)
+        points.append({'team_name': f'Geo {i}', 'latitude': rng.gauss(latitude, 1.0),
+                       'longitude': (rng.gauss(longitude, 1.0) + 180) % 360 - 180})
+    db.session.execute(insert(Team), points)
+    db.session.commit()
+    teams = LOCATED['teams']
+    try:
+        rows = db.session.execute(select(Team.team_id, Team.latitude, Team.longitude)
+                                  .where(Team.latitude.isnot(None))).all()
+        for _ in range(5):
+            latitude, longitude = rng.choice(centres)
+            started = time.perf_counter()
+            found = within(teams, latitude, longitude, 25)
+            nearby = nearest(teams, latitude, longitude, 10)
+            assert time.perf_counter() - started < 0.25
+            expected = sorted((distance_km(latitude, longitude, lat, lon), team_id) for team_id, lat, lon in rows)
+            assert [item['team_id'] for item in found] == [team_id for d, team_id in expected if d <= 25]
+            assert [item['team_id'] for item in nearby] == [team_id for d, team_id in expected[:10]]
+    finally:
+        db.session.execute(delete(Team).where(Team.team_name.like('Geo %')))
+        db.session.commit()
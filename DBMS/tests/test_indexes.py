@@ -0,0 +1,58 @@
+import pytest
+from sqlalchemy import event
+from app import db
+
+# Route, and the index its main query must be planned with. Plans come from
+# SQLite's EXPLAIN QUERY PLAN over the exact statements the route sends.
+ROUTE_INDEXES = [
+    ('/individuals?area_id=1&severity=Severe', 'ix_Affected_Individual_area_id_severity'),
+    ('/individuals?sort=severity', 'ix_Affected_Individual_severity'),
+    ('/areas?event_id=1', 'ix_Affected_Area_event_id'),
+    ('/areas?sort=location', 'ix_Affected_Area_location'),
+    ('/donations?area_id=1', 'ix_Donation_area_id_type'),
+    ('/evacuations?area_id=1&transport=Bus', 'ix_Evacuation_area_id_transport'),
+    ('/evacuations?team_id=1', 'ix_Evacuation_team_id'),
+    ('/evacuations?transport=Bus', 'ix_Evacuation_transport'),
+    ('/events?sort=disaster_type', 'ix_Emergency_Event_disaster_type'),
+    ('/teams?sort=team_name', 'ix_Team_team_name'),
+    ('/tasks?sort=task_name', 'ix_Task_task_name'),
+    ('/area/new', 'ix_Emergency_Event_disaster_type'),
+    ('/individual/new', 'ix_Affected_Area_location'),
+    ('/evacuation/new', 'ix_Team_team_name'),
+    ('/event/new', 'ix_Task_task_name'),
+]
+
+def _query_plans(client, url):
+    captured = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            captured.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        assert client.get(url).status_code == 200
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+    plans = []
+    connection = db.session.connection()
+    for statement, parameters in captured:
+        rows = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters)
+        plans.append(' | '.join(row[-1] for row in rows))
+    return plans
+
+@pytest.mark.parametrize('url, index', ROUTE_INDEXES)
+def test_route_query_uses_index(admin_client, url, index):
+    plans = _query_plans(admin_client, url)
+    assert any(index in plan for plan in plans), plans
+
+def test_reverse_association_lookups_use_index(test_client):
+    connection = db.session.connection()
+    for table, column, index in [
+        ('Event_Requires_Task', 'task_id', 'ix_Event_Requires_Task_task_id'),
+        ('Task_DoneBy_Team', 'team_id', 'ix_Task_DoneBy_Team_team_id'),
+        ('Team_Has_Resource', 'res_id', 'ix_Team_Has_Resource_res_id'),
+    ]:
+        rows = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN SELECT * FROM "{table}" WHERE {column} = 1')
+        assert any(index in row[-1] for row in rows)
@@ -0,0 +1,49 @@
+import logging
+import re
+from app import create_app
+from app.logs import stop_logging
+from config import TestConfig
+
+def test_server_timing_header_counts_queries(admin_client):
+    response = admin_client.get('/events')
+    header = response.headers['Server-Timing']
+    queries = int(re.search(r'db;dur=[\d.]+;desc="(\d+) queries"', header).group(1))
+    assert queries >= 1
+    for metric in ('tpl', 'view', 'total'):
+        assert re.search(metric + r';dur=[\d.]+', header)
+
+def test_request_log_line(admin_client, caplog):
+    with caplog.at_level(logging.INFO, logger='app.requests'):
+        admin_client.get('/teams')
+    line = next(r.getMessage() for r in caplog.records if r.name == 'app.requests')
+    assert 'endpoint=main.teams' in line
+    assert 'status=200' in line
+    assert re.search(r'sql_count=\d+ sql_ms=[\d.]+ template_ms=[\d.]+ view_ms=[\d.]+', line)
+
+def test_slow_queries_are_logged_with_route_and_parameters(admin_client, caplog):
+    app = admin_client.application
+    threshold = app.config['SLOW_QUERY_THRESHOLD_MS']
+    app.config['SLOW_QUERY_THRESHOLD_MS'] = 0
+    try:
+        with caplog.at_level(logging.WARNING, logger='app.slow_queries'):
+            admin_client.get('/individuals?severity=Severe')
+    finally:
+        app.config['SLOW_QUERY_THRESHOLD_MS'] = threshold
+    messages = [r.getMessage() for r in caplog.records if r.name == 'app.slow_queries']
+    assert any('route=GET /individuals (main.individuals)' in m and "'Severe'" in m
+               for m in messages)
+
+def test_request_log_is_at_info_when_logging_to_stdout(monkeypatch):
+    class StdoutConfig(TestConfig):
+        TESTING = False
+        LOG_TO_STDOUT = '1'
+    app_logger = logging.getLogger('app')
+    monkeypatch.setattr(app_logger, 'handlers', [])
+    level = app_logger.level
+    app_logger.setLevel(logging.NOTSET)
+    try:
+        app = create_app(StdoutConfig)
+        assert logging.getLogger('app.requests').isEnabledFor(logging.INFO)
+        stop_logging(app)
+    finally:
+        app_logger.setLevel(level)
@@ -0,0 +1,87 @@
+import io
+import json
+import pytest
+from app import db
+from app.models import Emergency_Event, Affected_Area, Affected_Individual, Donation, Evacuation, Team
+from app.intake import import_records
+
+@pytest.fixture(scope='module')
+def area(test_client):
+    event = Emergency_Event(disaster_type='Earthquake')
+    area = Affected_Area(location='Old Town', event=event)
+    team = Team(team_name='Rescue 1')
+    db.session.add_all([event, area, team])
+    db.session.commit()
+    return area
+
+def _upload(client, entity, filename, body):
+    return client.post(
+        f'/import/{entity}',
+        data={'file': (io.BytesIO(body.encode()), filename)},
+        content_type='multipart/form-data',
+        headers={'Accept': 'application/json'},
+    )
+
+def test_csv_import_inserts_valid_rows_and_reports_bad_ones(admin_client, area):
+    body = (
+        'name,injury_type,severity,area_id\n'
+        f'Ana,Burn,Severe,{area.area_id}\n'
+        f',Cut,Mild,{area.area_id}\n'
+        'Ben,,Mild,999999\n'
+        f'Cleo,,,{area.area_id}\n'
+    )
+    before = Affected_Individual.query.count()
+    response = _upload(admin_client, 'individuals', 'casualties.csv', body)
+    report = response.get_json()
+    assert report['inserted'] == 2
+    assert report['rejected'] == 2
+    assert [e['line'] for e in report['errors']] == [3, 4]
+    assert 'name' in report['errors'][0]['errors']
+    assert report['errors'][1]['errors'] == {'area_id': ['Not a valid choice.']}
+    assert Affected_Individual.query.count() == before + 2
+
+def test_ndjson_import_treats_empty_team_as_none(admin_client, area):
+    rows = [
+        {'destination': 'Stadium', 'transport': 'Bus', 'area_id': area.area_id, 'team_id': None},
+        {'destination': 'School', 'area_id': area.area_id, 'team_id': 0},
+        {'destination': 'x' * 300, 'area_id': area.area_id},
+    ]
+    body = '\n'.join(json.dumps(r) for r in rows) + '\nnot json\n'
+    report = _upload(admin_client, 'evacuations', 'moves.ndjson', body).get_json()
+    assert report['inserted'] == 2
+    assert [e['line'] for e in report['errors']] == [3, 4]
+    assert Evacuation.query.filter_by(destination='School').one().team_id is None
+
+def test_import_commits_in_chunks(test_client, area):
+    body = 'name,type,amount,area_id\n' + ''.join(
+        f'Donor {i},Money,{i}.50,{area.area_id}\n' for i in range(25))
+    report = import_records('donations', io.BytesIO(body.encode()), 'csv', chunk_size=10)
+    assert report.inserted == 25
+    assert Donation.query.filter(Donation.name.like('Donor %')).count() == 25
+
+def test_unreadable_lines_are_reported_not_raised(test_client, area):
+    body = ('name,injury_type,area_id\n'
+            f'Ana,Burn,{area.area_id}\n'
+            f'Jos\u00e9,Burn,{area.area_id}\n'  # saved from Excel as cp1252
+            f'"{"x" * 200000}",Cut,{area.area_id}\n'
+            f'Ben,Cut,{area.area_id}\n').encode('cp1252')
+    report = import_records('individuals', io.BytesIO(body), 'csv', chunk_size=1)
+    assert report.inserted == 2
+    assert [e['line'] for e in report.errors] == [3, 4]
+    assert report.errors[0]['errors'] == {'_row': ['Not valid UTF-8 text.']}
+    assert report.errors[1]['errors']['_row'][0].startswith('Not valid CSV')
+
+    body = b'{"destination": "Caf\xe9", "area_id": %d}\n' % area.area_id
+    report = import_records('evacuations', io.BytesIO(body), 'ndjson')
+    assert report.errors == [{'line': 1, 'errors': {'_row': ['Not valid UTF-8 text.']}}]
+
+def test_import_unknown_entity_is_404(admin_client):
+    assert _upload(admin_client, 'teams', 'teams.csv', 'team_name\nA\n').status_code == 404
+
+def test_import_cli(test_client, area, tmp_path):
+    path = tmp_path / 'people.csv'
+    path.write_text(f'name,area_id\nDara,{area.area_id}\nEli,{area.area_id}\n')
+    runner = test_client.application.test_cli_runner()
+    result = runner.invoke(args=['import-records', 'individuals', str(path)])
+    assert result.exit_code == 0, result.output
+    assert 'Inserted 2 individuals' in result.output
@@ -0,0 +1,70 @@
+import json
+import logging
+import queue
+import sys
+import pytest
+from app import create_app
+from app.logs import DroppingQueueHandler, JsonFormatter, SamplingFilter, stop_logging
+from config import TestConfig
+
+@pytest.fixture
+def app_logger(monkeypatch):
+    # Each create_app() below adds its handler to the shared 'app' logger.
+    logger = logging.getLogger('app')
+    monkeypatch.setattr(logger, 'handlers', [])
+    level = logger.level
+    yield logger
+    logger.setLevel(level)
+
+def _record(name='app.requests', level=logging.INFO, **extra):
+    record = logging.LogRecord(name, level, __file__, 1, 'request', (), None)
+    record.__dict__.update(extra)
+    return record
+
+def test_requests_are_logged_as_json_lines_with_their_id(tmp_path, app_logger):
+    class FileConfig(TestConfig):
+        TESTING = False
+        LOG_FILE = str(tmp_path / 'logs' / 'app.log')
+
+    app = create_app(FileConfig)
+    client = app.test_client()
+    response = client.get('/login', headers={'X-Request-ID': 'req-42'})
+    assert response.headers['X-Request-ID'] == 'req-42'
+    generated = client.get('/login', headers={'X-Request-ID': 'not an id!'}).headers['X-Request-ID']
+    assert len(generated) == 32
+    stop_logging(app)
+
+    with open(tmp_path / 'logs' / 'app.log', encoding='utf-8') as f:
+        records = [json.loads(line) for line in f]
+    assert records[0]['message'] == 'Disaster Management startup'
+    requests = [r for r in records if r['logger'] == 'app.requests']
+    assert [r['request_id'] for r in requests] == ['req-42', generated]
+    assert requests[0]['route'] == 'main.login'
+    assert requests[0]['status'] == 200 and requests[0]['user_id'] is None
+    assert requests[0]['latency_ms'] >= requests[0]['db_ms'] >= 0
+
+def test_sampling_keeps_whole_requests_and_everything_important():
+    none = SamplingFilter(0, ['app.requests'])
+    assert not none.filter(_record(request_id='a', status=200))
+    assert none.filter(_record(request_id='a', status=503))
+    assert none.filter(_record(level=logging.WARNING))
+    assert none.filter(_record(name='app'))
+
+    half = SamplingFilter(0.5, ['app.requests'])
+    kept = [half.filter(_record(request_id=f'request-{i}')) for i in range(1000)]
+    assert 350 < sum(kept) < 650
+    assert kept == [half.filter(_record(request_id=f'request-{i}')) for i in range(1000)]
+
+def test_full_queue_drops_records_instead_of_blocking():
+    handler = DroppingQueueHandler(queue.Queue(1))
+    handler.setFormatter(JsonFormatter())
+    try:
+        1 / 0
+    except ZeroDivisionError:
+        handler.handle(logging.LogRecord('app', logging.ERROR, __file__, 1, 'failed %s', ('job',), sys.exc_info()))
+    handler.handle(_record())
+    assert handler.dropped == 1
+
+    data = json.loads(JsonFormatter().format(handler.queue.get_nowait()))
+    assert data['message'] == 'failed job'
+    assert 'ZeroDivisionError' in data['exc']
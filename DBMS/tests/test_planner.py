@@ -0,0 +1,103 @@
+import csv
+import time
+import pytest
+from app import db
+from app.models import Emergency_Event, Affected_Area, Team, Resource, Team_Has_Resource, Evacuation
+from app.planner import Problem, allocate, plan_allocation
+
+np = pytest.importorskip('numpy')
+
+@pytest.fixture(scope='module')
+def flood(test_client):
+    event = Emergency_Event(disaster_type='Flood')
+    north = Affected_Area(location='North', population=1000, damage_extent='Severe', event=event)
+    south = Affected_Area(location='South', population=400, damage_extent='Minor', event=event)
+    ferry = Team(team_name='Ferry Crew', personnel=1)
+    depot = Team(team_name='Depot', personnel=None)
+    water, food = Resource(type='Water'), Resource(type='Food')
+    db.session.add_all([event, north, south, ferry, depot, water, food])
+    db.session.flush()
+    db.session.add_all([
+        Team_Has_Resource(team_id=ferry.team_id, res_id=water.res_id, quantity=30),
+        Team_Has_Resource(team_id=ferry.team_id, res_id=food.res_id, quantity=100),
+        Team_Has_Resource(team_id=depot.team_id, res_id=water.res_id, quantity=5),
+        Evacuation(destination='Shelter', area=south, team=ferry),
+    ])
+    db.session.commit()
+    return event
+
+@pytest.fixture
+def units_per_person(test_client):
+    config = test_client.application.config
+    previous = config['PLANNER_UNITS_PER_PERSON']
+    config['PLANNER_UNITS_PER_PERSON'] = 10
+    yield
+    config['PLANNER_UNITS_PER_PERSON'] = previous
+
+def _shipments(plan):
+    return {(row['team_id'], row['area_id'], row['resource_type']): row['units'] for row in plan.rows()}
+
+def test_linked_areas_first_within_stock_and_crew_capacity(flood, units_per_person):
+    plan, timings = plan_allocation(flood.eme_id)
+    ferry, depot = Team.query.filter_by(team_name='Ferry Crew').one(), Team.query.filter_by(team_name='Depot').one()
+    north, south = (Affected_Area.query.filter_by(location=name).one() for name in ('North', 'South'))
+
+    # North needs 8 units of each type, South (which the ferry evacuates) 1.
+    # The ferry's single crew member moves 10 units in all: food goes first.
+    assert _shipments(plan) == {
+        (ferry.team_id, south.area_id, 'Food'): 1,
+        (ferry.team_id, north.area_id, 'Food'): 8,
+        (ferry.team_id, south.area_id, 'Water'): 1,
+        (depot.team_id, north.area_id, 'Water'): 5,
+    }
+    assert plan.summary() == [
+        {'resource_type': 'Food', 'needed': 9, 'sent': 9, 'short_areas': 0},
+        {'resource_type': 'Water', 'needed': 9, 'sent': 6, 'short_areas': 1},
+    ]
+    assert timings['allocate_ms'] >= 0
+
+def test_planner_page_and_csv(admin_client, flood):
+    page = admin_client.get(f'/planner?event_id={flood.eme_id}').get_data(as_text=True)
+    assert 'Ferry Crew' in page and 'North' in page
+
+    response = admin_client.get(f'/planner?event_id={flood.eme_id}&format=csv')
+    assert response.mimetype == 'text/csv'
+    rows = list(csv.DictReader(response.get_data(as_text=True).splitlines()))
+    assert sum(int(row['units']) for row in rows) == 18
+
+def test_plan_allocation_cli(test_client, flood, tmp_path):
+    runner = test_client.application.test_cli_runner()
+    output = tmp_path / 'plan.csv'
+    result = runner.invoke(args=['plan-allocation', '--event', str(flood.eme_id), '--output', str(output)])
+    assert result.exit_code == 0, result.output
+    assert 'Water: sent 9 of 9 units, 0 areas short' in result.output
+    with open(output, newline='') as f:
+        assert len(list(csv.DictReader(f))) == 4
+
+def test_thousands_of_teams_and_areas_plan_in_under_a_second():
+    rng = np.random.default_rng(7)
+    n_teams = n_areas = 3000
+    n_types = 8
+    held = np.unique(rng.integers(0, n_teams, 9000) * n_types + rng.integers(0, n_types, 9000))
+    stock_team, stock_type = held // n_types, held % n_types
+    stock_units = rng.integers(1, 100, len(held))
+    evacuating = (rng.integers(0, n_teams, 10000), rng.integers(0, n_areas, 10000))
+    assigned = (np.repeat(np.arange(n_teams), 50), rng.integers(0, n_areas, n_teams * 50))
+    problem = Problem(np.arange(1, n_teams + 1), rng.integers(5, 50, n_teams) * 50,
+                      np.arange(1, n_areas + 1), rng.integers(0, 500, n_areas),
+                      [f'Type {i}' for i in range(n_types)], stock_team, stock_type, stock_units,
+                      evacuating, assigned)
+
+    started = time.perf_counter()
+    plan = allocate(problem)
+    assert time.perf_counter() - started < 1.0
+
+    for type_ in range(n_types):
+        ours = plan.type == type_
+        held = np.zeros(n_teams, dtype=np.int64)
+        held[stock_team[stock_type == type_]] = stock_units[stock_type == type_]
+        assert (np.bincount(plan.team[ours], weights=plan.units[ours], minlength=n_teams) <= held).all()
+        received = np.bincount(plan.area[ours], weights=plan.units[ours], minlength=n_areas)
+        assert (received + plan.unmet[type_] == problem.need).all()
+    assert (np.bincount(plan.team, weights=plan.units, minlength=n_teams) <= problem.capacity).all()
+    assert plan.units.min() > 0
@@ -0,0 +1,55 @@
+import pytest
+from sqlalchemy import exc, text
+from app import create_app, db
+from config import TestConfig, engine_options
+
+def test_engine_options_per_dialect(monkeypatch):
+    mysql = engine_options('mysql+pymysql://u:p@db/disaster')
+    assert mysql['pool_pre_ping'] is True
+    assert 0 < mysql['pool_recycle'] < 28800  # MySQL's default wait_timeout
+    assert 'isolation_level' not in mysql
+    assert engine_options('sqlite:///:memory:') == {}
+    assert engine_options('sqlite:////tmp/disaster.db')['pool_pre_ping'] is False
+
+    monkeypatch.setenv('DB_POOL_SIZE', '3')
+    monkeypatch.setenv('DB_POOL_PRE_PING', '0')
+    monkeypatch.setenv('DB_ISOLATION_LEVEL', 'READ COMMITTED')
+    options = engine_options('postgresql://u:p@db/disaster')
+    assert options['pool_size'] == 3
+    assert options['pool_pre_ping'] is False
+    assert options['isolation_level'] == 'READ COMMITTED'
+
+def test_sqlite_file_gets_wal_and_pool_metrics(tmp_path, monkeypatch):
+    monkeypatch.setenv('DB_POOL_SIZE', '1')
+    monkeypatch.setenv('DB_MAX_OVERFLOW', '0')
+    monkeypatch.setenv('DB_POOL_TIMEOUT', '1')
+    uri = f"sqlite:///{tmp_path / 'pool.db'}"
+
+    class FileConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = uri
+        SQLALCHEMY_ENGINE_OPTIONS = engine_options(uri)
+
+    app = create_app(FileConfig)
+    metrics = app.extensions['pool_metrics'][None]
+    with app.app_context():
+        with db.engine.connect() as connection:
+            assert connection.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+            assert connection.execute(text('PRAGMA busy_timeout')).scalar() == 5000
+            with pytest.raises(exc.TimeoutError):
+                db.engine.connect()
+            snapshot = metrics.snapshot(db.engine.pool)
+        assert snapshot['checkouts'] == 1 and snapshot['timeouts'] == 1
+        assert snapshot['size'] == 1 and snapshot['checkedout'] == 1
+        assert snapshot['wait_ms_max'] >= 900
+
+        db.engine.dispose()
+        with db.engine.connect():
+            pass
+        assert metrics.checkouts == 2
+
+def test_pool_metrics_endpoint(admin_client):
+    response = admin_client.get('/api/v1/metrics/pool')
+    assert response.status_code == 200
+    default = response.get_json()['engines']['default']
+    assert default['checkouts'] > 0
+    assert default['pool'] == 'StaticPool'
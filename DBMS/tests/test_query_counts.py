@@ -0,0 +1,83 @@
+import pytest
+from app import db
+from app.models import (Emergency_Event, Affected_Area, Affected_Individual, Donation, Team, Task,
+                        Resource, Evacuation, Team_Has_Resource)
+
+# Upper bound on SQL statements per list page. The logged-in user comes from
+# the user cache, so it costs nothing. The count must not depend on how many
+# rows the page shows.
+LIST_PAGE_BUDGET = {
+    '/events': 1,
+    '/teams': 1,
+    '/tasks': 1,
+    '/resources': 2,
+    '/areas': 1,
+    '/individuals': 1,
+    '/donations': 1,
+    '/evacuations': 1,
+}
+
+# Form pages load their choice lists; none of them should pull in the task
+# collections of the events or teams they list.
+FORM_PAGE_BUDGET = {
+    '/area/new': 1,
+    '/evacuation/new': 2,
+    '/team/new': 1,
+    '/event/new': 1,
+}
+
+def _seed(count):
+    event = Emergency_Event(disaster_type='Storm')
+    db.session.add(event)
+    db.session.flush()
+    for i in range(count):
+        area = Affected_Area(location=f'Area {i}', event_id=event.eme_id)
+        team = Team(team_name=f'Team {i}')
+        task = Task(task_name=f'Task {i}')
+        resource = Resource(type=f'Resource {i}')
+        db.session.add_all([area, team, task, resource])
+        db.session.flush()
+        event.tasks.append(task)
+        team.tasks.append(task)
+        db.session.add_all([
+            Team_Has_Resource(team_id=team.team_id, res_id=resource.res_id, quantity=1),
+            Affected_Individual(name=f'Person {i}', area_id=area.area_id),
+            Donation(name=f'Donor {i}', area_id=area.area_id),
+            Evacuation(destination=f'Shelter {i}', area_id=area.area_id, team_id=team.team_id),
+        ])
+    db.session.commit()
+
+def _statements_for(client, count_queries, url):
+    with count_queries() as statements:
+        response = client.get(f'{url}?per_page=100')
+    assert response.status_code == 200
+    return len(statements)
+
+@pytest.mark.parametrize('url', sorted(LIST_PAGE_BUDGET))
+def test_list_page_statement_count_is_flat(admin_client, count_queries, url):
+    _seed(3)
+    small = _statements_for(admin_client, count_queries, url)
+    _seed(30)
+    large = _statements_for(admin_client, count_queries, url)
+    assert large == small
+    assert large <= LIST_PAGE_BUDGET[url]
+
+@pytest.mark.parametrize('url', sorted(FORM_PAGE_BUDGET))
+def test_form_page_statement_count_is_flat(admin_client, count_queries, url):
+    _seed(3)
+    small = _statements_for(admin_client, count_queries, url)
+    _seed(30)
+    large = _statements_for(admin_client, count_queries, url)
+    assert large == small
+    assert large <= FORM_PAGE_BUDGET[url]
+
+def test_update_team_loads_tasks_in_one_extra_statement(admin_client, count_queries):
+    _seed(3)
+    team = Team.query.first()
+    db.session.expire(team)
+    with count_queries() as statements:
+        response = admin_client.get(f'/team/{team.team_id}/update')
+    assert response.status_code == 200
+    # team, its tasks, task choices
+    assert len(statements) <= 3
+    assert sum('Task_DoneBy_Team' in statement for statement in statements) == 1
@@ -0,0 +1,68 @@
+import pytest
+from sqlalchemy import insert
+from app import create_app, db
+from app.models import User, Emergency_Event
+from app.replicas import PIN_KEY
+from config import TestConfig, replica_binds
+
+@pytest.fixture(autouse=True)
+def forget_replica_bind():
+    yield
+    # ``db`` outlives these apps; later modules' create_all() must not look for the bind.
+    db.metadatas.pop('replica_0', None)
+
+def _replicated_app(tmp_path, replica_uri):
+    class ReplicaConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'primary.db'}"
+        SQLALCHEMY_BINDS = replica_binds(replica_uri)
+
+    app = create_app(ReplicaConfig)
+    with app.app_context():
+        db.create_all(bind_key=None)
+        admin = User(username='admin', role='admin')
+        admin.set_password('adminpass')
+        db.session.add_all([admin, Emergency_Event(disaster_type='Primary Flood')])
+        db.session.commit()
+    return app
+
+@pytest.fixture
+def replicated(tmp_path):
+    # Two SQLite files stand in for a primary and a (lagging) replica.
+    app = _replicated_app(tmp_path, f"sqlite:///{tmp_path / 'replica.db'}")
+    with app.app_context():
+        replica = db.engines['replica_0']
+        db.metadata.create_all(replica)
+        with replica.begin() as connection:
+            connection.execute(insert(Emergency_Event.__table__), [{'disaster_type': 'Replica Flood'}])
+    client = app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': 'adminpass'})
+    return client
+
+def test_list_pages_and_exports_read_from_the_replica(replicated):
+    page = replicated.get('/events').get_data(as_text=True)
+    assert 'Replica Flood' in page and 'Primary Flood' not in page
+    assert 'Replica Flood' in replicated.get('/export/events.csv').get_data(as_text=True)
+    # Forms that go on to write read from the primary.
+    assert replicated.get('/event/1/update').status_code == 200
+    with replicated.application.app_context():
+        assert db.session.get(Emergency_Event, 1).disaster_type == 'Primary Flood'
+
+def test_writes_pin_the_user_to_the_primary(replicated):
+    replicated.post('/event/new', data={'disaster_type': 'Second Flood'})
+    page = replicated.get('/events').get_data(as_text=True)
+    assert 'Second Flood' in page and 'Primary Flood' in page
+
+    with replicated.session_transaction() as session:
+        session.pop(PIN_KEY)
+    assert 'Second Flood' not in replicated.get('/events').get_data(as_text=True)
+
+def test_unreachable_replica_fails_over_to_the_primary(tmp_path):
+    app = _replicated_app(tmp_path, f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    client = app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': 'adminpass'})
+    response = client.get('/events')
+    assert response.status_code == 200
+    assert 'Primary Flood' in response.get_data(as_text=True)
+    replicas = app.extensions['replicas']
+    assert replicas.is_down(replicas.engines[0])
+    assert replicas.choose() is None
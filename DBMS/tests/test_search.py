@@ -0,0 +1,96 @@
+import time
+from sqlalchemy import text
+from app import db
+from app.models import Emergency_Event, Affected_Area, Affected_Individual
+from app.datagen import generate
+from app.search import MAX_CANDIDATES, SEARCH_TABLE, search_individuals, rebuild_search_index
+
+def _seed():
+    event = Emergency_Event(disaster_type='Flood')
+    riverside = Affected_Area(location='Riverside Shelter', population=500, event=event)
+    hill = Affected_Area(location='Hilltop School', population=200, event=event)
+    db.session.add_all([event, riverside, hill])
+    db.session.flush()
+    db.session.add_all([
+        Affected_Individual(name='John Smith', injury_type='Fracture', severity='Severe', area_id=riverside.area_id),
+        Affected_Individual(name='Johanna Smythe', injury_type='Burns', severity='Mild', area_id=hill.area_id),
+        Affected_Individual(name='Maria Garcia', injury_type='Concussion', severity='Mild', area_id=hill.area_id),
+    ])
+    db.session.commit()
+    return riverside, hill
+
+def _names(query, **kwargs):
+    return [individual.name for individual, _ in search_individuals(query, **kwargs).items]
+
+def test_exact_prefix_and_typo_matches(test_client):
+    _seed()
+    assert _names('John Smith')[0] == 'John Smith'
+    assert _names('Gar') == ['Maria Garcia']
+    assert _names('Jo')[:2] == ['Johanna Smythe', 'John Smith']
+    # Transposed letters still find the person, ranked above weaker matches.
+    assert _names('Jonh Smiht')[0] == 'John Smith'
+    assert 'Maria Garcia' not in _names('Jonh Smiht')
+    assert _names('Concusion') == ['Maria Garcia']
+    assert set(_names('hilltop')) == {'Johanna Smythe', 'Maria Garcia'}
+    assert _names('!!!') == []
+
+def test_index_follows_writes(test_client):
+    maria = Affected_Individual.query.filter_by(name='Maria Garcia').one()
+    maria.name = 'Maria Lopez'
+    db.session.commit()
+    assert _names('Lopez') == ['Maria Lopez']
+    assert _names('Garcia') == []
+
+    hill = db.session.get(Affected_Area, maria.area_id)
+    hill.location = 'Valley Clinic'
+    db.session.commit()
+    assert set(_names('valley clinic')) == {'Johanna Smythe', 'Maria Lopez'}
+
+    db.session.delete(maria)
+    db.session.commit()
+    assert _names('Lopez') == []
+
+    db.session.execute(text(f'DELETE FROM {SEARCH_TABLE}'))
+    db.session.commit()
+    assert _names('Johanna') == []
+    rebuild_search_index()
+    assert _names('Johanna')[0] == 'Johanna Smythe'
+
+def test_pagination(test_client):
+    area = Affected_Area.query.first()
+    db.session.add_all([Affected_Individual(name=f'Paged Person {i:02d}', area_id=area.area_id) for i in range(25)])
+    db.session.commit()
+    first = search_individuals('Paged Person', page=1, per_page=10)
+    last = search_individuals('Paged Person', page=3, per_page=10)
+    assert len(first.items) == 10 and first.has_next and not first.has_prev
+    assert len(last.items) == 5 and not last.has_next and last.has_prev
+    seen = {i.individual_id for p in (1, 2, 3) for i, _ in search_individuals('Paged Person', p, 10).items}
+    assert len(seen) == 25
+
+def test_search_route(admin_client):
+    response = admin_client.get('/search?q=Jonh+Smiht', headers={'Accept': 'application/json'})
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['results'][0]['name'] == 'John Smith'
+    assert data['results'][0]['location'] == 'Riverside Shelter'
+
+    response = admin_client.get('/search?q=Johanna')
+    assert response.status_code == 200
+    assert b'Johanna Smythe' in response.data
+
+def test_large_table_ranks_exact_names_first_without_scoring_every_hit(test_client, count_queries):
+    # Every row shares the "person" trigrams, so a stage that ranks all of
+    # its hits before the LIMIT grows with the table.
+    generate(scale=1000, seed=1)
+    assert Affected_Individual.query.count() == 20000
+    with count_queries() as statements:
+        started = time.perf_counter()
+        ranked = _names('Person 12345')
+        elapsed = time.perf_counter() - started
+    assert ranked[0] == 'Person 12345'
+    assert not any('rank' in statement.lower() for statement in statements)
+    assert elapsed < 1.0
+    assert _names('Persn 12345')[0] == 'Person 12345'
+    # "Person 12340" ... "Person 12349" all contain the query too.
+    assert _names('person 1234')[0] == 'Person 1234'
+    assert len(search_individuals('Person', per_page=MAX_CANDIDATES).items) == MAX_CANDIDATES
@@ -0,0 +1,103 @@
+import io
+from decimal import Decimal
+from sqlalchemy import select
+from app import db
+from app.models import (Emergency_Event, Affected_Area, Affected_Individual, Donation, Evacuation, Team,
+                        Event_Summary, Event_Summary_Bucket)
+from app.summaries import event_summary, rebuild_summaries
+from app.intake import import_records
+
+def _snapshot():
+    summary = db.session.execute(select(Event_Summary.__table__).order_by('event_id')).all()
+    buckets = db.session.execute(select(Event_Summary_Bucket.__table__)
+                                 .order_by('event_id', 'dimension', 'bucket')).all()
+    return summary, buckets
+
+def _assert_matches_rebuild():
+    db.session.expire_all()
+    incremental = _snapshot()
+    rebuild_summaries()
+    assert _snapshot() == incremental
+
+def test_orm_writes_keep_summaries_current(test_client):
+    flood, quake = Emergency_Event(disaster_type='Flood'), Emergency_Event(disaster_type='Quake')
+    north = Affected_Area(location='North', population=1200, event=flood)
+    south = Affected_Area(location='South', population=300, event=flood)
+    east = Affected_Area(location='East', population=50, event=quake)
+    team = Team(team_name='Boats')
+    db.session.add_all([flood, quake, north, south, east, team])
+    db.session.flush()
+    ana = Affected_Individual(name='Ana', severity='Severe', area_id=north.area_id)
+    ben = Affected_Individual(name='Ben', severity='Mild', area_id=south.area_id)
+    gift = Donation(name='Co-op', type='Money', amount=Decimal('250.50'), area_id=north.area_id)
+    ride = Evacuation(destination='Gym', transport='Boat', area_id=south.area_id, team_id=team.team_id)
+    db.session.add_all([ana, ben, gift, ride])
+    db.session.commit()
+
+    summary = event_summary(flood.eme_id)
+    assert summary['totals']['area_count'] == 2
+    assert summary['totals']['population'] == 1500
+    assert summary['totals']['donation_total'] == Decimal('250.50')
+    assert sorted(summary['severity']) == [('Mild', 1, 0), ('Severe', 1, 0)]
+    assert [t.team_name for t in summary['teams']] == ['Boats']
+    _assert_matches_rebuild()
+
+    ana.severity = 'Mild'
+    ben.area_id = east.area_id
+    gift.amount = Decimal('100')
+    ride.team_id = None
+    north.population = 1000
+    db.session.commit()
+    _assert_matches_rebuild()
+    assert event_summary(flood.eme_id)['teams'] == []
+    assert event_summary(quake.eme_id)['totals']['individual_count'] == 1
+
+    south.event_id = quake.eme_id
+    db.session.commit()
+    _assert_matches_rebuild()
+
+    db.session.delete(north)
+    db.session.commit()
+    _assert_matches_rebuild()
+    assert event_summary(flood.eme_id)['totals'] == dict.fromkeys(
+        ['area_count', 'population', 'individual_count', 'donation_count', 'donation_total',
+         'evacuation_count'], 0)
+
+    db.session.delete(quake)
+    db.session.commit()
+    assert db.session.get(Event_Summary, quake.eme_id) is None
+    _assert_matches_rebuild()
+
+def test_bulk_import_updates_summaries(test_client):
+    event = Emergency_Event(disaster_type='Storm')
+    area = Affected_Area(location='Harbour', event=event)
+    db.session.add_all([event, area])
+    db.session.commit()
+    body = 'name,severity,area_id\n' + ''.join(f'P{i},Severe,{area.area_id}\n' for i in range(7))
+    import_records('individuals', io.BytesIO(body.encode()), 'csv', chunk_size=3)
+    assert event_summary(event.eme_id)['severity'] == [('Severe', 7, 0)]
+    _assert_matches_rebuild()
+
+def test_dashboard_reads_a_fixed_number_of_statements(admin_client, count_queries):
+    event = Emergency_Event(disaster_type='Heatwave')
+    db.session.add(event)
+    db.session.flush()
+    areas = [Affected_Area(location=f'Block {i}', population=10, event_id=event.eme_id) for i in range(20)]
+    db.session.add_all(areas)
+    db.session.flush()
+    db.session.add_all([Affected_Individual(name=f'N{i}', severity='Mild', area_id=areas[i % 20].area_id)
+                        for i in range(200)])
+    db.session.commit()
+
+    with count_queries() as statements:
+        response = admin_client.get(f'/event/{event.eme_id}/dashboard')
+    assert response.status_code == 200
+    assert b'Heatwave' in response.data
+    assert not any('"Affected_Individual"' in s or '"Affected_Area"' in s for s in statements)
+    assert len(statements) <= 4
+
+def test_rebuild_cli(test_client):
+    runner = test_client.application.test_cli_runner()
+    result = runner.invoke(args=['rebuild-summaries'])
+    assert result.exit_code == 0, result.output
+    assert 'Rebuilt summaries' in result.output
@@ -0,0 +1,55 @@
+from sqlalchemy import update
+from app import db
+from app import users as users_module
+from app.models import User
+from app.users import CachedUser, UserCache
+
+def test_requests_reuse_the_cached_user(admin_client, count_queries):
+    with count_queries() as statements:
+        assert admin_client.get('/events').status_code == 200
+    assert not any('FROM "User"' in statement for statement in statements)
+
+def test_role_change_applies_on_the_next_request(admin_client):
+    admin = User.query.filter_by(username='admin').one()
+    admin.role = 'volunteer'
+    db.session.commit()
+    try:
+        response = admin_client.get('/event/new')
+        assert response.status_code == 302
+    finally:
+        admin.role = 'admin'
+        db.session.commit()
+    assert admin_client.get('/event/new').status_code == 200
+
+def test_bulk_update_clears_the_cache(admin_client):
+    db.session.execute(update(User).where(User.username == 'admin').values(role='volunteer'))
+    db.session.commit()
+    try:
+        assert admin_client.get('/event/new').status_code == 302
+    finally:
+        db.session.execute(update(User).where(User.username == 'admin').values(role='admin'))
+        db.session.commit()
+    assert admin_client.get('/event/new').status_code == 200
+
+def test_rolled_back_change_keeps_the_cache(admin_client, count_queries):
+    admin = User.query.filter_by(username='admin').one()
+    admin.role = 'volunteer'
+    db.session.flush()
+    db.session.rollback()
+    with count_queries() as statements:
+        assert admin_client.get('/event/new').status_code == 200
+    assert not any('FROM "User"' in statement for statement in statements)
+
+def test_cache_evicts_least_recent_and_expires(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(users_module.time, 'monotonic', lambda: now[0])
+    cache = UserCache(size=2, ttl=30)
+    for user_id in (1, 2):
+        cache.put(CachedUser(user_id, f'user{user_id}', 'volunteer'))
+    assert cache.get(1).username == 'user1'
+    cache.put(CachedUser(3, 'user3', 'volunteer'))
+    assert cache.get(2) is None
+    assert cache.get(1) is not None and cache.get(3) is not None
+
+    now[0] += 30
+    assert cache.get(1) is None and cache.get(3) is None